@@ -0,0 +1,82 @@
+"""Compare the single-pass __INITIAL_STATE__ scanner with the legacy regex path.
+
+Also reports full-state ``json.loads`` against note-only projection decoding.
+
+Usage::
+
+    uv run python benchmarks/bench_extract.py --notes 200 500 2000 --repeat 5
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fixtures import build_feed_page  # noqa: E402
+
+from xhsnote_parser.note_detail import (  # noqa: E402
+    _decode_note_section,
+    _scan_initial_state,
+)
+
+_LEGACY_PATTERN = re.compile(
+    r"<script>window.__INITIAL_STATE__=(.*?)</script>", re.DOTALL
+)
+
+
+def _legacy_scan(html: str) -> str:
+    """The previous ``extract_note_data`` slicing: lazy DOTALL regex + replace."""
+    match = _LEGACY_PATTERN.search(html)
+    if not match:
+        raise ValueError("missing state")
+    return match.group(1).replace("undefined", "null")
+
+
+def _measure(func: Callable[[str], Any], html: str, repeat: int) -> Dict[str, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(html)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": best, "peak_bytes": float(peak)}
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(
+        f"{'notes':>7} {'page MB':>8} {'legacy ms':>10} {'scanner ms':>11}"
+        f" {'legacy peak MB':>15} {'scanner peak MB':>16}"
+        f" {'full decode ms':>15} {'note-only ms':>13}"
+    )
+    for notes in args.notes:
+        html = build_feed_page(notes)
+        legacy = _measure(_legacy_scan, html, args.repeat)
+        scanner = _measure(_scan_initial_state, html, args.repeat)
+        raw_json = _scan_initial_state(html)
+        full = _measure(json.loads, raw_json, args.repeat)
+        projected = _measure(_decode_note_section, raw_json, args.repeat)
+        print(
+            f"{notes:>7} {len(html.encode('utf-8')) / 2**20:>8.2f}"
+            f" {legacy['seconds'] * 1000:>10.2f} {scanner['seconds'] * 1000:>11.2f}"
+            f" {legacy['peak_bytes'] / 2**20:>15.2f}"
+            f" {scanner['peak_bytes'] / 2**20:>16.2f}"
+            f" {full['seconds'] * 1000:>15.2f} {projected['seconds'] * 1000:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
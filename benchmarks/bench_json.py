@@ -0,0 +1,65 @@
+"""Compare stdlib json with the active json_backend on real-sized states.
+
+Usage::
+
+    uv run python benchmarks/bench_json.py --notes 200 1000 5000 --repeat 5
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fixtures import build_feed_page  # noqa: E402
+
+from xhsnote_parser import json_backend  # noqa: E402
+from xhsnote_parser.note_detail import _scan_initial_state  # noqa: E402
+
+
+def _best(func: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"backend: {json_backend.BACKEND_NAME}")
+    print(
+        f"{'notes':>7} {'state MB':>9} {'json.loads':>11} {'backend.loads':>14}"
+        f" {'json compact':>13} {'backend compact':>16} {'pretty':>8}"
+    )
+    for notes in args.notes:
+        raw_json = _scan_initial_state(build_feed_page(notes))
+        state = json.loads(raw_json)
+        stdlib_loads = _best(lambda: json.loads(raw_json), args.repeat)
+        backend_loads = _best(lambda: json_backend.loads(raw_json), args.repeat)
+        stdlib_compact = _best(
+            lambda: json.dumps(state, ensure_ascii=False, separators=(",", ":")),
+            args.repeat,
+        )
+        backend_compact = _best(
+            lambda: json_backend.dumps(state, compact=True), args.repeat
+        )
+        pretty = _best(lambda: json_backend.dumps(state), args.repeat)
+        print(
+            f"{notes:>7} {len(raw_json.encode('utf-8')) / 2**20:>9.2f}"
+            f" {stdlib_loads:>11.2f} {backend_loads:>14.2f}"
+            f" {stdlib_compact:>13.2f} {backend_compact:>16.2f} {pretty:>8.2f}"
+        )
+    print("(times in ms, best of --repeat runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Synthetic and recorded note pages for the benchmark scripts.
+
+Synthetic pages mimic the shape of real ``__INITIAL_STATE__`` payloads: a
+``note.noteDetailMap`` entry that ``build_note_detail`` consumes, surrounded by
+feed/comment sections it ignores, with bare ``undefined`` tokens sprinkled in.
+Recorded pages are any ``*.html`` files saved from the live site.
+"""
+
+import json
+import random
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+_UNDEFINED_MARKER = "@@UNDEFINED@@"
+
+
+def _image(rng: random.Random, index: int) -> Dict[str, Any]:
+    return {
+        "urlDefault": (
+            "http://sns-webpic-qc.xhscdn.com/202401011200/"
+            f"{rng.getrandbits(64):x}/spectrum/1040g{rng.getrandbits(96):x}_{index}"
+            "!nd_dft_wlteh_webp_3"
+        ),
+        "urlPre": f"http://sns-webpic-qc.xhscdn.com/pre/{index}",
+        "width": 1080,
+        "height": 1440,
+        "livePhoto": _UNDEFINED_MARKER,
+        "infoList": [
+            {"imageScene": "WB_PRV", "url": f"http://example.invalid/{index}/prv"},
+            {"imageScene": "WB_DFT", "url": f"http://example.invalid/{index}/dft"},
+        ],
+    }
+
+
+def build_note(
+    note_id: str,
+    *,
+    images: int = 4,
+    video: bool = False,
+    desc_chars: int = 200,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    desc_unit = '描述内容 #话题[话题]# 引用 "undefined" 原文\n'
+    note: Dict[str, Any] = {
+        "noteId": note_id,
+        "type": "video" if video else "normal",
+        "title": "标题" * rng.randint(5, 15),
+        "desc": (desc_unit * (desc_chars // len(desc_unit) + 1))[:desc_chars],
+        "user": {
+            "userId": f"{rng.getrandbits(96):024x}",
+            "nickname": "作者",
+            "avatar": "http://example.invalid/avatar",
+        },
+        "imageList": [_image(rng, index) for index in range(images)],
+        "tagList": [{"id": str(index), "name": f"标签{index}"} for index in range(8)],
+        "interactInfo": {
+            "likedCount": str(rng.randint(0, 10**5)),
+            "collectedCount": str(rng.randint(0, 10**4)),
+            "followed": False,
+        },
+        "time": 1700000000000 + rng.randint(0, 10**9),
+        "lastUpdateTime": 1700000000000 + rng.randint(0, 10**9),
+        "ipLocation": "上海",
+        "atUserList": [],
+        "shareInfo": {"unShare": _UNDEFINED_MARKER},
+    }
+    if video:
+        note["video"] = {
+            "consumer": {"originVideoKey": f"pre_post/1040g{rng.getrandbits(96):x}"},
+            "capa": {"duration": 42},
+            "media": {"stream": {"h264": [{"masterUrl": "http://example.invalid/v"}]}},
+        }
+    return note
+
+
+def build_state(
+    note_id: str = "6881b41c000000000b02ff0f",
+    *,
+    images: int = 4,
+    video: bool = False,
+    desc_chars: int = 200,
+    feed_notes: int = 20,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    note = build_note(
+        note_id, images=images, video=video, desc_chars=desc_chars, seed=seed
+    )
+    feeds: List[Dict[str, Any]] = [
+        build_note(f"{index:024x}", images=3, desc_chars=120, seed=seed + index)
+        for index in range(feed_notes)
+    ]
+    return {
+        "global": {"appSettings": {"notificationInterval": 30}},
+        "user": {"loggedIn": False, "userInfo": _UNDEFINED_MARKER},
+        "feed": {"feeds": feeds},
+        "note": {
+            "firstNoteId": note_id,
+            "noteDetailMap": {note_id: {"note": note, "comments": {"list": []}}},
+        },
+        "comment": {"comments": feeds[: feed_notes // 2]},
+    }
+
+
+def render_page(state: Dict[str, Any], *, tail_chars: int = 20_000) -> str:
+    payload = json.dumps(state, ensure_ascii=False).replace(
+        f'"{_UNDEFINED_MARKER}"', "undefined"
+    )
+    return (
+        "<html><head><title>小红书</title></head><body>"
+        f"<script>window.__INITIAL_STATE__={payload}</script>"
+        f"<div>{'页面其余内容' * (tail_chars // 6)}</div></body></html>"
+    )
+
+
+def build_feed_page(notes: int, *, seed: int = 0) -> str:
+    """A page whose state is dominated by ``notes`` feed entries."""
+    return render_page(
+        build_state(feed_notes=notes, seed=seed), tail_chars=notes * 12
+    )
+
+
+FIXTURES: Dict[str, Callable[[], str]] = {
+    "small": lambda: render_page(build_state()),
+    "many_images": lambda: render_page(build_state(images=120)),
+    "video": lambda: render_page(build_state(images=1, video=True)),
+    "huge_desc": lambda: render_page(build_state(desc_chars=500_000)),
+    "large_feed": lambda: build_feed_page(2_000),
+}
+
+
+def load_recorded(directory: Path) -> Dict[str, str]:
+    """Load ``*.html`` pages saved from the live site, keyed by file stem."""
+    return {
+        f"recorded:{path.stem}": path.read_text(encoding="utf-8")
+        for path in sorted(directory.glob("*.html"))
+    }
@@ -0,0 +1,266 @@
+"""End-to-end benchmark of the parse pipeline against a local stub server.
+
+Each fixture page is served over HTTP and pushed through the same stages the
+CLI runs — fetch, extract, build, save — timing every stage and recording its
+tracemalloc peak. Results are written as JSON so two runs (e.g. before/after a
+change) can be diffed with ``--compare``.
+
+Usage::
+
+    uv run python benchmarks/run.py --iterations 20 --output results.json
+    uv run python benchmarks/run.py --recorded pages/ --fixtures small video
+    uv run python benchmarks/run.py --compare before.json after.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fixtures import FIXTURES, load_recorded  # noqa: E402
+
+from xhsnote_parser import json_backend  # noqa: E402
+from xhsnote_parser.http_client import (  # noqa: E402
+    create_session,
+    fetch_initial_state,
+    fetch_note_page,
+)
+from xhsnote_parser.note_detail import build_note_detail, extract_note_data  # noqa: E402
+from xhsnote_parser.storage import DirectorySink  # noqa: E402
+
+STAGES = ("fetch", "extract", "build", "save")
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Streaming fetches drop the connection once the state block is read.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def _serve(pages: Dict[str, bytes]) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:  # noqa: N802 - stdlib hook name
+            body = pages.get(self.path.lstrip("/"))
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            return
+
+    server = _StubServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class _StageTimer:
+    def __init__(self) -> None:
+        self.seconds: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.peak: Dict[str, int] = dict.fromkeys(STAGES, 0)
+
+    @contextmanager
+    def stage(self, name: str, *, trace_memory: bool) -> Iterator[None]:
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name].append(time.perf_counter() - started)
+            if trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.peak[name] = max(self.peak[name], peak)
+
+
+def _bench_fixture(
+    base_url: str,
+    name: str,
+    page_bytes: int,
+    *,
+    iterations: int,
+    stream: bool,
+    output_dir: Path,
+) -> Dict[str, Any]:
+    fetch = fetch_initial_state if stream else fetch_note_page
+    url = f"{base_url}/{name}"
+    timer = _StageTimer()
+    sink = DirectorySink(output_dir)
+    with create_session(pool_size=1) as session:
+        # The first iteration only traces memory; tracemalloc slows every
+        # allocation, so timings come from the untraced iterations after it.
+        for iteration in range(iterations + 1):
+            trace = iteration == 0
+            with timer.stage("fetch", trace_memory=trace):
+                html = fetch(url, session=session)
+            with timer.stage("extract", trace_memory=trace):
+                note_data, _ = extract_note_data(html, include_full_state=False)
+            with timer.stage("build", trace_memory=trace):
+                note = build_note_detail(note_data, url)
+            with timer.stage("save", trace_memory=trace):
+                sink.write(note)
+            if trace:
+                for samples in timer.seconds.values():
+                    samples.clear()
+
+    stages: Dict[str, Any] = {}
+    for stage in STAGES:
+        samples = sorted(timer.seconds[stage])
+        median = samples[len(samples) // 2]
+        stages[stage] = {
+            "median_ms": round(median * 1000, 3),
+            "best_ms": round(samples[0] * 1000, 3),
+            "per_second": round(1 / median, 1) if median else None,
+            "peak_mb": round(timer.peak[stage] / 2**20, 3),
+        }
+    total = sum(stages[stage]["median_ms"] for stage in STAGES)
+    return {
+        "page_bytes": page_bytes,
+        "stages": stages,
+        "total_ms": round(total, 3),
+        "notes_per_second": round(1000 / total, 1) if total else None,
+    }
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parents[1],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+    fixtures: Dict[str, Callable[[], str]],
+    *,
+    iterations: int,
+    stream: bool,
+) -> Dict[str, Any]:
+    pages = {name: build().encode("utf-8") for name, build in fixtures.items()}
+    server = _serve(pages)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = {
+                name: _bench_fixture(
+                    base_url,
+                    name,
+                    len(body),
+                    iterations=iterations,
+                    stream=stream,
+                    output_dir=Path(tmp),
+                )
+                for name, body in pages.items()
+            }
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {
+        "meta": {
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "json_backend": json_backend.BACKEND_NAME,
+            "iterations": iterations,
+            "stream": stream,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "fixtures": results,
+    }
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    meta = results["meta"]
+    print(
+        f"commit {meta['commit']}  python {meta['python']}  "
+        f"backend {meta['json_backend']}  stream {meta['stream']}"
+    )
+    header = f"{'fixture':<22} {'page MB':>8}"
+    for stage in STAGES:
+        header += f" {stage + ' ms':>11} {'peak MB':>8}"
+    print(header + f" {'notes/s':>8}")
+    for name, result in results["fixtures"].items():
+        line = f"{name:<22} {result['page_bytes'] / 2**20:>8.2f}"
+        for stage in STAGES:
+            stats = result["stages"][stage]
+            line += f" {stats['median_ms']:>11.2f} {stats['peak_mb']:>8.2f}"
+        print(line + f" {result['notes_per_second'] or 0:>8.1f}")
+    print("(median ms per stage; peak MB from one tracemalloc-traced pass)")
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]) -> None:
+    print(f"before {before['meta']['commit']}  after {after['meta']['commit']}")
+    print(f"{'fixture':<22} {'stage':<8} {'before ms':>10} {'after ms':>10} {'change':>8}")
+    for name, result in after["fixtures"].items():
+        previous = before["fixtures"].get(name)
+        if previous is None:
+            continue
+        rows = [(stage, previous["stages"][stage]["median_ms"],
+                 result["stages"][stage]["median_ms"]) for stage in STAGES]
+        rows.append(("total", previous["total_ms"], result["total_ms"]))
+        for stage, old, new in rows:
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"{name:<22} {stage:<8} {old:>10.2f} {new:>10.2f} {change:>8}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--fixtures", nargs="+", choices=sorted(FIXTURES), default=sorted(FIXTURES)
+    )
+    parser.add_argument("--recorded", type=Path, help="directory of saved *.html pages")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--stream", action="store_true", help="use fetch_initial_state")
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    parser.add_argument(
+        "--compare", nargs=2, type=Path, metavar=("BEFORE", "AFTER"),
+        help="diff two results files instead of running",
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        before, after = (json.loads(path.read_text("utf-8")) for path in args.compare)
+        compare(before, after)
+        return
+
+    fixtures = {name: FIXTURES[name] for name in args.fixtures}
+    if args.recorded:
+        for name, html in load_recorded(args.recorded).items():
+            fixtures[name] = lambda html=html: html
+    results = run(fixtures, iterations=max(1, args.iterations), stream=args.stream)
+    print_results(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
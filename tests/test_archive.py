@@ -0,0 +1,116 @@
+from pathlib import Path
+
+from xhsnote_parser.archive import StateArchive
+from xhsnote_parser.offline import rebuild_notes
+from xhsnote_parser.storage import DirectorySink, StateArchiveSink
+
+
+def _state(note_id: str, title: str = "t") -> dict:
+    return {
+        "note": {
+            "noteDetailMap": {
+                note_id: {"note": {"noteId": note_id, "title": title}}
+            }
+        },
+        "feed": {"items": ["x" * 200] * 20},
+    }
+
+
+def test_archive_random_access_replay_and_reopen(tmp_path: Path) -> None:
+    with StateArchive(tmp_path, segment_bytes=600) as archive:
+        for index in range(5):
+            archive.append(f"n{index}", _state(f"n{index}"))
+        archive.append("n1", _state("n1", title="newer"))
+        assert archive.get("n3") == _state("n3")
+        assert archive.get("missing") is None
+
+    segments = sorted(path.name for path in tmp_path.glob("*.seg"))
+    assert len(segments) > 1
+    reopened = StateArchive(tmp_path)
+    assert len(reopened) == 5
+    assert reopened.get("n1") == _state("n1", title="newer")
+    assert [note_id for note_id, _ in reopened.replay()] == [
+        "n0", "n1", "n2", "n3", "n4", "n1",
+    ]
+
+
+def test_archive_ignores_torn_tail_and_missing_index(tmp_path: Path) -> None:
+    with StateArchive(tmp_path) as archive:
+        archive.append("a", _state("a"))
+        archive.append("b", _state("b"))
+    segment = next(tmp_path.glob("*.seg"))
+    data = segment.read_bytes()
+    segment.write_bytes(data[:-10])
+    segment.with_suffix(".idx").unlink()
+
+    reopened = StateArchive(tmp_path)
+
+    assert "a" in reopened and "b" not in reopened
+    assert [note_id for note_id, _ in reopened.replay()] == ["a"]
+
+
+def test_archive_recovers_records_missing_from_index(tmp_path: Path) -> None:
+    with StateArchive(tmp_path) as archive:
+        archive.append("a", _state("a"))
+        archive.append("b", _state("b"))
+        archive.append("c", _state("c"))
+    index_path = next(tmp_path.glob("*.idx"))
+    lines = index_path.read_text(encoding="utf-8").splitlines(keepends=True)
+    # Crash after writing "c": its index line was never written and the one
+    # for "b" was cut off mid-length.
+    index_path.write_text(lines[0] + lines[1][:-3], encoding="utf-8")
+
+    reopened = StateArchive(tmp_path)
+
+    assert len(reopened) == 3
+    assert reopened.get("b") == _state("b")
+    assert reopened.get("c") == _state("c")
+
+
+def test_state_archive_sink_skips_states_without_note_id(tmp_path: Path) -> None:
+    archive = StateArchive(tmp_path / "archive")
+    with StateArchiveSink(DirectorySink(tmp_path / "out"), archive) as sink:
+        sink.write({"title": "t"}, _state("x"))
+
+    assert len(archive) == 0
+    assert [note_id for note_id, _ in archive.replay()] == []
+
+
+def test_state_archive_sink_feeds_offline_reparse(tmp_path: Path) -> None:
+    archive = StateArchive(tmp_path / "archive")
+    with StateArchiveSink(DirectorySink(tmp_path / "out"), archive) as sink:
+        sink.write(
+            {"noteId": "a", "title": "t", "user": {"nickname": "u"}}, _state("a")
+        )
+
+    assert not list((tmp_path / "out").rglob("*_initial_state.json"))
+    results = list(rebuild_notes(tmp_path / "archive", processes=0))
+    assert [result.note_detail["noteId"] for result in results] == ["a"]
+
+
+def test_offline_reparse_reads_only_latest_archive_records(tmp_path: Path) -> None:
+    with StateArchive(tmp_path, segment_bytes=600) as archive:
+        archive.append("a", _state("a"))
+        archive.append("b", _state("b"))
+        archive.append("a", _state("a", title="newer"))
+
+    results = list(rebuild_notes(tmp_path, processes=0))
+
+    assert [
+        (result.note_detail["noteId"], result.note_detail["title"])
+        for result in results
+    ] == [("b", "t"), ("a", "newer")]
+
+
+def test_archive_opens_with_corrupt_index_line(tmp_path: Path) -> None:
+    with StateArchive(tmp_path) as archive:
+        for note_id in ("a", "b", "c"):
+            archive.append(note_id, _state(note_id))
+    index_path = next(tmp_path.glob("*.idx"))
+    lines = index_path.read_text(encoding="utf-8").splitlines(keepends=True)
+    index_path.write_text(lines[0] + "b\tx\ty\n" + lines[2], encoding="utf-8")
+
+    reopened = StateArchive(tmp_path)
+
+    assert len(reopened) == 3
+    assert reopened.get("b") == _state("b")
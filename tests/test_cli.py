@@ -1,3 +1,5 @@
+import io
+import json
 from pathlib import Path
 
 import pytest
@@ -38,3 +40,188 @@ def test_collect_input_urls_missing_file(tmp_path: Path) -> None:
         cli._collect_input_urls([], missing_path)
 
     assert str(excinfo.value).startswith("输入文件不存在")
+
+
+def test_main_parses_concurrently_and_reports_failures(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def _fake_parse_note(url: str, **_: object) -> dict:
+        if url.endswith("/bad"):
+            raise RuntimeError("拉取笔记页面失败")
+        note_id = url.rsplit("/", 1)[-1]
+        return {"noteId": note_id, "title": "t", "user": {"nickname": "a"}}
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cli, "parse_note", _fake_parse_note)
+    urls = [f"https://www.xiaohongshu.com/explore/{i}" for i in range(8)]
+    urls.append("https://www.xiaohongshu.com/explore/bad")
+
+    with pytest.raises(SystemExit) as excinfo:
+        cli.main(
+            [
+                *urls,
+                "--workers",
+                "4",
+                "-o",
+                str(tmp_path),
+                "--metrics-file",
+                str(tmp_path / "metrics.json"),
+            ]
+        )
+
+    assert excinfo.value.code == 1
+    written = sorted(path.name for path in (tmp_path / "a_notes").iterdir())
+    assert written == [f"t_{i}_noteDetail.json" for i in range(8)]
+    metrics = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))
+    assert metrics["counters"] == {"succeeded": 8, "failed": 1}
+    assert metrics["stages"]["write"]["count"] == 8
+    assert metrics["bytes_written"] > 0
+
+
+def test_main_fails_when_media_downloads_fail(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    class _FailingMedia:
+        downloaded = 0
+        skipped = 0
+        failed = 0
+        bytes_downloaded = 0
+
+        def __init__(self, *_: object, **__: object) -> None:
+            pass
+
+        def submit(self, note_detail: dict) -> list:
+            self.failed += 1
+            return []
+
+        def close(self) -> None:
+            pass
+
+    def _fake_parse_note(url: str, **_: object) -> dict:
+        return {"noteId": url.rsplit("/", 1)[-1], "title": "t"}
+
+    monkeypatch.setattr(cli, "parse_note", _fake_parse_note)
+    monkeypatch.setattr(cli, "MediaDownloader", _FailingMedia)
+
+    with pytest.raises(SystemExit) as excinfo:
+        cli.main(
+            [
+                "https://www.xiaohongshu.com/explore/1",
+                "-o",
+                str(tmp_path),
+                "--download-media",
+                "--metrics-file",
+                str(tmp_path / "metrics.json"),
+            ]
+        )
+
+    assert excinfo.value.code == 1
+    metrics = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))
+    assert metrics["counters"]["succeeded"] == 1
+    assert metrics["counters"]["media_failed"] == 1
+
+
+def test_main_resume_and_retry_failed_use_manifest(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    calls: list[str] = []
+    broken = {"https://www.xiaohongshu.com/explore/2"}
+
+    def _fake_parse_note(url: str, **_: object) -> dict:
+        calls.append(url)
+        if url in broken:
+            raise RuntimeError("拉取笔记页面失败")
+        return {"noteId": url.rsplit("/", 1)[-1], "title": "t", "user": {}}
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cli, "parse_note", _fake_parse_note)
+    urls = [f"https://www.xiaohongshu.com/explore/{i}" for i in range(1, 4)]
+
+    with pytest.raises(SystemExit):
+        cli.main([*urls, "-o", str(tmp_path)])
+    assert (tmp_path / "manifest.jsonl").exists()
+
+    calls.clear()
+    with pytest.raises(SystemExit):
+        cli.main([*urls, "-o", str(tmp_path), "--resume"])
+    assert calls == ["https://www.xiaohongshu.com/explore/2"]
+
+    calls.clear()
+    broken.clear()
+    cli.main(["-o", str(tmp_path), "--retry-failed"])
+    assert calls == ["https://www.xiaohongshu.com/explore/2"]
+
+    calls.clear()
+    cli.main([*urls, "-o", str(tmp_path), "--resume"])
+    assert calls == []
+
+
+def test_main_reads_urls_from_stdin(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from xhsnote_parser import service
+
+    def _fake_parse_note(url: str, **_: object) -> dict:
+        note_id = url.rsplit("/", 1)[-1]
+        return {"noteId": note_id, "title": "t", "user": {"nickname": "a"}}
+
+    lines = "".join(
+        f"https://www.xiaohongshu.com/explore/{i}\n" for i in range(5)
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(service, "parse_note", _fake_parse_note)
+    monkeypatch.setattr("sys.stdin", io.StringIO("# header\n" + lines))
+
+    cli.main(["-", "--workers", "2", "-o", str(tmp_path)])
+
+    written = sorted(path.name for path in (tmp_path / "a_notes").iterdir())
+    assert written == [f"t_{i}_noteDetail.json" for i in range(5)]
+
+    with pytest.raises(SystemExit):
+        cli.main(["-", "https://www.xiaohongshu.com/explore/1"])
+
+
+@pytest.mark.parametrize("value, expected", [("0", 0), ("-1", None), ("3", 3)])
+def test_main_reparse_maps_parse_processes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, value: str, expected: object
+) -> None:
+    seen = []
+
+    def _fake_rebuild_notes(root: Path, *, processes: object, **_: object) -> list:
+        seen.append(processes)
+        return []
+
+    monkeypatch.setattr(cli, "rebuild_notes", _fake_rebuild_notes)
+
+    cli.main(
+        [
+            "--reparse",
+            str(tmp_path),
+            "-o",
+            str(tmp_path / "out"),
+            "--parse-processes",
+            value,
+        ]
+    )
+
+    assert seen == [expected]
+
+
+def test_main_reparse_exports_metrics_file(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(cli, "rebuild_notes", lambda root, **_: [])
+
+    cli.main(
+        [
+            "--reparse",
+            str(tmp_path),
+            "-o",
+            str(tmp_path / "out"),
+            "--metrics-file",
+            str(tmp_path / "metrics.json"),
+        ]
+    )
+
+    metrics = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))
+    assert metrics["counters"] == {"succeeded": 0, "failed": 0}
@@ -0,0 +1,90 @@
+import sqlite3
+import time
+from pathlib import Path
+
+from xhsnote_parser.database import NoteDatabase
+from xhsnote_parser.storage import SqliteSink, create_sink
+
+
+def _note(note_id: str, updated: str, images: int = 1, **extra: object) -> dict:
+    return {
+        "noteId": note_id,
+        "type": "normal",
+        "title": f"title {updated}",
+        "user": {"userId": "u1", "nickname": "a"},
+        "time": "2024-03-01 10:00:00",
+        "lastUpdateTime": updated,
+        "imageList": [
+            {"traceId": f"t{i}", "urlNoWatermark": f"https://img/{i}", "width": 1}
+            for i in range(images)
+        ],
+        **extra,
+    }
+
+
+def test_upsert_keeps_latest_update_and_replaces_images(tmp_path: Path) -> None:
+    path = tmp_path / "notes.db"
+    with NoteDatabase(path, batch_size=2) as database:
+        database.upsert(_note("n1", "2024-03-02 00:00:00", images=3))
+        database.upsert(_note("n1", "2024-03-05 00:00:00", images=2))
+        database.upsert(_note("n1", "2024-03-03 00:00:00", images=5))
+        database.upsert(
+            _note(
+                "n2", "2024-01-01 00:00:00", type="video", time="2023-12-31 08:00:00"
+            )
+        )
+        assert database.upserted == 3 and database.stale == 1
+
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT note_id, title FROM notes ORDER BY note_id").fetchall()
+    assert rows == [
+        ("n1", "title 2024-03-05 00:00:00"),
+        ("n2", "title 2024-01-01 00:00:00"),
+    ]
+    images = conn.execute(
+        "SELECT position, trace_id FROM note_images WHERE note_id = 'n1'"
+    ).fetchall()
+    assert images == [(0, "t0"), (1, "t1")]
+    conn.close()
+
+    with NoteDatabase(path) as database:
+        recent = list(database.query(user_id="u1", since="2024-01-01"))
+        assert [note["noteId"] for note in recent] == ["n1"]
+        assert [note["noteId"] for note in database.query(note_type="video")] == ["n2"]
+        assert len(database) == 2
+
+
+def test_create_sink_sqlite_commits_on_close(tmp_path: Path) -> None:
+    sink = create_sink("sqlite", tmp_path)
+    assert isinstance(sink, SqliteSink)
+    with sink:
+        location = sink.write(_note("n1", "2024-03-02 00:00:00"))
+    assert location.endswith("notes.db#n1")
+    assert sink.bytes_written > 0
+
+    conn = sqlite3.connect(tmp_path / "notes.db")
+    assert conn.execute("SELECT COUNT(*) FROM note_images").fetchone() == (1,)
+    conn.close()
+
+
+def test_durable_callbacks_fire_only_after_commit(tmp_path: Path) -> None:
+    database = NoteDatabase(tmp_path / "notes.db", batch_size=10, commit_interval=0.2)
+    sink = SqliteSink(database)
+    committed: list = []
+
+    sink.write_durable(
+        _note("n1", "2024-03-02 00:00:00"),
+        None,
+        lambda location, error: committed.append((location, error)),
+    )
+    assert committed == []
+    deadline = time.monotonic() + 5
+    while not committed and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert committed and committed[0][1] is None
+    assert committed[0][0].endswith("notes.db#n1")
+    conn = sqlite3.connect(tmp_path / "notes.db")
+    assert conn.execute("SELECT COUNT(*) FROM notes").fetchone() == (1,)
+    conn.close()
+    sink.close()
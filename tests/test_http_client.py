@@ -0,0 +1,121 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from xhsnote_parser.http_client import (
+    ThrottledError,
+    connection_stats,
+    create_session,
+    fetch_initial_state,
+    fetch_note_page,
+)
+from xhsnote_parser.note_detail import extract_note_data
+from xhsnote_parser.response_cache import ResponseCache
+
+_STATE_PAGE = (
+    "<html><head><title>笔记</title></head><body>"
+    '<script>window.__INITIAL_STATE__={"note":{"noteDetailMap":{"1":{"note":'
+    '{"noteId":"1","title":"标题"}}}}}</script>'
+    + "<div>" + "尾部内容" * 20000 + "</div></body></html>"
+)
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # noqa: N802 - stdlib hook name
+        if self.path.startswith("/throttled"):
+            self.send_response(461)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if "state" in self.path:
+            body = _STATE_PAGE.encode("utf-8")
+        else:
+            body = b"<html>ok</html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        return
+
+
+@pytest.fixture()
+def stub_server() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_pooled_session_reuses_connections(stub_server: str) -> None:
+    with create_session(pool_size=2) as session:
+        for index in range(5):
+            html = fetch_note_page(f"{stub_server}/explore/{index}", session=session)
+            assert html == "<html>ok</html>"
+        stats = connection_stats(session)
+
+    assert stats.requests == 5
+    assert stats.connections == 1
+    assert stats.reused == 4
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_fetch_initial_state_returns_only_state_block(
+    stub_server: str, chunk_size: int
+) -> None:
+    snippet = fetch_initial_state(f"{stub_server}/state", chunk_size=chunk_size)
+
+    assert snippet.startswith("<script>window.__INITIAL_STATE__=")
+    assert snippet.endswith("</script>")
+    assert "尾部内容" not in snippet
+    note_section, _ = extract_note_data(snippet)
+    assert note_section["noteDetailMap"]["1"]["note"]["title"] == "标题"
+
+
+def test_fetch_initial_state_missing_block_returns_empty(stub_server: str) -> None:
+    assert fetch_initial_state(f"{stub_server}/plain") == ""
+
+
+def test_fetch_note_page_raises_throttled_error(stub_server: str) -> None:
+    with pytest.raises(ThrottledError):
+        fetch_note_page(f"{stub_server}/throttled")
+
+
+def test_fetch_note_page_caches_only_pages_with_state(
+    stub_server: str, tmp_path: Path
+) -> None:
+    cache = ResponseCache(tmp_path / "cache")
+    note_id = "6881b41c000000000b02ff0f"
+
+    fetch_note_page(f"{stub_server}/explore/{note_id}", cache=cache)
+    assert cache.get(note_id) is None
+
+    html = fetch_note_page(f"{stub_server}/explore/{note_id}?state=1", cache=cache)
+    assert cache.get(note_id) == html
+
+
+def test_fetch_note_page_reports_wire_size_and_skips_cache_hits(
+    stub_server: str, tmp_path: Path
+) -> None:
+    cache = ResponseCache(tmp_path / "cache")
+    url = f"{stub_server}/explore/6881b41c000000000b02ff0f?state=1"
+    samples = []
+
+    def _on_stage(stage: str, seconds: float, size: int) -> None:
+        samples.append((stage, size))
+
+    html = fetch_note_page(url, cache=cache, on_stage=_on_stage)
+    fetch_note_page(url, cache=cache, on_stage=_on_stage)
+
+    assert samples == [("fetch", len(html.encode("utf-8")))]
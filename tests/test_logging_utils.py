@@ -1,7 +1,14 @@
+import argparse
 import logging
 from pathlib import Path
 
-from xhsnote_parser.logging_utils import configure_logging
+import pytest
+
+from xhsnote_parser.logging_utils import (
+    _stop_listener,
+    configure_logging,
+    parse_module_levels,
+)
 
 
 def test_configure_logging_writes_file(tmp_path: Path) -> None:
@@ -15,3 +22,34 @@ def test_configure_logging_writes_file(tmp_path: Path) -> None:
     assert log_file.exists()
     content = log_file.read_text(encoding="utf-8")
     assert "hello file logging" in content
+
+
+def test_configure_logging_queued_writes_through_listener(tmp_path: Path) -> None:
+    log_dir = tmp_path / "logs"
+    configure_logging(
+        logging.INFO,
+        log_dir=log_dir,
+        enable_file=True,
+        queued=True,
+        module_levels={"xhsnote_parser.tests.quiet": logging.WARNING},
+    )
+    try:
+        logging.getLogger("xhsnote_parser.tests").info("hello queued logging")
+        logging.getLogger("xhsnote_parser.tests.quiet").info("suppressed")
+    finally:
+        _stop_listener()
+        configure_logging(logging.INFO)
+        logging.getLogger("xhsnote_parser.tests.quiet").setLevel(logging.NOTSET)
+
+    content = "".join(
+        path.read_text(encoding="utf-8") for path in log_dir.glob("*.log")
+    )
+    assert "hello queued logging" in content
+    assert "suppressed" not in content
+
+
+def test_parse_module_levels() -> None:
+    levels = parse_module_levels(["a=debug,b=ERROR", "c=warning"])
+    assert levels == {"a": logging.DEBUG, "b": logging.ERROR, "c": logging.WARNING}
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_module_levels(["missing-level"])
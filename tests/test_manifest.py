@@ -0,0 +1,49 @@
+from pathlib import Path
+
+from xhsnote_parser.manifest import RunManifest
+
+_URL_A = "https://www.xiaohongshu.com/explore/6881b41c000000000b02ff0f?xsec_token=a"
+_URL_B = "https://www.xiaohongshu.com/explore/6947da58000000001e0036f3"
+
+
+def test_manifest_latest_record_wins_and_survives_reload(tmp_path: Path) -> None:
+    path = tmp_path / "manifest.jsonl"
+    with RunManifest(path) as manifest:
+        manifest.record_failure(_URL_A, "RuntimeError: 拉取笔记页面失败")
+        manifest.record_failure(_URL_B, "ValueError: 页面结构不符合预期")
+        manifest.record_success(_URL_A, "6881b41c000000000b02ff0f", "out.json")
+
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write('{"key": "truncated')
+
+    with RunManifest(path) as manifest:
+        same_note_other_token = _URL_A.replace("xsec_token=a", "xsec_token=b")
+        assert manifest.is_done(same_note_other_token)
+        assert manifest.failed() == {_URL_B: "ValueError: 页面结构不符合预期"}
+        assert manifest.pending([_URL_A, _URL_B]) == [_URL_B]
+
+
+def test_manifest_appends_after_torn_tail_on_a_fresh_line(tmp_path: Path) -> None:
+    path = tmp_path / "manifest.jsonl"
+    with RunManifest(path) as manifest:
+        manifest.record_success(_URL_A, "6881b41c000000000b02ff0f", "a.json")
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write('{"key": "b", "url": "tr')
+
+    with RunManifest(path) as manifest:
+        manifest.record_failure(_URL_B, "RuntimeError: 拉取笔记页面失败")
+
+    with RunManifest(path) as manifest:
+        assert manifest.is_done(_URL_A)
+        assert manifest.failed() == {_URL_B: "RuntimeError: 拉取笔记页面失败"}
+    assert path.read_text(encoding="utf-8").count("\n") == 2
+
+
+def test_manifest_without_remembered_appends_still_writes(tmp_path: Path) -> None:
+    path = tmp_path / "manifest.jsonl"
+    with RunManifest(path, remember_appends=False) as manifest:
+        manifest.record_success(_URL_A, "6881b41c000000000b02ff0f", "a.json")
+        assert not manifest.is_done(_URL_A)
+
+    with RunManifest(path) as manifest:
+        assert manifest.is_done(_URL_A)
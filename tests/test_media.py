@@ -0,0 +1,135 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+
+from xhsnote_parser.media import (
+    STATUS_DOWNLOADED,
+    STATUS_RESUMED,
+    STATUS_SKIPPED,
+    MediaDownloader,
+    MediaItem,
+    iter_media,
+)
+
+_BODY = bytes(range(256)) * 400
+_RANGES: List[str] = []
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # noqa: N802 - stdlib hook name
+        requested = self.headers.get("Range")
+        _RANGES.append(requested or "")
+        body = _BODY
+        if requested:
+            start = int(requested.split("=")[1].rstrip("-"))
+            body = _BODY[start:]
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(_BODY) - 1}/{len(_BODY)}"
+            )
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        return
+
+
+@pytest.fixture()
+def media_server() -> Iterator[str]:
+    _RANGES.clear()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MediaHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_iter_media_names_files_by_trace_id(tmp_path: Path) -> None:
+    note = {
+        "noteId": "abc",
+        "user": {"nickname": "作者"},
+        "imageList": [
+            {"traceId": "t1", "urlNoWatermark": "https://img/t1?format/jpg"},
+            {"urlDefault": ""},
+        ],
+        "video": [{"urlNoWatermark": "https://video/pre_post/v1"}],
+    }
+
+    items = list(iter_media(note, tmp_path))
+
+    directory = tmp_path / "作者_notes" / "abc_media"
+    assert [item.path for item in items] == [
+        directory / "t1.jpg",
+        directory / "v1.mp4",
+    ]
+
+
+def test_download_streams_then_skips_existing(
+    media_server: str, tmp_path: Path
+) -> None:
+    item = MediaItem(f"{media_server}/t1", tmp_path / "t1.jpg", "t1")
+
+    with MediaDownloader(tmp_path, workers=2, chunk_size=1024) as downloader:
+        assert downloader.download(item) == STATUS_DOWNLOADED
+        assert downloader.download(item) == STATUS_SKIPPED
+
+    assert item.path.read_bytes() == _BODY
+    assert not item.path.with_name("t1.jpg.part").exists()
+    assert downloader.bytes_downloaded == len(_BODY)
+    assert _RANGES == [""]
+
+
+def test_download_resumes_partial_file_with_range(
+    media_server: str, tmp_path: Path
+) -> None:
+    item = MediaItem(f"{media_server}/v1", tmp_path / "v1.mp4", "v1")
+    item.path.with_name("v1.mp4.part").write_bytes(_BODY[:5000])
+
+    with MediaDownloader(tmp_path) as downloader:
+        assert downloader.download(item) == STATUS_RESUMED
+
+    assert item.path.read_bytes() == _BODY
+    assert downloader.bytes_downloaded == len(_BODY) - 5000
+    assert _RANGES == ["bytes=5000-"]
+
+
+def test_submit_blocks_once_max_pending_files_are_queued(tmp_path: Path) -> None:
+    release = threading.Event()
+    started: List[str] = []
+
+    with MediaDownloader(tmp_path, workers=1, max_pending=2) as downloader:
+
+        def _download(item: MediaItem) -> str:
+            started.append(item.trace_id)
+            release.wait(5)
+            return STATUS_DOWNLOADED
+
+        downloader.download = _download  # type: ignore[method-assign]
+        note = {
+            "noteId": "n",
+            "imageList": [
+                {"traceId": f"t{index}", "urlNoWatermark": f"https://img/t{index}"}
+                for index in range(5)
+            ],
+        }
+        submitter = threading.Thread(target=downloader.submit, args=(note,))
+        submitter.start()
+        submitter.join(0.2)
+        assert submitter.is_alive()
+
+        release.set()
+        submitter.join(5)
+        assert not submitter.is_alive()
+
+    assert started == [f"t{index}" for index in range(5)]
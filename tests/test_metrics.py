@@ -0,0 +1,63 @@
+import json
+from pathlib import Path
+
+from xhsnote_parser.metrics import RunMetrics, StageTimer
+from xhsnote_parser.note_detail import extract_note_data
+
+
+def test_run_metrics_percentiles_and_bytes() -> None:
+    metrics = RunMetrics()
+    for millis in range(1, 101):
+        metrics.record("fetch", millis / 1000, 10)
+    metrics.add_bytes("write", 42)
+    metrics.increment("succeeded", 100)
+
+    summary = metrics.summary()
+
+    fetch = summary["stages"]["fetch"]
+    assert fetch["count"] == 100
+    assert (fetch["p50"], fetch["p95"], fetch["p99"]) == (0.05, 0.095, 0.099)
+    assert summary["bytes_fetched"] == 1000
+    assert summary["bytes_written"] == 42
+    assert summary["counters"] == {"succeeded": 100}
+
+
+def test_stage_timer_skips_failed_blocks() -> None:
+    metrics = RunMetrics()
+    with StageTimer(metrics.record, "build"):
+        pass
+    try:
+        with StageTimer(metrics.record, "build"):
+            raise ValueError
+    except ValueError:
+        pass
+
+    assert metrics.summary()["stages"]["build"]["count"] == 1
+
+
+def test_extract_note_data_reports_scan_and_decode() -> None:
+    metrics = RunMetrics()
+    html = (
+        '<script>window.__INITIAL_STATE__={"note":{"noteDetailMap":{}}}</script>'
+    )
+
+    extract_note_data(html, include_full_state=False, on_stage=metrics.record)
+
+    assert list(metrics.summary()["stages"]) == ["scan", "decode"]
+
+
+def test_export_prometheus_and_json(tmp_path: Path) -> None:
+    metrics = RunMetrics()
+    metrics.record("fetch", 0.25, 2048)
+    metrics.increment("failed")
+
+    metrics.export(tmp_path / "run.prom")
+    metrics.export(tmp_path / "run.json")
+
+    prom = (tmp_path / "run.prom").read_text(encoding="utf-8")
+    assert 'xhsnote_stage_seconds{stage="fetch",quantile="0.99"} 0.250000' in prom
+    assert 'xhsnote_stage_seconds_count{stage="fetch"} 1' in prom
+    assert 'xhsnote_bytes_total{direction="fetched"} 2048' in prom
+    assert 'xhsnote_notes_total{result="failed"} 1' in prom
+    exported = json.loads((tmp_path / "run.json").read_text(encoding="utf-8"))
+    assert exported["stages"]["fetch"]["p50"] == 0.25
@@ -0,0 +1,153 @@
+import pytest
+
+from xhsnote_parser.models import NoteDetail
+from xhsnote_parser.note_detail import build_note_detail, extract_note_data
+
+
+def _page(payload: str) -> str:
+    return f"<html><script>window.__INITIAL_STATE__={payload}</script></html>"
+
+
+def test_extract_note_data_rewrites_only_bare_undefined() -> None:
+    html = _page(
+        '{"note":{"title":"undefined 不是 null","desc":"say \\"undefined\\"",'
+        '"video":undefined,"tags":[undefined,"x"],"undefinedKey":1},'
+        '"user":undefined}'
+    )
+
+    note_section, full_state = extract_note_data(html)
+
+    assert note_section == {
+        "title": "undefined 不是 null",
+        "desc": 'say "undefined"',
+        "video": None,
+        "tags": [None, "x"],
+        "undefinedKey": 1,
+    }
+    assert full_state["user"] is None
+
+
+def test_extract_note_data_handles_escaped_quotes_and_backslashes() -> None:
+    html = _page(
+        '{"a":"\\\\","b":undefined,"c":"\\"undefined","d":"x\\\\\\"undefined",'
+        '"e":undefined}'
+    )
+
+    _, full_state = extract_note_data(html)
+
+    assert full_state == {
+        "a": "\\",
+        "b": None,
+        "c": '"undefined',
+        "d": 'x\\"undefined',
+        "e": None,
+    }
+
+
+def test_extract_note_data_stops_at_first_script_end() -> None:
+    html = _page('{"note":{"noteDetailMap":{}}}') + "<script>var x = undefined;</script>"
+
+    note_section, _ = extract_note_data(html)
+
+    assert note_section == {"noteDetailMap": {}}
+
+
+def test_extract_note_data_without_state_block() -> None:
+    with pytest.raises(ValueError):
+        extract_note_data("<html><body>captcha</body></html>")
+
+
+def test_extract_note_data_projection_decodes_only_note_section() -> None:
+    html = _page(
+        '{"user":{"note":{"title":"not me"}},"feed":{"feeds":[undefined]},'
+        '"note": {"noteDetailMap":{"1":{"note":{"noteId":"1"}}}},'
+        '"comments":{"list":[1,2,3]}}'
+    )
+
+    projected, state = extract_note_data(html, include_full_state=False)
+    full_note, full_state = extract_note_data(html)
+
+    assert state is None
+    assert projected == full_note == {"noteDetailMap": {"1": {"note": {"noteId": "1"}}}}
+    assert full_state is not None and "comments" in full_state
+
+
+def test_extract_note_data_projection_uses_top_level_note_key() -> None:
+    html = _page(
+        '{"user":{"note":{"noteDetailMap":{"nested":{}}}},'
+        '"desc":"a \\"note\\": {} [ in text","tags":["{\\"note\\":"],'
+        '"note":{"noteDetailMap":{"1":{"note":{"noteId":"1"}}}}}'
+    )
+
+    projected, _ = extract_note_data(html, include_full_state=False)
+    full_note, _ = extract_note_data(html)
+
+    assert projected == full_note == {"noteDetailMap": {"1": {"note": {"noteId": "1"}}}}
+
+
+def test_extract_note_data_projection_falls_back_without_note_map() -> None:
+    html = _page('{"note":{"firstNoteId":"1"}}')
+
+    note_section, state = extract_note_data(html, include_full_state=False)
+
+    assert note_section == {"firstNoteId": "1"}
+    assert state is None
+
+
+_NOTE_DATA = {
+    "noteDetailMap": {
+        "n1": {
+            "note": {
+                "noteId": "n1",
+                "title": "标题",
+                "desc": "描述",
+                "type": "normal",
+                "time": 1700000000000,
+                "user": {"userId": "u1", "nickname": "作者", "avatar": "a"},
+                "imageList": [
+                    {
+                        "urlDefault": "http://ci/202401/abc/spectrum/trace1!nd_dft",
+                        "width": 1080,
+                    }
+                ],
+                "tagList": [{"id": "1", "name": "旅行", "type": "topic"}],
+                "interactInfo": {"likedCount": "12", "collectedCount": "1万+"},
+                "comments": {"list": [1, 2, 3]},
+            }
+        }
+    }
+}
+
+
+def test_build_note_detail_projects_fields() -> None:
+    detail = build_note_detail(
+        _NOTE_DATA,
+        "https://www.xiaohongshu.com/explore/n1",
+        fields=["title", "user.nickname", "imageList.urlNoWatermark"],
+    )
+
+    assert detail == {
+        "noteId": "n1",
+        "title": "标题",
+        "user": {"nickname": "作者"},
+        "imageList": [
+            {
+                "urlNoWatermark": "https://sns-img-hw.xhscdn.com/trace1"
+                "?imageView2/2/w/0/format/jpg"
+            }
+        ],
+    }
+
+
+def test_note_detail_model_from_note_data() -> None:
+    model = NoteDetail.from_note_data(_NOTE_DATA, "https://x/explore/n1")
+
+    assert model.note_id == "n1"
+    assert model.nickname == "作者" and model.user_id == "u1"
+    assert model.image_urls == (
+        "https://sns-img-hw.xhscdn.com/trace1?imageView2/2/w/0/format/jpg",
+    )
+    assert model.tags == ("旅行",)
+    assert model.liked_count == 12 and model.collected_count is None
+    assert model.time is not None and model.note_url == "https://x/explore/n1"
+    assert not hasattr(model, "__dict__")
@@ -0,0 +1,95 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+from xhsnote_parser import cli
+from xhsnote_parser.offline import rebuild_notes
+from xhsnote_parser.storage import DirectorySink
+
+
+def _state(note_id: str) -> dict:
+    return {
+        "note": {
+            "noteDetailMap": {
+                note_id: {
+                    "note": {
+                        "noteId": note_id,
+                        "title": f"title {note_id}",
+                        "user": {"nickname": "author"},
+                        "imageList": [],
+                        "time": 1700000000000,
+                    }
+                }
+            }
+        }
+    }
+
+
+def _populate(root: Path) -> None:
+    (root / "pages").mkdir(parents=True)
+    (root / "pages" / "a.html").write_text(
+        "<html><script>window.__INITIAL_STATE__="
+        f"{json.dumps(_state('a'))}</script></html>",
+        encoding="utf-8",
+    )
+    with DirectorySink(root / "dir") as sink:
+        sink.write(
+            {
+                "noteId": "b",
+                "title": "title b",
+                "user": {"nickname": "author"},
+                "noteUrl": "https://www.xiaohongshu.com/explore/b?xsec_token=t",
+            },
+            _state("b"),
+        )
+    with gzip.open(root / "initial_state-00001.jsonl.gz", "wt") as handle:
+        handle.write(json.dumps({"noteId": "c", "state": _state("c")}) + "\n")
+        handle.write("{broken\n")
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_rebuild_notes_reads_pages_state_files_and_streams(
+    tmp_path: Path, processes: int
+) -> None:
+    _populate(tmp_path)
+
+    results = list(rebuild_notes(tmp_path, processes=processes))
+
+    rebuilt = {
+        result.note_detail["noteId"]: result.note_detail
+        for result in results
+        if result.note_detail is not None
+    }
+    assert sorted(rebuilt) == ["a", "b", "c"]
+    assert rebuilt["a"]["noteUrl"] == "https://www.xiaohongshu.com/explore/a"
+    assert rebuilt["b"]["noteUrl"].endswith("?xsec_token=t")
+    assert rebuilt["c"]["time"] is not None
+    errors = [result.label for result in results if result.error is not None]
+    assert [label.rsplit(":", 1)[-1] for label in errors] == ["2"]
+
+
+def test_main_reparse_rebuilds_without_network(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _populate(tmp_path / "saved")
+    (tmp_path / "saved" / "initial_state-00001.jsonl.gz").unlink()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cli, "parse_note", None)
+
+    cli.main(
+        [
+            "--reparse",
+            str(tmp_path / "saved"),
+            "--parse-processes",
+            "1",
+            "--output-format",
+            "jsonl",
+            "-o",
+            str(tmp_path / "out"),
+        ]
+    )
+
+    lines = (tmp_path / "out" / "notes-00001.jsonl").read_text().splitlines()
+    assert sorted(json.loads(line)["noteId"] for line in lines) == ["a", "b"]
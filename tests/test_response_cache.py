@@ -0,0 +1,80 @@
+import os
+import time
+from pathlib import Path
+
+from xhsnote_parser.response_cache import ResponseCache
+from xhsnote_parser.urls import extract_note_id
+
+_NOTE_ID = "6881b41c000000000b02ff0f"
+
+
+def test_extract_note_id_from_known_paths() -> None:
+    assert (
+        extract_note_id(
+            f"https://www.xiaohongshu.com/explore/{_NOTE_ID}?xsec_token=abc"
+        )
+        == _NOTE_ID
+    )
+    assert (
+        extract_note_id(f"https://www.xiaohongshu.com/discovery/item/{_NOTE_ID}")
+        == _NOTE_ID
+    )
+    assert extract_note_id("https://www.xiaohongshu.com/user/profile/1") is None
+
+
+def test_cache_round_trip_and_ttl(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path, ttl=60)
+    cache.put(_NOTE_ID, "<html>页面</html>")
+
+    assert cache.get(_NOTE_ID) == "<html>页面</html>"
+    assert cache.get("missing") is None
+
+    entry = next(tmp_path.glob("*.html.gz"))
+    stale = time.time() - 120
+    os.utime(entry, (stale, stale))
+
+    assert cache.get(_NOTE_ID) is None
+    assert not entry.exists()
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    page = os.urandom(4096).hex()
+    cache = ResponseCache(tmp_path, max_bytes=11_000)
+    cache.put("a", page)
+    cache.put("b", page)
+    old = time.time() - 600
+    os.utime(tmp_path / "a.html.gz", (old, time.time()))
+    os.utime(tmp_path / "b.html.gz", (old - 60, time.time()))
+    assert cache.get("a") == page
+
+    cache.put("c", page)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == page
+    assert cache.get("c") == page
+
+
+def test_cache_evicts_to_low_watermark(tmp_path: Path) -> None:
+    page = "x" * 50_000
+    cache = ResponseCache(tmp_path, max_bytes=1_000_000)
+    cache.put("probe", page)
+    entry_size = (tmp_path / "probe.html.gz").stat().st_size
+    cache.max_bytes = entry_size * 20 + entry_size // 2
+    scans = []
+    entries = cache._entries
+
+    def _counting_entries() -> list:
+        scans.append(1)
+        return entries()
+
+    cache._entries = _counting_entries  # type: ignore[method-assign]
+    for index in range(20):
+        cache.put(f"n{index}", page)
+    assert len(scans) == 1
+    assert cache._total_bytes <= cache.max_bytes * 0.9
+    assert len(list(tmp_path.glob("*.html.gz"))) == 18
+
+    cache.put("n20", page)
+    cache.put("n21", page)
+    assert len(scans) == 1
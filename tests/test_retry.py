@@ -0,0 +1,132 @@
+import pytest
+import requests
+
+from xhsnote_parser.retry import (
+    CircuitBreaker,
+    RetryPolicy,
+    call_with_retries,
+    classify_error,
+)
+
+
+def _http_error(status: int) -> RuntimeError:
+    response = requests.Response()
+    response.status_code = status
+    wrapped = RuntimeError("拉取笔记页面失败")
+    wrapped.__cause__ = requests.HTTPError(response=response)
+    return wrapped
+
+
+def test_classify_error_follows_wrapped_cause() -> None:
+    wrapped = RuntimeError("拉取笔记页面失败")
+    wrapped.__cause__ = requests.ReadTimeout()
+
+    assert classify_error(wrapped) == "read"
+    assert classify_error(requests.ConnectTimeout()) == "connect"
+    assert classify_error(requests.ConnectionError()) == "connect"
+    assert classify_error(_http_error(503)) == "server"
+    assert classify_error(_http_error(404)) is None
+    assert classify_error(ValueError("页面结构不符合预期")) is None
+
+
+def test_call_with_retries_uses_per_class_budget() -> None:
+    sleeps: list[float] = []
+    errors = iter([_http_error(502), _http_error(503)])
+
+    def _flaky() -> str:
+        error = next(errors, None)
+        if error is not None:
+            raise error
+        return "ok"
+
+    policy = RetryPolicy(server_retries=2, backoff=1.0)
+    assert call_with_retries(_flaky, url="u", policy=policy, sleep=sleeps.append) == "ok"
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 1.0 and 0 <= sleeps[1] <= 2.0
+
+    with pytest.raises(RuntimeError):
+        call_with_retries(
+            lambda: (_ for _ in ()).throw(_http_error(500)),
+            url="u",
+            policy=RetryPolicy(server_retries=0),
+        )
+
+
+def test_circuit_breaker_opens_pauses_and_recovers() -> None:
+    now = [0.0]
+    slept: list[float] = []
+
+    def _sleep(seconds: float) -> None:
+        slept.append(seconds)
+        now[0] += seconds
+
+    breaker = CircuitBreaker(
+        failure_threshold=0.5,
+        min_requests=4,
+        cooldown=10.0,
+        clock=lambda: now[0],
+        sleep=_sleep,
+    )
+    for success in (True, False, False, True):
+        breaker.record(success)
+    assert breaker.is_open and breaker.trips == 1
+
+    breaker.wait_until_closed()
+    assert sum(slept) == pytest.approx(10.0)
+    assert not breaker.is_open
+
+    breaker.record(False)
+    assert breaker.is_open and breaker.trips == 2
+
+    now[0] += 10.0
+    breaker.wait_until_closed()
+    breaker.record(True)
+    assert not breaker.is_open
+
+
+def test_circuit_breaker_lets_one_half_open_probe_through() -> None:
+    now = [0.0]
+    probe_outcomes: list = []
+
+    def _sleep(seconds: float) -> None:
+        now[0] += seconds
+        if probe_outcomes:
+            breaker.record(probe_outcomes.pop())
+
+    breaker = CircuitBreaker(
+        min_requests=2, cooldown=10.0, clock=lambda: now[0], sleep=_sleep
+    )
+    breaker.record(False)
+    breaker.record(False)
+    breaker.wait_until_closed()  # the probe
+    assert now[0] == pytest.approx(10.0)
+
+    # A second caller waits until the probe reports back.
+    probe_outcomes.append(True)
+    breaker.wait_until_closed()
+    assert now[0] == pytest.approx(10.1)
+
+    breaker.wait_until_closed()
+    assert now[0] == pytest.approx(10.1)
+
+
+def test_call_with_retries_logs_traceback_only_on_final_failure(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    errors = iter([_http_error(502), _http_error(503), _http_error(500)])
+
+    def _failing() -> str:
+        raise next(errors)
+
+    with pytest.raises(RuntimeError):
+        call_with_retries(
+            _failing,
+            url="u",
+            policy=RetryPolicy(server_retries=2),
+            sleep=lambda _: None,
+        )
+
+    retries = [record for record in caplog.records if record.levelname == "WARNING"]
+    failures = [record for record in caplog.records if record.levelname == "ERROR"]
+    assert len(retries) == 2 and all(record.exc_info is None for record in retries)
+    assert len(failures) == 1 and failures[0].exc_info is not None
@@ -0,0 +1,57 @@
+import pytest
+
+from xhsnote_parser.http_client import ThrottledError
+from xhsnote_parser.scheduler import AdaptiveRateLimiter, RequestScheduler
+
+_URL = "https://www.xiaohongshu.com/explore/1"
+
+
+def test_limiter_grows_additively_and_halves_on_throttle() -> None:
+    limiter = AdaptiveRateLimiter(
+        "host", rate=4.0, max_rate=100.0, concurrency=4, max_concurrency=16
+    )
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.rate > 4.0
+    assert limiter.concurrency == 5
+
+    grown_rate = limiter.rate
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.rate == pytest.approx(grown_rate / 2)
+    assert limiter.concurrency == 2
+
+    limiter.acquire()
+    limiter.release(success=False)
+    assert limiter.rate == pytest.approx(grown_rate / 2)
+
+
+def test_scheduler_retries_throttled_requests_after_cooldown() -> None:
+    sleeps: list[float] = []
+    scheduler = RequestScheduler(
+        rate=50.0, max_rate=50.0, throttle_retries=2, cooldown=1.5, sleep=sleeps.append
+    )
+    responses = iter([ThrottledError("429"), ThrottledError("461"), "<html>"])
+
+    def _request() -> str:
+        outcome = next(responses)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert scheduler.run(_URL, _request) == "<html>"
+    assert sleeps == [1.5, 3.0]
+    assert scheduler.throttled == 2
+    assert scheduler.limiter_for(_URL).rate < 50.0
+
+
+def test_scheduler_gives_up_after_retry_budget() -> None:
+    scheduler = RequestScheduler(throttle_retries=1, sleep=lambda _: None)
+
+    def _request() -> str:
+        raise ThrottledError("429")
+
+    with pytest.raises(ThrottledError):
+        scheduler.run(_URL, _request)
+    assert scheduler.throttled == 2
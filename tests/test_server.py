@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Iterator, List
+
+import pytest
+
+from xhsnote_parser import server
+from xhsnote_parser.server import NoteCache, NoteServer, NoteService
+
+_NOTE_ID = "64b7e3a1000000001e03b5f2"
+
+
+def test_note_cache_evicts_least_recent_and_expires(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    now = [100.0]
+    monkeypatch.setattr(server.time, "monotonic", lambda: now[0])
+    cache = NoteCache(max_entries=2, ttl=10)
+    cache.put("a", {"noteId": "a"})
+    cache.put("b", {"noteId": "b"})
+    assert cache.get("a") == {"noteId": "a"}
+    cache.put("c", {"noteId": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    now[0] += 11
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+def test_note_service_coalesces_concurrent_requests(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls: List[str] = []
+    release = threading.Event()
+
+    def _fake_parse_note(url: str, **_: object) -> dict:
+        calls.append(url)
+        release.wait(5)
+        return {"noteId": _NOTE_ID, "title": "t"}
+
+    monkeypatch.setattr(server, "parse_note", _fake_parse_note)
+    service = NoteService()
+    url = f"https://www.xiaohongshu.com/explore/{_NOTE_ID}"
+    results: List[dict] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(service.get(url)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    while service.stats()["coalesced"] < 7:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8
+    service.get(f"{url}?xsec_token=abc")
+    assert len(calls) == 1
+    assert service.stats()["cache_hits"] == 1
+    service.close()
+
+
+@pytest.fixture
+def note_server(monkeypatch: pytest.MonkeyPatch) -> Iterator[str]:
+    def _fake_parse_note(url: str, **_: object) -> dict:
+        if "bad" in url:
+            raise RuntimeError("拉取笔记页面失败")
+        return {"noteId": _NOTE_ID, "title": "t", "user": {"nickname": "a"}}
+
+    monkeypatch.setattr(server, "parse_note", _fake_parse_note)
+    service = NoteService()
+    httpd = NoteServer(("127.0.0.1", 0), service)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        service.close()
+
+
+def _get(url: str) -> tuple:
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read())
+
+
+def test_note_server_endpoints(note_server: str) -> None:
+    status, body = _get(f"{note_server}/notes/{_NOTE_ID}?fields=title")
+    assert status == 200
+    assert body == {"noteId": _NOTE_ID, "title": "t"}
+
+    explore = f"https://www.xiaohongshu.com/explore/{_NOTE_ID}"
+    status, body = _get(f"{note_server}/note?url={explore}")
+    assert status == 200 and body["user"] == {"nickname": "a"}
+
+    assert _get(f"{note_server}/notes/not-an-id")[0] == 400
+    assert _get(f"{note_server}/note?url=https://example.com/bad")[0] == 502
+    assert _get(f"{note_server}/missing")[0] == 404
+    status, stats = _get(f"{note_server}/stats")
+    assert stats["fetches"] == 2 and stats["cache_hits"] == 1
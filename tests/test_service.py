@@ -0,0 +1,153 @@
+import asyncio
+import json
+import threading
+import time
+from typing import List
+
+import pytest
+
+from xhsnote_parser import parse_many_async
+
+
+def _build_page(note_id: str) -> str:
+    state = {
+        "note": {
+            "noteDetailMap": {
+                note_id: {
+                    "note": {
+                        "noteId": note_id,
+                        "title": f"title {note_id}",
+                        "imageList": [],
+                        "time": 1700000000000,
+                        "lastUpdateTime": 1700000000000,
+                    }
+                }
+            }
+        }
+    }
+    return (
+        "<html><body><script>window.__INITIAL_STATE__="
+        f"{json.dumps(state)}</script></body></html>"
+    )
+
+
+def test_parse_many_async_runs_hundreds_in_flight_on_one_thread() -> None:
+    aiohttp_web = pytest.importorskip("aiohttp.web")
+    total = 300
+    in_flight = 0
+    peak_in_flight = 0
+
+    async def _handle(request: "aiohttp_web.Request") -> "aiohttp_web.Response":
+        nonlocal in_flight, peak_in_flight
+        in_flight += 1
+        peak_in_flight = max(peak_in_flight, in_flight)
+        await asyncio.sleep(0.2)
+        in_flight -= 1
+        return aiohttp_web.Response(
+            text=_build_page(request.match_info["note_id"]),
+            content_type="text/html",
+        )
+
+    async def _run() -> List[str]:
+        app = aiohttp_web.Application()
+        app.router.add_get("/explore/{note_id}", _handle)
+        runner = aiohttp_web.AppRunner(app)
+        await runner.setup()
+        site = aiohttp_web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        urls = [f"http://127.0.0.1:{port}/explore/{i}" for i in range(total)]
+        urls.append(f"http://127.0.0.1:{port}/missing/0")
+        try:
+            return [
+                detail["noteId"]
+                async for detail in parse_many_async(urls, concurrency=total)
+            ]
+        finally:
+            await runner.cleanup()
+
+    threads_before = threading.active_count()
+    note_ids = asyncio.run(_run())
+
+    assert sorted(note_ids, key=int) == [str(i) for i in range(total)]
+    assert peak_in_flight > total // 2
+    assert threading.active_count() == threads_before
+
+
+def test_parse_note_runs_extract_and_build_in_parse_pool(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from xhsnote_parser import create_parse_pool, service
+    from xhsnote_parser.metrics import RunMetrics
+
+    page = _build_page("42")
+
+    def _fetch(url: str, *, on_stage=None, **_: object) -> str:
+        on_stage("fetch", 0.0, len(page))
+        return page
+
+    monkeypatch.setattr(service, "fetch_note_page", _fetch)
+    metrics = RunMetrics()
+    states: List[dict] = []
+
+    with create_parse_pool(2) as pool:
+        detail = service.parse_note(
+            "https://www.xiaohongshu.com/explore/42",
+            output_path=None,
+            on_initial_state=states.append,
+            on_stage=metrics.record,
+            parse_pool=pool,
+        )
+
+    assert detail["noteId"] == "42"
+    assert detail["noteUrl"] == "https://www.xiaohongshu.com/explore/42"
+    assert states and "note" in states[0]
+    assert list(metrics.summary()["stages"]) == ["fetch", "parse"]
+
+
+def test_parse_notes_pulls_lazily_and_yields_errors(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from xhsnote_parser import service
+
+    lock = threading.Lock()
+    in_flight = 0
+    peak_in_flight = 0
+    pulled = 0
+
+    def _fetch(url: str, **_: object) -> str:
+        nonlocal in_flight, peak_in_flight
+        with lock:
+            in_flight += 1
+            peak_in_flight = max(peak_in_flight, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        if url.endswith("/bad"):
+            raise RuntimeError("拉取笔记页面失败")
+        return _build_page(url.rsplit("/", 1)[-1])
+
+    def _lines():
+        nonlocal pulled
+        yield "# comment\n"
+        for i in range(40):
+            pulled += 1
+            yield f"https://www.xiaohongshu.com/explore/{i}\n"
+        yield "\n"
+        yield "https://www.xiaohongshu.com/explore/bad\n"
+
+    monkeypatch.setattr(service, "fetch_note_page", _fetch)
+    results = service.parse_notes(_lines(), workers=2, max_pending=4)
+
+    first = next(results)
+    assert pulled <= 6
+    rest = list(results)
+
+    by_url = {result.url: result for result in [first, *rest]}
+    assert len(by_url) == 41
+    bad = by_url.pop("https://www.xiaohongshu.com/explore/bad")
+    assert bad.note_detail is None and isinstance(bad.error, RuntimeError)
+    assert sorted(int(r.note_detail["noteId"]) for r in by_url.values()) == list(
+        range(40)
+    )
+    assert peak_in_flight <= 2
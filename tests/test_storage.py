@@ -0,0 +1,172 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from xhsnote_parser import json_backend
+from xhsnote_parser.storage import save_note_detail
+
+_DETAIL = {
+    "noteId": "1",
+    "title": "标题 with \"quotes\"",
+    "imageList": [{"width": 1080, "ratio": 0.75, "tags": []}],
+    "video": None,
+    "bigNumber": 2**70,
+}
+
+
+def test_save_note_detail_pretty_is_stdlib_compatible(tmp_path: Path) -> None:
+    path = save_note_detail(_DETAIL, tmp_path / "note.json")
+
+    assert path.read_text(encoding="utf-8") == json.dumps(
+        _DETAIL, ensure_ascii=False, indent=4
+    )
+
+
+def test_save_note_detail_compact_round_trips(tmp_path: Path) -> None:
+    path = save_note_detail(_DETAIL, tmp_path / "note.json", compact=True)
+
+    content = path.read_text(encoding="utf-8")
+    assert "\n" not in content
+    assert json_backend.loads(content) == _DETAIL
+
+
+def test_json_lines_sink_rotates_and_compresses(tmp_path: Path) -> None:
+    import gzip
+
+    from xhsnote_parser.storage import JsonLinesSink
+
+    notes = [dict(_DETAIL, noteId=str(index), bigNumber=1) for index in range(6)]
+    with JsonLinesSink(tmp_path, compression="gzip", rotate_bytes=300) as sink:
+        for note in notes:
+            sink.write(note, {"note": {"id": note["noteId"]}})
+
+    note_files = sorted(tmp_path.glob("notes-*.jsonl.gz"))
+    assert len(note_files) > 1
+    records = [
+        json.loads(line)
+        for path in note_files
+        for line in gzip.decompress(path.read_bytes()).decode("utf-8").splitlines()
+    ]
+    assert records == notes
+    assert sorted(tmp_path.glob("initial_state-*.jsonl.gz"))
+
+    with JsonLinesSink(tmp_path, compression="gzip") as sink:
+        sink.write(notes[0])
+    assert len(sorted(tmp_path.glob("notes-*.jsonl.gz"))) == len(note_files) + 1
+
+
+def test_background_writer_flushes_and_reports_errors() -> None:
+    import time
+
+    from xhsnote_parser.storage import BackgroundWriter, NoteSink
+
+    class _SlowSink(NoteSink):
+        def __init__(self) -> None:
+            self.written: list = []
+            self.closed = False
+
+        def write(self, note_detail: dict, initial_state: object = None) -> str:
+            time.sleep(0.01)
+            if note_detail["noteId"] == "bad":
+                raise OSError("disk full")
+            self.written.append(note_detail["noteId"])
+            return f"mem://{note_detail['noteId']}"
+
+        def close(self) -> None:
+            self.closed = True
+
+    outcomes: dict = {}
+    sink = _SlowSink()
+    with BackgroundWriter(sink, max_pending=2) as writer:
+        for note_id in ["1", "bad", "2", "3"]:
+            writer.submit(
+                {"noteId": note_id},
+                on_done=lambda location, error, key=note_id: outcomes.__setitem__(
+                    key, (location, type(error).__name__ if error else None)
+                ),
+            )
+            # Two queued writes plus the one the writer thread is handling.
+            assert writer.pending <= 3
+
+    assert sink.closed
+    assert sink.written == ["1", "2", "3"]
+    assert outcomes["bad"] == (None, "OSError")
+    assert outcomes["3"] == ("mem://3", None)
+    assert (writer.written, writer.failed) == (3, 1)
+
+
+def test_save_note_detail_leaves_no_temp_files(tmp_path: Path) -> None:
+    save_note_detail(_DETAIL, tmp_path / "note.json")
+    save_note_detail(_DETAIL, tmp_path / "note.json", compact=True)
+
+    assert [path.name for path in tmp_path.iterdir()] == ["note.json"]
+
+
+def test_create_sink_rejects_zstd_without_zstandard(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from xhsnote_parser.storage import NoteSink, create_sink
+
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    with pytest.raises(RuntimeError, match="zstandard"):
+        create_sink("jsonl", tmp_path, compression="zstd")
+    assert not list(tmp_path.iterdir())
+    with pytest.raises(TypeError):
+        NoteSink()  # type: ignore[abstract]
+
+
+def test_create_sink_projects_fields_only_when_serializing(tmp_path: Path) -> None:
+    import sqlite3
+
+    from xhsnote_parser.storage import create_sink
+
+    note = {
+        "noteId": "1",
+        "title": "标题",
+        "desc": "正文",
+        "user": {"userId": "u1", "nickname": "作者"},
+        "time": "2024-01-01 00:00:00",
+    }
+    with create_sink("dir", tmp_path / "dir", fields=["desc"]) as sink:
+        location = sink.write(note)
+    assert Path(location) == tmp_path / "dir" / "作者_notes" / "标题_1_noteDetail.json"
+    assert json.loads(Path(location).read_text(encoding="utf-8")) == {
+        "noteId": "1",
+        "desc": "正文",
+    }
+
+    with create_sink("sqlite", tmp_path / "db", fields=["desc"]) as sink:
+        sink.write(note)
+    with sqlite3.connect(str(tmp_path / "db" / "notes.db")) as conn:
+        row = conn.execute("SELECT title, nickname, detail FROM notes").fetchone()
+    assert row[:2] == ("标题", "作者")
+    assert json.loads(row[2]) == {"noteId": "1", "desc": "正文"}
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip"])
+def test_json_lines_sink_reports_notes_only_once_on_disk(
+    tmp_path: Path, compression: str
+) -> None:
+    import zlib
+
+    from xhsnote_parser.storage import JsonLinesSink
+
+    on_disk = []
+
+    def _on_durable(location, error) -> None:
+        assert error is None
+        data = Path(location).read_bytes()
+        if compression == "gzip":
+            data = zlib.decompressobj(wbits=31).decompress(data)
+        on_disk.append(data.decode("utf-8").count("\n"))
+
+    with JsonLinesSink(
+        tmp_path, compression=compression, flush_records=2, flush_interval=60
+    ) as sink:
+        for index in range(3):
+            sink.write_durable(dict(_DETAIL, noteId=str(index)), None, _on_durable)
+        assert on_disk == [2, 2]
+
+    assert on_disk == [2, 2, 3]
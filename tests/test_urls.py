@@ -0,0 +1,33 @@
+from xhsnote_parser.urls import dedupe_note_urls, extract_note_id
+
+_NOTE_ID = "6881b41c000000000b02ff0f"
+_OTHER_ID = "6947da58000000001e0036f3"
+
+
+def test_extract_note_id_from_profile_paths_and_share_links() -> None:
+    assert (
+        extract_note_id(
+            f"https://www.xiaohongshu.com/user/profile/5f00/{_NOTE_ID.upper()}"
+        )
+        == _NOTE_ID
+    )
+    assert extract_note_id("https://www.xiaohongshu.com/user/profile/1") is None
+    assert extract_note_id("http://xhslink.com/a/AbCdEf") is None
+
+
+def test_dedupe_note_urls_keeps_tokenized_url_in_first_position() -> None:
+    urls = [
+        f"https://www.xiaohongshu.com/explore/{_NOTE_ID}",
+        f"https://www.xiaohongshu.com/explore/{_OTHER_ID}?xsec_token=one",
+        f"https://www.xiaohongshu.com/discovery/item/{_NOTE_ID}?xsec_token=tok",
+        f"https://www.xiaohongshu.com/explore/{_NOTE_ID}?xsec_token=later",
+        f"https://www.xiaohongshu.com/explore/{_OTHER_ID}?xsec_token=two",
+        "http://xhslink.com/a/AbCdEf",
+        "http://xhslink.com/a/AbCdEf",
+    ]
+
+    assert dedupe_note_urls(urls) == [
+        f"https://www.xiaohongshu.com/discovery/item/{_NOTE_ID}?xsec_token=tok",
+        f"https://www.xiaohongshu.com/explore/{_OTHER_ID}?xsec_token=one",
+        "http://xhslink.com/a/AbCdEf",
+    ]
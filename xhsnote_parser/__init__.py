@@ -2,6 +2,24 @@
 
 from .http_client import DEFAULT_TIMEOUT
 from .logging_utils import configure_logging
-from .service import parse_note
+from .models import NoteDetail
+from .service import (
+    ParseResult,
+    create_parse_pool,
+    parse_many_async,
+    parse_note,
+    parse_note_async,
+    parse_notes,
+)
 
-__all__ = ["parse_note", "DEFAULT_TIMEOUT", "configure_logging"]
+__all__ = [
+    "parse_note",
+    "parse_note_async",
+    "parse_many_async",
+    "parse_notes",
+    "ParseResult",
+    "create_parse_pool",
+    "NoteDetail",
+    "DEFAULT_TIMEOUT",
+    "configure_logging",
+]
@@ -0,0 +1,296 @@
+import logging
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from . import json_backend
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COMPRESSIONS = ("zlib", "zstd")
+DEFAULT_SEGMENT_BYTES = 256 * 1024 * 1024
+_SEGMENT_PREFIX = "state-"
+_SEGMENT_SUFFIX = ".seg"
+_INDEX_SUFFIX = ".idx"
+_MAGIC = b"XHA1"
+# magic, compression id, noteId length, payload length, payload crc32
+_HEADER = struct.Struct(">4sBHII")
+_COMPRESSION_IDS = {"zlib": 1, "zstd": 2}
+
+
+class ArchiveLocation(NamedTuple):
+    segment: Path
+    offset: int
+    length: int
+
+
+def _compressor(compression: str) -> Callable[[bytes], bytes]:
+    if compression == "zlib":
+        return lambda data: zlib.compress(data, 6)
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise RuntimeError(
+            "zstd 压缩需要安装 zstandard: pip install zstandard"
+        ) from exc
+    return zstandard.ZstdCompressor(level=3).compress
+
+
+def _decompress(compression_id: int, data: bytes) -> bytes:
+    if compression_id == _COMPRESSION_IDS["zlib"]:
+        return zlib.decompress(data)
+    if compression_id == _COMPRESSION_IDS["zstd"]:
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"未知的压缩类型: {compression_id}")
+
+
+def _read_record(handle: BinaryIO) -> Optional[Tuple[str, int, bytes]]:
+    """Read one record at the current position; ``None`` at a clean or torn end."""
+    header = handle.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    magic, compression_id, id_length, payload_length, checksum = _HEADER.unpack(header)
+    if magic != _MAGIC:
+        raise ValueError("归档记录头损坏")
+    body = handle.read(id_length + payload_length)
+    if len(body) < id_length + payload_length:
+        return None
+    payload = body[id_length:]
+    if zlib.crc32(payload) != checksum:
+        raise ValueError("归档记录校验失败")
+    return body[:id_length].decode("utf-8"), compression_id, payload
+
+
+def read_record(location: ArchiveLocation) -> Dict[str, Any]:
+    """Decode the record at ``location``; usable from any process."""
+    with location.segment.open("rb") as handle:
+        handle.seek(location.offset)
+        record = _read_record(handle)
+    if record is None:
+        raise ValueError(f"归档记录不完整: {location.segment}@{location.offset}")
+    _, compression_id, payload = record
+    return json_backend.loads(_decompress(compression_id, payload).decode("utf-8"))
+
+
+def _iter_records(
+    segment: Path, start: int = 0
+) -> Iterator[Tuple[str, ArchiveLocation, int, bytes]]:
+    with segment.open("rb") as handle:
+        handle.seek(start)
+        while True:
+            offset = handle.tell()
+            record = _read_record(handle)
+            if record is None:
+                return
+            note_id, compression_id, payload = record
+            location = ArchiveLocation(segment, offset, handle.tell() - offset)
+            yield note_id, location, compression_id, payload
+
+
+def scan_segment(
+    segment: Path, start: int = 0
+) -> Iterator[Tuple[str, ArchiveLocation]]:
+    """Yield ``(noteId, location)`` for every complete record from ``start``
+    (a record boundary), in write order."""
+    for note_id, location, _, _ in _iter_records(segment, start):
+        yield note_id, location
+
+
+def is_segment_name(filename: str) -> bool:
+    return filename.startswith(_SEGMENT_PREFIX) and filename.endswith(_SEGMENT_SUFFIX)
+
+
+class StateArchive:
+    """Append-only archive of compressed ``__INITIAL_STATE__`` records.
+
+    Records go to ``state-00001.seg`` segments, each record compressed on its
+    own so any one can be read without touching its neighbours. Every segment
+    has an ``.idx`` sidecar of ``noteId\\toffset\\tlength`` lines, loaded on
+    open for :meth:`get`; :meth:`replay` walks the segments sequentially. A
+    later record for the same noteId shadows earlier ones. A crash can at
+    worst leave a torn record at a segment tail, which is ignored on read, or
+    a record whose index line was never written, which is recovered on open
+    by scanning the segment past its last good index entry.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        compression: str = "zlib",
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+    ) -> None:
+        if compression not in ARCHIVE_COMPRESSIONS:
+            raise ValueError(f"不支持的归档压缩格式: {compression}")
+        self.directory = directory
+        self.compression = compression
+        self.segment_bytes = segment_bytes
+        self._compress = _compressor(compression)
+        self._index: Dict[str, ArchiveLocation] = {}
+        self._segment: Optional[Path] = None
+        self._handle: Optional[BinaryIO] = None
+        self._index_handle: Optional[BinaryIO] = None
+        self._lock = threading.Lock()
+        directory.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def segments(self) -> List[Path]:
+        return sorted(self.directory.glob(f"{_SEGMENT_PREFIX}*{_SEGMENT_SUFFIX}"))
+
+    def _load_index(self) -> None:
+        for segment in self.segments():
+            size = segment.stat().st_size
+            index_path = segment.with_suffix(_INDEX_SUFFIX)
+            indexed_end = 0
+            if index_path.exists():
+                indexed_end = self._read_index(segment, index_path, size)
+            else:
+                logger.warning("归档段缺少索引，重新扫描: %s", segment)
+            if indexed_end < size:
+                recovered = 0
+                for note_id, location in scan_segment(segment, indexed_end):
+                    self._index[note_id] = location
+                    recovered += 1
+                if recovered and indexed_end:
+                    logger.warning(
+                        "归档段 %s 有 %d 条记录未写入索引，已重新扫描补齐",
+                        segment,
+                        recovered,
+                    )
+
+    def _read_index(self, segment: Path, index_path: Path, size: int) -> int:
+        """Load ``index_path``; return the end offset of the last indexed record.
+
+        Reading stops at the first torn or corrupt line (a crash can cut one
+        off mid-length), so the segment is rescanned from the last good entry.
+        """
+        indexed_end = 0
+        with index_path.open("r", encoding="utf-8") as handle:
+            for line_number, line in enumerate(handle, start=1):
+                parts = line.rstrip("\n").split("\t")
+                location = None
+                if line.endswith("\n") and len(parts) == 3:
+                    try:
+                        location = ArchiveLocation(
+                            segment, int(parts[1]), int(parts[2])
+                        )
+                    except ValueError:
+                        pass
+                if location is None:
+                    logger.warning(
+                        "归档索引 %s 第 %d 行损坏，其后的记录将从段内重新扫描",
+                        index_path,
+                        line_number,
+                    )
+                    break
+                offset, length = location.offset, location.length
+                if offset + length <= size:
+                    self._index[parts[0]] = location
+                    indexed_end = max(indexed_end, offset + length)
+        return indexed_end
+
+    def _open_segment(self) -> None:
+        self._close_handles()
+        segments = self.segments()
+        number = 1
+        if segments:
+            number = int(segments[-1].stem[len(_SEGMENT_PREFIX) :]) + 1
+        name = f"{_SEGMENT_PREFIX}{number:05d}{_SEGMENT_SUFFIX}"
+        self._segment = self.directory / name
+        self._handle = self._segment.open("ab")
+        self._index_handle = self._segment.with_suffix(_INDEX_SUFFIX).open("ab")
+        logger.info("开始写入归档段 %s", self._segment)
+
+    def append(self, note_id: str, record: Dict[str, Any]) -> ArchiveLocation:
+        payload = self._compress(
+            json_backend.dumps(record, compact=True).encode("utf-8")
+        )
+        key = note_id.encode("utf-8")
+        data = (
+            _HEADER.pack(
+                _MAGIC,
+                _COMPRESSION_IDS[self.compression],
+                len(key),
+                len(payload),
+                zlib.crc32(payload),
+            )
+            + key
+            + payload
+        )
+        with self._lock:
+            if self._handle is None or (
+                self._handle.tell() > 0
+                and self._handle.tell() + len(data) > self.segment_bytes
+            ):
+                self._open_segment()
+            assert self._handle is not None and self._index_handle is not None
+            assert self._segment is not None
+            offset = self._handle.tell()
+            self._handle.write(data)
+            self._handle.flush()
+            self._index_handle.write(f"{note_id}\t{offset}\t{len(data)}\n".encode())
+            self._index_handle.flush()
+            location = ArchiveLocation(self._segment, offset, len(data))
+            self._index[note_id] = location
+        return location
+
+    def locations(self) -> List[Tuple[str, ArchiveLocation]]:
+        """Current ``(noteId, location)`` pairs in write order, without the
+        records a later append shadowed."""
+        with self._lock:
+            items = list(self._index.items())
+        return sorted(items, key=lambda item: (item[1].segment, item[1].offset))
+
+    def locate(self, note_id: str) -> Optional[ArchiveLocation]:
+        with self._lock:
+            return self._index.get(note_id)
+
+    def get(self, note_id: str) -> Optional[Dict[str, Any]]:
+        location = self.locate(note_id)
+        return read_record(location) if location is not None else None
+
+    def replay(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield every record in write order, including shadowed ones."""
+        for segment in self.segments():
+            for note_id, _, compression_id, payload in _iter_records(segment):
+                text = _decompress(compression_id, payload).decode("utf-8")
+                yield note_id, json_backend.loads(text)
+
+    def __contains__(self, note_id: object) -> bool:
+        with self._lock:
+            return note_id in self._index
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index)
+
+    def _close_handles(self) -> None:
+        for handle in (self._handle, self._index_handle):
+            if handle is not None:
+                handle.close()
+        self._handle = None
+        self._index_handle = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_handles()
+
+    def __enter__(self) -> "StateArchive":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -1,44 +1,64 @@
 import argparse
 import logging
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional
 
-from .http_client import DEFAULT_TIMEOUT
-from .logging_utils import configure_logging, resolve_log_level
-from .service import parse_note
-from .storage import save_note_detail
+import requests
+
+from . import json_backend
+from .archive import StateArchive
+from .http_client import (
+    DEFAULT_POOL_SIZE,
+    DEFAULT_TIMEOUT,
+    connection_stats,
+    create_session,
+)
+from .logging_utils import configure_logging, parse_module_levels, resolve_log_level
+from .manifest import MANIFEST_FILENAME, RunManifest
+from .media import DEFAULT_MEDIA_WORKERS, MEDIA_FIELDS, MediaDownloader
+from .metrics import METRICS_FORMATS, RunMetrics
+from .offline import rebuild_notes
+from .response_cache import DEFAULT_CACHE_MAX_BYTES, DEFAULT_CACHE_TTL, ResponseCache
+from .retry import CircuitBreaker, RetryPolicy
+from .scheduler import (
+    DEFAULT_MAX_RATE,
+    DEFAULT_MIN_RATE,
+    DEFAULT_THROTTLE_RETRIES,
+    RequestScheduler,
+)
+from .server import (
+    DEFAULT_NOTE_CACHE_SIZE,
+    DEFAULT_NOTE_CACHE_TTL,
+    DEFAULT_SERVE_HOST,
+    DEFAULT_SERVE_PORT,
+    NoteCache,
+    NoteService,
+    serve,
+)
+from .service import create_parse_pool, parse_note, parse_notes
+from .storage import (
+    COMPRESSIONS,
+    DEFAULT_WRITER_QUEUE,
+    OUTPUT_FORMATS,
+    BackgroundWriter,
+    StateArchiveSink,
+    create_sink,
+)
+from .urls import dedupe_note_urls, iter_url_lines
 
 logger = logging.getLogger(__name__)
-_INVALID_FILENAME_CHARS = set('<>:"/\\|?*')
 _DEFAULT_OUTPUT_DIR = Path("output")
 _DEFAULT_LOG_DIR = Path("logs")
 _DEFAULT_ENV_PATH = Path(".env")
-
-
-def _sanitize_segment(value: Optional[Any], fallback: str) -> str:
-    if value in (None, ""):
-        text = ""
-    else:
-        text = str(value)
-    sanitized = []
-    for char in text:
-        if char in _INVALID_FILENAME_CHARS or ord(char) < 32:
-            sanitized.append("_")
-        else:
-            sanitized.append(char)
-    cleaned = "".join(sanitized).strip().rstrip(". ")
-    return cleaned or fallback
-
-
-def _build_output_path(
-    note_detail: Dict[str, Any], base_dir: Path, *, suffix: str = "noteDetail"
-) -> Path:
-    user = note_detail.get("user") or {}
-    author = _sanitize_segment(user.get("nickname"), "unknown_author")
-    title = _sanitize_segment(note_detail.get("title"), "untitled")
-    note_id = _sanitize_segment(note_detail.get("noteId"), "note")
-    filename = f"{title}_{note_id}_{suffix}.json"
-    return base_dir / f"{author}_notes" / filename
+_DEFAULT_WORKERS = 1
+_DEFAULT_RETRIES = 2
+_DEFAULT_BREAKER_THRESHOLD = 0.5
+_DEFAULT_BREAKER_COOLDOWN = 30.0
 
 
 def _load_urls_from_file(path: Path) -> List[str]:
@@ -47,14 +67,9 @@ def _load_urls_from_file(path: Path) -> List[str]:
     if not path.is_file():
         raise ValueError(f"输入路径不是文件: {path}")
 
-    urls: List[str] = []
     try:
         with path.open("r", encoding="utf-8") as handle:
-            for raw_line in handle:
-                text = raw_line.strip()
-                if not text or text.startswith("#"):
-                    continue
-                urls.append(text)
+            urls = list(iter_url_lines(handle))
     except OSError as exc:
         raise ValueError(f"读取输入文件失败: {path}: {exc}") from exc
     return urls
@@ -70,12 +85,16 @@ def _collect_input_urls(urls: Iterable[str], input_file: Optional[Path]) -> List
     if input_file:
         collected.extend(_load_urls_from_file(input_file))
 
-    unique_urls: List[str] = []
-    seen: set[str] = set()
-    for url in collected:
-        if url not in seen:
-            unique_urls.append(url)
-            seen.add(url)
+    unique_urls = dedupe_note_urls(collected)
+    if collected:
+        duplicates = len(collected) - len(unique_urls)
+        logger.info(
+            "输入 URL %d 条，按 noteId 去重后 %d 条（重复 %d 条，占 %.1f%%）",
+            len(collected),
+            len(unique_urls),
+            duplicates,
+            duplicates / len(collected) * 100,
+        )
     return unique_urls
 
 
@@ -126,6 +145,24 @@ def _resolve_int_option(
         parser.error(f"{env_key} 必须是整数（.env 配置无效）: {exc}")
 
 
+def _resolve_float_option(
+    cli_value: Optional[float],
+    env_values: Dict[str, str],
+    env_key: str,
+    default: float,
+    parser: argparse.ArgumentParser,
+) -> float:
+    if cli_value is not None:
+        return cli_value
+    raw_value = env_values.get(env_key)
+    if raw_value is None:
+        return default
+    try:
+        return float(raw_value)
+    except ValueError as exc:
+        parser.error(f"{env_key} 必须是数字（.env 配置无效）: {exc}")
+
+
 def _resolve_bool_option(
     cli_value: Optional[bool],
     env_values: Dict[str, str],
@@ -146,6 +183,25 @@ def _resolve_bool_option(
     parser.error(f"{env_key} 只能设置为 true/false")
 
 
+def _resolve_choice_option(
+    cli_value: Optional[str],
+    env_values: Dict[str, str],
+    env_key: str,
+    default: str,
+    choices: Iterable[str],
+    parser: argparse.ArgumentParser,
+) -> str:
+    if cli_value is not None:
+        return cli_value
+    raw_value = env_values.get(env_key)
+    if raw_value is None:
+        return default
+    normalized = raw_value.strip().lower()
+    if normalized not in choices:
+        parser.error(f"{env_key} 只能设置为 {'/'.join(choices)}")
+    return normalized
+
+
 def _resolve_log_level_option(
     cli_value: Optional[int],
     env_values: Dict[str, str],
@@ -191,6 +247,281 @@ def _resolve_optional_path(
     return Path(raw_value).expanduser()
 
 
+class _Progress:
+    """Thread-safe completion counter for batch progress logging."""
+
+    def __init__(self, total: int) -> None:
+        self._total = total
+        self._done = 0
+        self._lock = threading.Lock()
+
+    def advance(self) -> int:
+        with self._lock:
+            self._done += 1
+            done = self._done
+        logger.info("完成进度 [%d/%d]", done, self._total)
+        return done
+
+
+class _BatchResults:
+    """Collect per-URL outcomes from worker and writer threads.
+
+    With ``keep_failures=False`` only the counters are kept, for unbounded
+    inputs where a list of failed URLs would grow with the stream.
+    """
+
+    def __init__(self, manifest: RunManifest, *, keep_failures: bool = True) -> None:
+        self.manifest = manifest
+        self.succeeded = 0
+        self.failed = 0
+        self.failures: List[str] = []
+        self.keep_failures = keep_failures
+        self._lock = threading.Lock()
+
+    def record_success(self, url: str, note_id: Optional[str], location: str) -> None:
+        logger.info("已保存到: %s", location)
+        self.manifest.record_success(url, note_id, location)
+        with self._lock:
+            self.succeeded += 1
+
+    def record_failure(self, url: str, exc: BaseException) -> None:
+        logger.error("解析失败 [%s]: %s", url, exc)
+        self.manifest.record_failure(url, f"{type(exc).__name__}: {exc}")
+        with self._lock:
+            self.failed += 1
+            if self.keep_failures:
+                self.failures.append(url)
+
+
+def _process_url(
+    url: str,
+    *,
+    index: int,
+    total: int,
+    parse_options: Dict[str, Any],
+    writer: BackgroundWriter,
+    save_initial_state: bool,
+    results: _BatchResults,
+    media: Optional[MediaDownloader] = None,
+) -> None:
+    logger.info("解析进度 [%d/%d]: %s", index, total, url)
+    initial_state_holder: Dict[str, Any] = {}
+
+    def _capture_initial_state(state: Dict[str, Any]) -> None:
+        initial_state_holder["value"] = state
+
+    state_callback = _capture_initial_state if save_initial_state else None
+    try:
+        note_detail = parse_note(
+            url,
+            output_path=None,
+            on_initial_state=state_callback,
+            **parse_options,
+        )
+    except Exception as exc:  # pylint: disable=broad-except
+        results.record_failure(url, exc)
+        return
+    _submit_note(
+        url,
+        note_detail,
+        initial_state_holder.get("value"),
+        writer=writer,
+        results=results,
+        media=media,
+    )
+
+
+def _submit_note(
+    url: str,
+    note_detail: Dict[str, Any],
+    initial_state: Optional[Dict[str, Any]],
+    *,
+    writer: BackgroundWriter,
+    results: _BatchResults,
+    media: Optional[MediaDownloader] = None,
+) -> None:
+    def _on_written(location: Optional[str], error: Optional[BaseException]) -> None:
+        if error is not None:
+            results.record_failure(url, error)
+        else:
+            results.record_success(url, note_detail.get("noteId"), location or "")
+
+    writer.submit(note_detail, initial_state, on_done=_on_written)
+    if media is not None:
+        media.submit(note_detail)
+
+
+def _run_batch(
+    urls: List[str],
+    *,
+    parse_options: Dict[str, Any],
+    workers: int,
+    pool_size: int,
+    writer: BackgroundWriter,
+    save_initial_state: bool,
+    results: _BatchResults,
+    media: Optional[MediaDownloader] = None,
+) -> None:
+    total = len(urls)
+    progress = _Progress(total) if workers > 1 else None
+
+    def _run(index: int, url: str) -> None:
+        _process_url(
+            url,
+            index=index,
+            total=total,
+            parse_options=parse_options,
+            writer=writer,
+            save_initial_state=save_initial_state,
+            results=results,
+            media=media,
+        )
+        if progress is not None:
+            progress.advance()
+
+    with create_session(pool_size=pool_size) as session:
+        parse_options = {**parse_options, "session": session}
+        if workers == 1:
+            for index, url in enumerate(urls, start=1):
+                _run(index, url)
+        else:
+            logger.info("启用并发解析，线程数 %d", workers)
+            with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="xhsnote"
+            ) as executor:
+                futures = [
+                    executor.submit(_run, index, url)
+                    for index, url in enumerate(urls, start=1)
+                ]
+                for future in as_completed(futures):
+                    future.result()
+        _log_run_stats(session, parse_options)
+
+
+def _run_stream(
+    urls: Iterable[str],
+    *,
+    parse_options: Dict[str, Any],
+    workers: int,
+    pool_size: int,
+    writer: BackgroundWriter,
+    save_initial_state: bool,
+    results: _BatchResults,
+    media: Optional[MediaDownloader] = None,
+) -> None:
+    """Parse URLs as they arrive from an unbounded source such as stdin."""
+    logger.info("流式读取 URL，并发线程数 %d", workers)
+    handled = 0
+    with create_session(pool_size=pool_size) as session:
+        parse_options = {**parse_options, "session": session}
+        for result in parse_notes(
+            urls,
+            workers=workers,
+            include_initial_state=save_initial_state,
+            **parse_options,
+        ):
+            handled += 1
+            if result.error is not None:
+                results.record_failure(result.url, result.error)
+            else:
+                assert result.note_detail is not None
+                _submit_note(
+                    result.url,
+                    result.note_detail,
+                    result.initial_state,
+                    writer=writer,
+                    results=results,
+                    media=media,
+                )
+            if handled % 1000 == 0:
+                logger.info("流式解析进度: 已处理 %d 条", handled)
+        _log_run_stats(session, parse_options)
+
+
+def _log_run_stats(session: requests.Session, parse_options: Dict[str, Any]) -> None:
+    stats = connection_stats(session)
+    logger.info(
+        "HTTP 连接统计: 请求 %d 次，新建连接 %d 个，复用 %d 次",
+        stats.requests,
+        stats.connections,
+        stats.reused,
+    )
+    scheduler = parse_options.get("scheduler")
+    if scheduler is not None:
+        logger.info(
+            "限速统计: 被限流 %d 次，最终速率 %s",
+            scheduler.throttled,
+            scheduler.describe() or "-",
+        )
+    breaker = parse_options.get("circuit_breaker")
+    if breaker is not None and breaker.trips:
+        logger.warning("本次运行熔断 %d 次", breaker.trips)
+    cache = parse_options.get("cache")
+    if cache is not None:
+        logger.info("响应缓存统计: 命中 %d 次，未命中 %d 次", cache.hits, cache.misses)
+
+
+def _report_metrics(
+    metrics: RunMetrics, metrics_file: Optional[Path], metrics_format: Optional[str]
+) -> None:
+    metrics.log_summary()
+    if metrics_file is not None:
+        try:
+            metrics.export(metrics_file, metrics_format or None)
+        except OSError as exc:
+            logger.error("写入运行指标失败 %s: %s", metrics_file, exc)
+
+
+def _run_reparse(
+    root: Path,
+    *,
+    writer: BackgroundWriter,
+    processes: Optional[int],
+    fields: Optional[List[str]] = None,
+) -> int:
+    """Rebuild saved notes under ``root`` into ``writer``; returns failures."""
+    rebuilt = 0
+    failures = 0
+    for result in rebuild_notes(root, processes=processes, fields=fields):
+        if result.error is not None:
+            failures += 1
+            logger.error("离线重建失败 [%s]: %s", result.label, result.error)
+            continue
+        rebuilt += 1
+        writer.submit(result.note_detail)
+        if rebuilt % 1000 == 0:
+            logger.info("离线重建进度: 已完成 %d 条", rebuilt)
+    logger.info("离线重建完成: 成功 %d 条，失败 %d 条", rebuilt, failures)
+    return failures
+
+
+def _run_server(
+    parse_options: Dict[str, Any],
+    *,
+    host: str,
+    port: int,
+    pool_size: int,
+    parse_processes: int,
+    note_cache: NoteCache,
+) -> None:
+    # Per-stage samples would grow without bound in a long-lived process.
+    parse_options = {
+        key: value for key, value in parse_options.items() if key != "on_stage"
+    }
+    parse_pool = None
+    if parse_processes:
+        processes = parse_processes if parse_processes > 0 else os.cpu_count() or 1
+        parse_pool = create_parse_pool(processes)
+        logger.info("解析进程池已启动，进程数 %d", processes)
+        parse_options["parse_pool"] = parse_pool
+    service = NoteService(cache=note_cache, pool_size=pool_size, **parse_options)
+    try:
+        serve(service, host=host, port=port)
+    finally:
+        if parse_pool is not None:
+            parse_pool.shutdown()
+
+
 def build_argument_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="解析小红书笔记并输出 noteDetail.json"
@@ -198,7 +529,7 @@ def build_argument_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "urls",
         nargs="*",
-        help="需要解析的小红书 URL，可一次提供多个",
+        help="需要解析的小红书 URL，可一次提供多个；传入 - 则逐行从标准输入读取，传入 serve 则启动本地解析服务",
     )
     parser.add_argument(
         "-f",
@@ -253,6 +584,26 @@ def build_argument_parser() -> argparse.ArgumentParser:
         default=None,
         help="日志目录，默认 logs 或 .env 中的配置，仅当写文件日志时生效",
     )
+    parser.add_argument(
+        "--log-queue",
+        dest="log_queue",
+        action="store_true",
+        help="日志经队列由后台线程写出，工作线程不再阻塞于日志 I/O；并发线程数大于 1 时默认开启",
+    )
+    parser.add_argument(
+        "--no-log-queue",
+        dest="log_queue",
+        action="store_false",
+        help="关闭队列日志，直接在调用线程中写日志",
+    )
+    parser.add_argument(
+        "--log-module-level",
+        dest="log_module_levels",
+        action="append",
+        default=None,
+        metavar="MODULE=LEVEL",
+        help="单独设置某个模块的日志等级，如 xhsnote_parser.note_detail=WARNING，可重复传入",
+    )
     parser.add_argument(
         "--save-initial-state",
         dest="save_initial_state",
@@ -265,7 +616,240 @@ def build_argument_parser() -> argparse.ArgumentParser:
         action="store_false",
         help="显式关闭 __INITIAL_STATE__ 写盘，优先生效",
     )
-    parser.set_defaults(save_log=None, save_initial_state=None)
+    parser.add_argument(
+        "--fields",
+        default=None,
+        help="只输出逗号分隔的字段，支持点号取子字段，例如 title,desc,user.nickname,imageList.urlNoWatermark；noteId 始终保留",
+    )
+    parser.add_argument(
+        "--state-archive",
+        type=Path,
+        default=None,
+        metavar="DIR",
+        help="将 __INITIAL_STATE__ 逐条压缩追加到 DIR 下带索引的归档段（state-*.seg），代替逐篇 _initial_state.json；隐含 --save-initial-state",
+    )
+    parser.add_argument(
+        "--reparse",
+        type=Path,
+        default=None,
+        metavar="DIR",
+        help="离线重建模式：遍历目录中保存的 *.html、*_initial_state.json 与 initial_state-*.jsonl，不联网重新生成 noteDetail 输出",
+    )
+    parser.add_argument(
+        "--download-media",
+        dest="download_media",
+        action="store_true",
+        help="解析后并发下载无水印图片与视频，支持断点续传，已存在的 traceId 文件自动跳过，可由 .env 预设",
+    )
+    parser.add_argument(
+        "--no-download-media",
+        dest="download_media",
+        action="store_false",
+        help="显式关闭媒体下载",
+    )
+    parser.add_argument(
+        "--media-dir",
+        type=Path,
+        default=None,
+        help="媒体文件根目录，默认与输出目录相同，文件位于 <作者>_notes/<noteId>_media/ 下",
+    )
+    parser.add_argument(
+        "--media-workers",
+        type=int,
+        default=None,
+        help=f"媒体下载并发线程数（同时也是连接池大小），默认 {DEFAULT_MEDIA_WORKERS}",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="并发解析的线程数，默认 1（顺序执行），可通过 .env 中的 XHSNOTE_WORKERS 设置",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=None,
+        help="HTTP 连接池大小（保持长连接复用），默认取 10 与并发线程数中的较大值",
+    )
+    parser.add_argument(
+        "--stream",
+        dest="stream",
+        action="store_true",
+        help="流式读取页面，读到 __INITIAL_STATE__ 结束标签后立即断开连接，可由 .env 预设",
+    )
+    parser.add_argument(
+        "--no-stream",
+        dest="stream",
+        action="store_false",
+        help="显式关闭流式读取，完整下载页面后再解析",
+    )
+    parser.add_argument(
+        "--compact-json",
+        dest="compact_json",
+        action="store_true",
+        help="以紧凑格式（无缩进）写出 JSON，默认保持 4 空格缩进，可由 .env 预设",
+    )
+    parser.add_argument(
+        "--no-compact-json",
+        dest="compact_json",
+        action="store_false",
+        help="显式使用带缩进的 JSON 输出",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="启用磁盘响应缓存并指定目录（按 noteId 缓存页面），可由 XHSNOTE_CACHE_DIR 预设",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="禁用响应缓存，即使 .env 中配置了 XHSNOTE_CACHE_DIR",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=int,
+        default=None,
+        help="缓存有效期（秒），默认 86400，可由 XHSNOTE_CACHE_TTL 设置",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=None,
+        help="缓存目录容量上限（MB），超出后按最近最少使用淘汰，默认 1024",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        default=None,
+        help="进度清单路径（JSON Lines，逐条追加），默认 <输出目录>/manifest.jsonl",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="根据进度清单跳过已成功的笔记，仅处理未完成或失败的 URL",
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="仅重新解析进度清单中最近一次记录为失败的 URL，可不再提供输入",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default=None,
+        help="输出格式：dir 为按作者分目录的单文件 JSON（默认），jsonl 为聚合的 JSON Lines，sqlite 为可查询的 notes.db",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=COMPRESSIONS,
+        default=None,
+        help="jsonl 输出的压缩方式，默认 none，zstd 需安装 zstandard",
+    )
+    parser.add_argument(
+        "--rotate-mb",
+        type=int,
+        default=None,
+        help="jsonl 单个文件的滚动大小（MB，按未压缩字节计），0 表示不滚动",
+    )
+    parser.add_argument(
+        "--writer-queue",
+        type=int,
+        default=None,
+        help="后台写盘队列长度，队列满时解析线程等待；0 表示在解析线程中同步写盘，默认 64",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=None,
+        help="每个域名的初始请求速率（次/秒），启用自适应限速：成功时线性提速，遇到 429/461/验证码时减半；默认 0 不限速",
+    )
+    parser.add_argument(
+        "--max-rate",
+        type=float,
+        default=None,
+        help="自适应限速允许达到的最高速率（次/秒），默认 20",
+    )
+    parser.add_argument(
+        "--throttle-retries",
+        type=int,
+        default=None,
+        help="被限流的请求在退避后重试的次数，默认 3",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=None,
+        help="连接失败、读取超时与 5xx 的重试次数（指数退避 + 随机抖动），默认 2",
+    )
+    parser.add_argument(
+        "--retry-backoff",
+        type=float,
+        default=None,
+        help="重试退避的基础秒数，第 n 次重试最多等待 backoff*2^(n-1) 秒，默认 0.5",
+    )
+    parser.add_argument(
+        "--breaker-threshold",
+        type=float,
+        default=None,
+        help="熔断错误率阈值（0~1），最近请求的失败比例达到该值时暂停整个批次；默认 0.5，0 表示关闭",
+    )
+    parser.add_argument(
+        "--breaker-cooldown",
+        type=float,
+        default=None,
+        help="熔断后暂停的秒数，默认 30",
+    )
+    parser.add_argument(
+        "--parse-processes",
+        type=int,
+        default=None,
+        help="在独立进程池中执行 JSON 解码与字段富化的进程数，0 表示关闭（默认），-1 表示使用全部 CPU 核",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=Path,
+        default=None,
+        help="运行结束后导出各阶段耗时分位数与字节数，.prom 后缀写 Prometheus textfile，其余写 JSON",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        choices=METRICS_FORMATS,
+        default=None,
+        help="指标文件格式，默认按 --metrics-file 后缀推断",
+    )
+    parser.add_argument(
+        "--host",
+        default=None,
+        help=f"serve 模式监听地址，默认 {DEFAULT_SERVE_HOST}",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=None,
+        help=f"serve 模式监听端口，默认 {DEFAULT_SERVE_PORT}",
+    )
+    parser.add_argument(
+        "--note-cache-size",
+        type=int,
+        default=None,
+        help=f"serve 模式内存中缓存的笔记条数（LRU），默认 {DEFAULT_NOTE_CACHE_SIZE}",
+    )
+    parser.add_argument(
+        "--note-cache-ttl",
+        type=int,
+        default=None,
+        help=f"serve 模式笔记缓存有效期（秒），默认 {DEFAULT_NOTE_CACHE_TTL}",
+    )
+    parser.set_defaults(
+        save_log=None,
+        log_queue=None,
+        save_initial_state=None,
+        stream=None,
+        compact_json=None,
+        download_media=None,
+    )
     return parser
 
 
@@ -318,72 +902,495 @@ def main(argv: Optional[List[str]] = None) -> None:
         False,
         parser,
     )
+    download_media = _resolve_bool_option(
+        args.download_media,
+        env_values,
+        "XHSNOTE_DOWNLOAD_MEDIA",
+        False,
+        parser,
+    )
+    media_workers = _resolve_int_option(
+        args.media_workers,
+        env_values,
+        "XHSNOTE_MEDIA_WORKERS",
+        DEFAULT_MEDIA_WORKERS,
+        parser,
+    )
+    if media_workers < 1:
+        parser.error("--media-workers 必须大于等于 1")
+    stream = _resolve_bool_option(
+        args.stream,
+        env_values,
+        "XHSNOTE_STREAM",
+        False,
+        parser,
+    )
+    compact_json = _resolve_bool_option(
+        args.compact_json,
+        env_values,
+        "XHSNOTE_COMPACT_JSON",
+        False,
+        parser,
+    )
+    cache_dir = None
+    if not args.no_cache:
+        cache_dir = _resolve_optional_path(
+            args.cache_dir,
+            env_values,
+            "XHSNOTE_CACHE_DIR",
+        )
+    cache_ttl = _resolve_int_option(
+        args.cache_ttl,
+        env_values,
+        "XHSNOTE_CACHE_TTL",
+        DEFAULT_CACHE_TTL,
+        parser,
+    )
+    cache_max_mb = _resolve_int_option(
+        args.cache_max_mb,
+        env_values,
+        "XHSNOTE_CACHE_MAX_MB",
+        DEFAULT_CACHE_MAX_BYTES // (1024 * 1024),
+        parser,
+    )
     output_dir = _resolve_path_option(
         args.output,
         env_values,
         "XHSNOTE_OUTPUT_DIR",
         _DEFAULT_OUTPUT_DIR,
     )
+    output_format = _resolve_choice_option(
+        args.output_format,
+        env_values,
+        "XHSNOTE_OUTPUT_FORMAT",
+        "dir",
+        OUTPUT_FORMATS,
+        parser,
+    )
+    compression = _resolve_choice_option(
+        args.compression,
+        env_values,
+        "XHSNOTE_COMPRESSION",
+        "none",
+        COMPRESSIONS,
+        parser,
+    )
+    rotate_mb = _resolve_int_option(
+        args.rotate_mb,
+        env_values,
+        "XHSNOTE_ROTATE_MB",
+        0,
+        parser,
+    )
+    if rotate_mb < 0:
+        parser.error("--rotate-mb 不能为负数")
+    rate_limit = _resolve_float_option(
+        args.rate_limit,
+        env_values,
+        "XHSNOTE_RATE_LIMIT",
+        0.0,
+        parser,
+    )
+    max_rate = _resolve_float_option(
+        args.max_rate,
+        env_values,
+        "XHSNOTE_MAX_RATE",
+        DEFAULT_MAX_RATE,
+        parser,
+    )
+    throttle_retries = _resolve_int_option(
+        args.throttle_retries,
+        env_values,
+        "XHSNOTE_THROTTLE_RETRIES",
+        DEFAULT_THROTTLE_RETRIES,
+        parser,
+    )
+    if rate_limit < 0 or max_rate <= 0 or throttle_retries < 0:
+        parser.error("--rate-limit/--max-rate/--throttle-retries 不能为负数")
+    retries = _resolve_int_option(
+        args.retries,
+        env_values,
+        "XHSNOTE_RETRIES",
+        _DEFAULT_RETRIES,
+        parser,
+    )
+    retry_backoff = _resolve_float_option(
+        args.retry_backoff,
+        env_values,
+        "XHSNOTE_RETRY_BACKOFF",
+        RetryPolicy().backoff,
+        parser,
+    )
+    breaker_threshold = _resolve_float_option(
+        args.breaker_threshold,
+        env_values,
+        "XHSNOTE_BREAKER_THRESHOLD",
+        _DEFAULT_BREAKER_THRESHOLD,
+        parser,
+    )
+    breaker_cooldown = _resolve_float_option(
+        args.breaker_cooldown,
+        env_values,
+        "XHSNOTE_BREAKER_COOLDOWN",
+        _DEFAULT_BREAKER_COOLDOWN,
+        parser,
+    )
+    if retries < 0 or retry_backoff < 0 or breaker_cooldown < 0:
+        parser.error("--retries/--retry-backoff/--breaker-cooldown 不能为负数")
+    if not 0 <= breaker_threshold <= 1:
+        parser.error("--breaker-threshold 必须位于 0~1 之间")
+    writer_queue = _resolve_int_option(
+        args.writer_queue,
+        env_values,
+        "XHSNOTE_WRITER_QUEUE",
+        DEFAULT_WRITER_QUEUE,
+        parser,
+    )
+    if writer_queue < 0:
+        parser.error("--writer-queue 不能为负数")
     input_file = _resolve_optional_path(
         args.input_file,
         env_values,
         "XHSNOTE_INPUT_FILE",
     )
+    workers = _resolve_int_option(
+        args.workers,
+        env_values,
+        "XHSNOTE_WORKERS",
+        _DEFAULT_WORKERS,
+        parser,
+    )
+    if workers < 1:
+        parser.error("并发线程数必须大于等于 1")
+    pool_size = _resolve_int_option(
+        args.pool_size,
+        env_values,
+        "XHSNOTE_POOL_SIZE",
+        max(DEFAULT_POOL_SIZE, workers),
+        parser,
+    )
+    if pool_size < 1:
+        parser.error("连接池大小必须大于等于 1")
+    parse_processes = _resolve_int_option(
+        args.parse_processes,
+        env_values,
+        "XHSNOTE_PARSE_PROCESSES",
+        0,
+        parser,
+    )
+    if parse_processes < -1:
+        parser.error("--parse-processes 只能为 -1、0 或正整数")
+    raw_fields = args.fields if args.fields is not None else env_values.get(
+        "XHSNOTE_FIELDS"
+    )
+    fields = (
+        [field.strip() for field in raw_fields.split(",") if field.strip()]
+        if raw_fields
+        else None
+    )
+    state_archive_dir = _resolve_optional_path(
+        args.state_archive,
+        env_values,
+        "XHSNOTE_STATE_ARCHIVE",
+    )
+    if state_archive_dir is not None:
+        save_initial_state = True
+    metrics_file = _resolve_optional_path(
+        args.metrics_file,
+        env_values,
+        "XHSNOTE_METRICS_FILE",
+    )
+    metrics_format = _resolve_choice_option(
+        args.metrics_format,
+        env_values,
+        "XHSNOTE_METRICS_FORMAT",
+        "",
+        METRICS_FORMATS,
+        parser,
+    )
+
+    log_queue = _resolve_bool_option(
+        args.log_queue,
+        env_values,
+        "XHSNOTE_LOG_QUEUE",
+        workers > 1,
+        parser,
+    )
+    raw_module_levels = (
+        args.log_module_levels
+        if args.log_module_levels is not None
+        else [env_values.get("XHSNOTE_LOG_MODULE_LEVELS", "")]
+    )
+    try:
+        module_levels = parse_module_levels(raw_module_levels)
+    except argparse.ArgumentTypeError as exc:
+        parser.error(str(exc))
 
     configure_logging(
         log_level,
         log_dir=log_dir,
         enable_file=save_log,
+        queued=log_queue,
+        module_levels=module_levels,
     )
 
+    logger.debug("JSON 编解码后端: %s", json_backend.BACKEND_NAME)
+
+    serve_mode = args.urls[:1] == ["serve"]
+    if serve_mode and (len(args.urls) > 1 or input_file is not None):
+        parser.error("serve 模式不接受 URL 参数或 --input-file")
+    read_stdin = "-" in args.urls
+    if read_stdin and (len(args.urls) > 1 or input_file is not None):
+        parser.error("从标准输入读取 URL（-）时不能再传入其他 URL 或 --input-file")
     try:
-        urls = _collect_input_urls(args.urls, input_file)
+        urls = (
+            []
+            if read_stdin or serve_mode
+            else _collect_input_urls(args.urls, input_file)
+        )
     except ValueError as exc:
         parser.error(str(exc))
 
-    if not urls:
+    if (
+        not urls
+        and not read_stdin
+        and not serve_mode
+        and not args.retry_failed
+        and args.reparse is None
+    ):
         parser.error("请通过 URL 参数或 --input-file 提供至少一个链接")
 
     headers: Dict[str, str] = {}
     if user_agent:
         headers["User-Agent"] = user_agent
 
-    total = len(urls)
-    failures: List[str] = []
+    cache: Optional[ResponseCache] = None
+    if cache_dir is not None:
+        try:
+            cache = ResponseCache(
+                cache_dir, ttl=cache_ttl, max_bytes=cache_max_mb * 1024 * 1024
+            )
+        except (OSError, ValueError) as exc:
+            parser.error(f"无法初始化响应缓存: {exc}")
+        logger.info("已启用响应缓存: %s", cache_dir)
 
-    for index, url in enumerate(urls, start=1):
-        logger.info("解析进度 [%d/%d]: %s", index, total, url)
-        initial_state_holder: Dict[str, Any] = {}
+    scheduler: Optional[RequestScheduler] = None
+    if rate_limit > 0:
+        scheduler = RequestScheduler(
+            rate=rate_limit,
+            min_rate=min(DEFAULT_MIN_RATE, rate_limit),
+            max_rate=max(max_rate, rate_limit),
+            concurrency=workers,
+            max_concurrency=workers,
+            throttle_retries=throttle_retries,
+        )
+        logger.info("已启用自适应限速，初始 %.2f 次/秒", rate_limit)
+
+    metrics = RunMetrics()
+    parse_options: Dict[str, Any] = {
+        "headers": headers or None,
+        "timeout": timeout,
+        "stream": stream,
+        "cache": cache,
+        "scheduler": scheduler,
+        "retry_policy": RetryPolicy.uniform(retries, retry_backoff) if retries else None,
+        "circuit_breaker": (
+            CircuitBreaker(
+                failure_threshold=breaker_threshold, cooldown=breaker_cooldown
+            )
+            if breaker_threshold > 0
+            else None
+        ),
+        "on_stage": metrics.record,
+        "fields": fields,
+    }
 
-        def _capture_initial_state(state: Dict[str, Any]) -> None:
-            initial_state_holder["value"] = state
+    if serve_mode:
+        note_cache_size = _resolve_int_option(
+            args.note_cache_size,
+            env_values,
+            "XHSNOTE_NOTE_CACHE_SIZE",
+            DEFAULT_NOTE_CACHE_SIZE,
+            parser,
+        )
+        note_cache_ttl = _resolve_int_option(
+            args.note_cache_ttl,
+            env_values,
+            "XHSNOTE_NOTE_CACHE_TTL",
+            DEFAULT_NOTE_CACHE_TTL,
+            parser,
+        )
+        try:
+            note_cache = NoteCache(max_entries=note_cache_size, ttl=note_cache_ttl)
+        except ValueError as exc:
+            parser.error(str(exc))
+        _run_server(
+            parse_options,
+            host=args.host or env_values.get("XHSNOTE_SERVE_HOST", DEFAULT_SERVE_HOST),
+            port=_resolve_int_option(
+                args.port, env_values, "XHSNOTE_SERVE_PORT", DEFAULT_SERVE_PORT, parser
+            ),
+            pool_size=pool_size,
+            parse_processes=parse_processes,
+            note_cache=note_cache,
+        )
+        return
 
-        state_callback = _capture_initial_state if save_initial_state else None
+    try:
+        sink = create_sink(
+            output_format,
+            output_dir,
+            compact=compact_json,
+            compression=compression,
+            rotate_bytes=rotate_mb * 1024 * 1024 if rotate_mb else None,
+            fields=fields,
+        )
+    except (OSError, RuntimeError, ValueError, sqlite3.Error) as exc:
+        parser.error(str(exc))
+    if output_format == "sqlite" and save_initial_state and state_archive_dir is None:
+        logger.warning("sqlite 输出不保存 __INITIAL_STATE__，如需保留请配合 --state-archive")
+    if state_archive_dir is not None and args.reparse is None:
         try:
-            note_detail = parse_note(
-                url,
+            archive = StateArchive(
+                state_archive_dir,
+                compression="zstd" if compression == "zstd" else "zlib",
+            )
+        except (OSError, RuntimeError, ValueError) as exc:
+            parser.error(f"无法打开 state 归档 {state_archive_dir}: {exc}")
+        logger.info("__INITIAL_STATE__ 写入归档 %s", state_archive_dir)
+        sink = StateArchiveSink(sink, archive)
+    if fields is not None:
+        # The sink lays out files and columns (and media finds its files) from
+        # keys --fields may drop, so parse with those too; the sink projects
+        # back to --fields when it serializes.
+        media_fields = MEDIA_FIELDS if download_media else ()
+        parse_options["fields"] = list(
+            dict.fromkeys([*fields, *sink.required_fields, *media_fields])
+        )
+
+    if args.reparse is not None:
+        if not args.reparse.is_dir():
+            parser.error(f"--reparse 目录不存在: {args.reparse}")
+        writer = BackgroundWriter(
+            sink, max_pending=writer_queue, on_stage=metrics.record
+        )
+        with writer:
+            failures = _run_reparse(
+                args.reparse,
+                writer=writer,
+                processes=None if parse_processes == -1 else parse_processes,
+                fields=parse_options["fields"],
+            )
+        failures += writer.failed
+        metrics.increment("succeeded", writer.written)
+        metrics.increment("failed", failures)
+        metrics.add_bytes("write", sink.bytes_written)
+        _report_metrics(metrics, metrics_file, metrics_format)
+        if failures:
+            raise SystemExit(1)
+        return
+
+    manifest_path = _resolve_path_option(
+        args.manifest,
+        env_values,
+        "XHSNOTE_MANIFEST",
+        output_dir / MANIFEST_FILENAME,
+    )
+    try:
+        manifest = RunManifest(manifest_path, remember_appends=not read_stdin)
+    except OSError as exc:
+        parser.error(f"无法打开进度清单 {manifest_path}: {exc}")
+
+    writer = BackgroundWriter(sink, max_pending=writer_queue, on_stage=metrics.record)
+    results = _BatchResults(manifest, keep_failures=not read_stdin)
+    with manifest, writer:
+        url_source: Iterable[str] = ()
+        if read_stdin:
+            # Filtered lazily: the stream is never held in memory.
+            url_source = iter_url_lines(sys.stdin)
+            if args.retry_failed:
+                url_source = (url for url in url_source if manifest.is_failed(url))
+            elif args.resume:
+                url_source = (url for url in url_source if not manifest.is_done(url))
+        else:
+            if args.retry_failed:
+                failed = manifest.failed()
+                if urls:
+                    urls = [url for url in urls if manifest.is_failed(url)]
+                else:
+                    urls = list(failed)
+                logger.info("从进度清单中选出 %d 个失败的 URL 重新解析", len(urls))
+            elif args.resume:
+                pending = manifest.pending(urls)
+                logger.info(
+                    "断点续跑: 跳过 %d 个已完成的 URL，剩余 %d 个",
+                    len(urls) - len(pending),
+                    len(pending),
+                )
+                urls = pending
+            if not urls:
+                logger.info("没有需要解析的 URL")
+                return
+        media = None
+        if download_media:
+            media_dir = _resolve_path_option(
+                args.media_dir, env_values, "XHSNOTE_MEDIA_DIR", output_dir
+            )
+            media = MediaDownloader(
+                media_dir,
+                workers=media_workers,
                 headers=headers or None,
                 timeout=timeout,
-                output_path=None,
-                on_initial_state=state_callback,
+                retry_policy=parse_options["retry_policy"],
             )
-            output_path = _build_output_path(note_detail, output_dir)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            save_note_detail(note_detail, output_path)
-            logger.info("已保存到: %s", output_path)
-            if save_initial_state and "value" in initial_state_holder:
-                initial_state_path = _build_output_path(
-                    note_detail, output_dir, suffix="initial_state"
+            logger.info("已启用媒体下载: %s（%d 线程）", media_dir, media_workers)
+        parse_pool = None
+        if parse_processes:
+            processes = parse_processes if parse_processes > 0 else os.cpu_count() or 1
+            parse_pool = create_parse_pool(processes)
+            logger.info("解析进程池已启动，进程数 %d", processes)
+            parse_options["parse_pool"] = parse_pool
+        run_options: Dict[str, Any] = {
+            "parse_options": parse_options,
+            "workers": workers,
+            "pool_size": pool_size,
+            "writer": writer,
+            "save_initial_state": save_initial_state,
+            "results": results,
+            "media": media,
+        }
+        try:
+            if read_stdin:
+                _run_stream(url_source, **run_options)
+            else:
+                _run_batch(urls, **run_options)
+        finally:
+            if parse_pool is not None:
+                parse_pool.shutdown()
+            if media is not None:
+                media.close()
+                logger.info(
+                    "媒体下载统计: 下载 %d 个，跳过 %d 个，失败 %d 个，共 %.2f MB",
+                    media.downloaded,
+                    media.skipped,
+                    media.failed,
+                    media.bytes_downloaded / 2**20,
                 )
-                initial_state_path.parent.mkdir(parents=True, exist_ok=True)
-                save_note_detail(initial_state_holder["value"], initial_state_path)
-                logger.info("已保存 __INITIAL_STATE__ 到: %s", initial_state_path)
-        except Exception as exc:  # pylint: disable=broad-except
-            logger.error("解析失败 [%s]: %s", url, exc)
-            failures.append(url)
-
-    if failures:
-        logger.error("共有 %d 个 URL 解析失败", len(failures))
+                metrics.increment("media_downloaded", media.downloaded)
+                metrics.increment("media_failed", media.failed)
+                metrics.add_bytes("media", media.bytes_downloaded)
+
+    media_failed = media.failed if media is not None else 0
+    metrics.increment("succeeded", results.succeeded)
+    metrics.increment("failed", results.failed)
+    metrics.add_bytes("write", sink.bytes_written)
+    _report_metrics(metrics, metrics_file, metrics_format)
+
+    if results.failed:
+        logger.error("共有 %d 个 URL 解析失败", results.failed)
+    if media_failed:
+        logger.error("共有 %d 个媒体文件下载失败", media_failed)
+    if results.failed or media_failed:
         raise SystemExit(1)
 
-    logger.info("全部解析完成，共成功 %d 条", total)
+    logger.info("全部解析完成，共成功 %d 条", results.succeeded)
@@ -0,0 +1,318 @@
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import json_backend
+
+logger = logging.getLogger(__name__)
+
+DATABASE_FILENAME = "notes.db"
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_COMMIT_INTERVAL = 5.0
+
+CommitCallback = Callable[[Optional[BaseException]], None]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    note_id TEXT PRIMARY KEY,
+    type TEXT,
+    title TEXT,
+    description TEXT,
+    user_id TEXT,
+    nickname TEXT,
+    time TEXT,
+    last_update_time TEXT,
+    ip_location TEXT,
+    note_url TEXT,
+    liked_count TEXT,
+    collected_count TEXT,
+    comment_count TEXT,
+    detail TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_notes_user_time ON notes (user_id, time);
+CREATE INDEX IF NOT EXISTS idx_notes_time ON notes (time);
+CREATE INDEX IF NOT EXISTS idx_notes_type ON notes (type);
+CREATE TABLE IF NOT EXISTS note_images (
+    note_id TEXT NOT NULL REFERENCES notes (note_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    trace_id TEXT,
+    url TEXT,
+    url_no_watermark TEXT,
+    width INTEGER,
+    height INTEGER,
+    PRIMARY KEY (note_id, position)
+);
+"""
+
+_NOTE_COLUMNS = (
+    "note_id",
+    "type",
+    "title",
+    "description",
+    "user_id",
+    "nickname",
+    "time",
+    "last_update_time",
+    "ip_location",
+    "note_url",
+    "liked_count",
+    "collected_count",
+    "comment_count",
+    "detail",
+)
+# ``time``/``lastUpdateTime`` are "YYYY-mm-dd HH:MM:SS", so text order is time
+# order. A row is only replaced by a note at least as recent as the stored one.
+_UPSERT_NOTE = (
+    f"INSERT INTO notes ({', '.join(_NOTE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in _NOTE_COLUMNS)}) "
+    "ON CONFLICT (note_id) DO UPDATE SET "
+    + ", ".join(f"{column} = excluded.{column}" for column in _NOTE_COLUMNS[1:])
+    + " WHERE notes.last_update_time IS NULL"
+    " OR excluded.last_update_time >= notes.last_update_time"
+)
+_INSERT_IMAGE = (
+    "INSERT INTO note_images "
+    "(note_id, position, trace_id, url, url_no_watermark, width, height) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _text(value: Any) -> Optional[str]:
+    return None if value in (None, "") else str(value)
+
+
+def _note_row(note_detail: Dict[str, Any], detail_json: str) -> Tuple[Any, ...]:
+    user = note_detail.get("user") or {}
+    interact = note_detail.get("interactInfo") or {}
+    return (
+        str(note_detail["noteId"]),
+        _text(note_detail.get("type")),
+        _text(note_detail.get("title")),
+        _text(note_detail.get("desc")),
+        _text(user.get("userId")),
+        _text(user.get("nickname")),
+        _text(note_detail.get("time")),
+        _text(note_detail.get("lastUpdateTime")),
+        _text(note_detail.get("ipLocation")),
+        _text(note_detail.get("noteUrl")),
+        _text(interact.get("likedCount")),
+        _text(interact.get("collectedCount")),
+        _text(interact.get("commentCount")),
+        detail_json,
+    )
+
+
+def _image_rows(
+    note_id: str, images: List[Dict[str, Any]]
+) -> Iterator[Tuple[Any, ...]]:
+    for position, image in enumerate(images):
+        if not isinstance(image, dict):
+            continue
+        yield (
+            note_id,
+            position,
+            _text(image.get("traceId")),
+            _text(image.get("urlDefault")),
+            _text(image.get("urlNoWatermark")),
+            image.get("width"),
+            image.get("height"),
+        )
+
+
+class NoteDatabase:
+    """SQLite store of note details, upserted on noteId.
+
+    Writes are grouped into transactions of up to ``batch_size`` notes; a
+    background thread commits a partial batch once it is ``commit_interval``
+    seconds old, so sparse input is never left uncommitted, and :meth:`close`
+    commits the rest. ``upsert(..., on_commit=cb)`` calls ``cb(error)`` only
+    after the note's transaction has committed (or failed). A stored note is
+    only replaced by one whose ``lastUpdateTime`` is the same or newer; its
+    ``imageList`` then replaces the rows in ``note_images``. The full note
+    dict is kept as JSON in ``notes.detail`` next to indexed columns for
+    user, time and type.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        commit_interval: float = DEFAULT_COMMIT_INTERVAL,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("SQLite 批量大小必须大于等于 1")
+        self.path = path
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.upserted = 0
+        self.stale = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(path), isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._batch_started = 0.0
+        self._callbacks: List[CommitCallback] = []
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, name="xhsnote-sqlite", daemon=True
+        )
+        self._flusher.start()
+
+    def upsert(
+        self,
+        note_detail: Dict[str, Any],
+        on_commit: Optional[CommitCallback] = None,
+        *,
+        detail: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Stage one note in the current batch and return its JSON text.
+
+        Columns are read from ``note_detail``; ``detail`` (default: the same
+        dict) is what gets stored in ``notes.detail``.
+        """
+        detail_json = json_backend.dumps(
+            note_detail if detail is None else detail, compact=True
+        )
+        row = _note_row(note_detail, detail_json)
+        images = note_detail.get("imageList")
+        with self._lock:
+            if not self._conn.in_transaction:
+                self._conn.execute("BEGIN")
+                self._batch_started = time.monotonic()
+            self._conn.execute("SAVEPOINT note")
+            try:
+                cursor = self._conn.execute(_UPSERT_NOTE, row)
+                updated = cursor.rowcount > 0
+                if updated and isinstance(images, list):
+                    self._conn.execute(
+                        "DELETE FROM note_images WHERE note_id = ?", (row[0],)
+                    )
+                    self._conn.executemany(_INSERT_IMAGE, _image_rows(row[0], images))
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK TO note")
+                self._conn.execute("RELEASE note")
+                raise
+            self._conn.execute("RELEASE note")
+            if updated:
+                self.upserted += 1
+            else:
+                self.stale += 1
+                logger.debug("笔记 %s 已有更新版本，跳过", row[0])
+            self._pending += 1
+            if on_commit is not None:
+                self._callbacks.append(on_commit)
+            done = self._commit() if self._pending >= self.batch_size else None
+        if done is not None:
+            self._notify(*done)
+        return detail_json
+
+    def _commit(self) -> Tuple[List[CommitCallback], Optional[BaseException]]:
+        """Commit the open batch; the caller holds the lock and notifies after."""
+        callbacks, self._callbacks = self._callbacks, []
+        error: Optional[BaseException] = None
+        if self._conn.in_transaction:
+            try:
+                self._conn.execute("COMMIT")
+                logger.debug("SQLite 提交 %d 条笔记", self._pending)
+            except sqlite3.Error as exc:
+                error = exc
+                logger.error(
+                    "SQLite 提交失败，回滚 %d 条笔记: %s", self._pending, exc
+                )
+                self._conn.execute("ROLLBACK")
+            self._pending = 0
+        return callbacks, error
+
+    @staticmethod
+    def _notify(
+        callbacks: List[CommitCallback], error: Optional[BaseException]
+    ) -> None:
+        for callback in callbacks:
+            try:
+                callback(error)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("SQLite 提交回调执行失败")
+
+    def _flush_periodically(self) -> None:
+        interval = min(self.commit_interval, 1.0)
+        while not self._closed.wait(interval):
+            with self._lock:
+                due = (
+                    self._pending
+                    and time.monotonic() - self._batch_started >= self.commit_interval
+                )
+                done = self._commit() if due else None
+            if done is not None:
+                self._notify(*done)
+
+    def commit(self) -> None:
+        with self._lock:
+            done = self._commit()
+        self._notify(*done)
+
+    def query(
+        self,
+        *,
+        user_id: Optional[str] = None,
+        since: Optional[str] = None,
+        note_type: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield stored notes, newest first, filtered on the indexed columns.
+
+        ``since`` compares against ``time`` as text, e.g. ``"2024-01-01"``.
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        for column, value in (("user_id", user_id), ("type", note_type)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("time >= ?")
+            params.append(since)
+        sql = "SELECT detail FROM notes"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY time DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        for (detail_json,) in rows:
+            yield json_backend.loads(detail_json)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def close(self) -> None:
+        self._closed.set()
+        self._flusher.join()
+        with self._lock:
+            done = self._commit()
+            self._conn.close()
+        self._notify(*done)
+        logger.info(
+            "SQLite 写入完成 %s: 更新 %d 条，跳过旧版本 %d 条",
+            self.path,
+            self.upserted,
+            self.stale,
+        )
+
+    def __enter__(self) -> "NoteDatabase":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
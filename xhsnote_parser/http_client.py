@@ -1,7 +1,33 @@
+import codecs
 import logging
-from typing import Dict, Optional
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_ACCEPT_ENCODING
+
+from .note_detail import INITIAL_STATE_PREFIX, INITIAL_STATE_SUFFIX
+from .response_cache import ResponseCache
+from .retry import CircuitBreaker, RetryPolicy, call_with_retries
+from .urls import extract_note_id
+
+if TYPE_CHECKING:
+    import aiohttp
+
+    from .metrics import StageHook
+    from .scheduler import RequestScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +38,117 @@ DEFAULT_HEADERS = {
     )
 }
 DEFAULT_TIMEOUT = 15
+DEFAULT_POOL_SIZE = 10
+STREAM_CHUNK_SIZE = 16 * 1024
+THROTTLE_STATUS_CODES = frozenset({429, 461})
+_CAPTCHA_MARKERS = ("/website-login/captcha", "/website-login/verify")
+
+_default_session: Optional[requests.Session] = None
+_default_session_lock = threading.Lock()
+
+
+class ConnectionStats(NamedTuple):
+    requests: int
+    connections: int
+
+    @property
+    def reused(self) -> int:
+        return max(self.requests - self.connections, 0)
+
+
+def create_session(*, pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """Create a keep-alive session whose pool holds ``pool_size`` connections."""
+    if pool_size < 1:
+        raise ValueError("连接池大小必须大于等于 1")
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(
+        {"Accept-Encoding": DEFAULT_ACCEPT_ENCODING, "Connection": "keep-alive"}
+    )
+    logger.debug("Created pooled session pool_size=%s", pool_size)
+    return session
+
+
+def get_default_session() -> requests.Session:
+    """Return the process-wide pooled session used when callers pass none."""
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = create_session()
+        return _default_session
+
+
+def connection_stats(session: requests.Session) -> ConnectionStats:
+    """Sum request/connection counters of every urllib3 pool in ``session``."""
+    total_requests = 0
+    total_connections = 0
+    for adapter in set(session.adapters.values()):
+        pool_manager = getattr(adapter, "poolmanager", None)
+        if pool_manager is None:
+            continue
+        for key in pool_manager.pools.keys():
+            pool = pool_manager.pools.get(key)
+            if pool is None:
+                continue
+            total_requests += pool.num_requests
+            total_connections += pool.num_connections
+    return ConnectionStats(total_requests, total_connections)
+
+
+class ThrottledError(RuntimeError):
+    """Upstream answered with a rate-limit status or a captcha redirect."""
+
+
+def _check_throttled(response: requests.Response) -> None:
+    if response.status_code in THROTTLE_STATUS_CODES or any(
+        marker in response.url for marker in _CAPTCHA_MARKERS
+    ):
+        logger.warning("请求被限流 (%s): %s", response.status_code, response.url)
+        raise ThrottledError(f"请求被限流 ({response.status_code})")
+
+
+def _fetch_through(
+    url: str,
+    request: Callable[[], Tuple[str, int]],
+    *,
+    cache: Optional[ResponseCache],
+    scheduler: Optional["RequestScheduler"],
+    retry_policy: Optional[RetryPolicy],
+    circuit_breaker: Optional[CircuitBreaker],
+    on_stage: Optional["StageHook"] = None,
+) -> str:
+    """Serve ``url`` from ``cache`` or run ``request`` (returning the text and
+    the number of body bytes received) with scheduling and retries.
+
+    Only real fetches are reported to ``on_stage`` as the ``fetch`` stage.
+    """
+    note_id = extract_note_id(url) if cache is not None else None
+    if note_id is not None:
+        cached = cache.get(note_id)
+        if cached is not None:
+            return cached
+
+    def _attempt() -> Tuple[str, int]:
+        if scheduler is not None:
+            return scheduler.run(url, request)
+        return request()
+
+    started = time.perf_counter()
+    text, received = call_with_retries(
+        _attempt, url=url, policy=retry_policy, breaker=circuit_breaker
+    )
+    if on_stage is not None:
+        on_stage("fetch", time.perf_counter() - started, received)
+    if note_id is not None:
+        # Login walls, deleted notes and error pages are 200s too; caching
+        # them would replay the failure for the whole TTL.
+        if INITIAL_STATE_PREFIX in text:
+            cache.put(note_id, text)
+        else:
+            logger.debug("页面不含 __INITIAL_STATE__，不写入缓存: %s", url)
+    return text
 
 
 def fetch_note_page(
@@ -20,16 +157,176 @@ def fetch_note_page(
     headers: Optional[Dict[str, str]] = None,
     timeout: int = DEFAULT_TIMEOUT,
     session: Optional[requests.Session] = None,
+    cache: Optional[ResponseCache] = None,
+    scheduler: Optional["RequestScheduler"] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+    on_stage: Optional["StageHook"] = None,
+) -> str:
+    """Fetch note HTML content with basic error handling.
+
+    Transient failures are retried according to ``retry_policy`` and counted
+    by ``circuit_breaker``; without them the first error is raised.
+    """
+    merged_headers = {**DEFAULT_HEADERS, **(headers or {})}
+    http_session = session or get_default_session()
+
+    def _request() -> Tuple[str, int]:
+        logger.debug("Fetching note url=%s timeout=%s", url, timeout)
+        try:
+            response = http_session.get(url, headers=merged_headers, timeout=timeout)
+            _check_throttled(response)
+            response.raise_for_status()
+            logger.info("Fetched note content (%s)", response.status_code)
+            return response.text, len(response.content)
+        except requests.RequestException as exc:
+            logger.warning("网络请求失败: %s", exc)
+            raise RuntimeError("拉取笔记页面失败") from exc
+
+    return _fetch_through(
+        url,
+        _request,
+        cache=cache,
+        scheduler=scheduler,
+        retry_policy=retry_policy,
+        circuit_breaker=circuit_breaker,
+        on_stage=on_stage,
+    )
+
+
+def fetch_initial_state(
+    url: str,
+    *,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    session: Optional[requests.Session] = None,
+    cache: Optional[ResponseCache] = None,
+    scheduler: Optional["RequestScheduler"] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    on_stage: Optional["StageHook"] = None,
+) -> str:
+    """Stream the note page and return only its ``__INITIAL_STATE__`` script.
+
+    The body is decoded incrementally and the connection is closed as soon as
+    the closing ``</script>`` arrives, so the rest of the page is never
+    downloaded. An empty string is returned when the block is not found.
+    """
+    merged_headers = {**DEFAULT_HEADERS, **(headers or {})}
+    http_session = session or get_default_session()
+
+    def _request() -> Tuple[str, int]:
+        logger.debug("Streaming note url=%s timeout=%s", url, timeout)
+        try:
+            with http_session.get(
+                url, headers=merged_headers, timeout=timeout, stream=True
+            ) as response:
+                _check_throttled(response)
+                response.raise_for_status()
+                decoder = codecs.getincrementaldecoder(
+                    response.encoding or "utf-8"
+                )(errors="replace")
+                payload, received = _scan_initial_state(
+                    response.iter_content(chunk_size), decoder
+                )
+        except requests.RequestException as exc:
+            logger.warning("网络请求失败: %s", exc)
+            raise RuntimeError("拉取笔记页面失败") from exc
+        if payload is None:
+            logger.warning(
+                "流式读取结束仍未找到完整的 __INITIAL_STATE__ (%d 字节)", received
+            )
+            return "", received
+        logger.info("Streamed note state (%d bytes read)", received)
+        return f"{INITIAL_STATE_PREFIX}{payload}{INITIAL_STATE_SUFFIX}", received
+
+    return _fetch_through(
+        url,
+        _request,
+        cache=cache,
+        scheduler=scheduler,
+        retry_policy=retry_policy,
+        circuit_breaker=circuit_breaker,
+        on_stage=on_stage,
+    )
+
+
+def _scan_initial_state(
+    chunks: Iterable[bytes], decoder: codecs.IncrementalDecoder
+) -> Tuple[Optional[str], int]:
+    prefix_tail = len(INITIAL_STATE_PREFIX) - 1
+    suffix_tail = len(INITIAL_STATE_SUFFIX) - 1
+    received = 0
+    pending = ""
+    parts: List[str] = []
+    in_state = False
+    for chunk in chunks:
+        received += len(chunk)
+        window = pending + decoder.decode(chunk)
+        if not in_state:
+            start = window.find(INITIAL_STATE_PREFIX)
+            if start == -1:
+                pending = window[-prefix_tail:]
+                continue
+            in_state = True
+            window = window[start + len(INITIAL_STATE_PREFIX) :]
+        end = window.find(INITIAL_STATE_SUFFIX)
+        if end != -1:
+            parts.append(window[:end])
+            return "".join(parts), received
+        split = max(len(window) - suffix_tail, 0)
+        parts.append(window[:split])
+        pending = window[split:]
+    return None, received
+
+
+def _require_aiohttp() -> Any:
+    try:
+        import aiohttp
+    except ImportError as exc:
+        raise RuntimeError("异步解析需要安装 aiohttp: pip install aiohttp") from exc
+    return aiohttp
+
+
+def create_async_session(
+    *, limit: int = 100, timeout: int = DEFAULT_TIMEOUT
+) -> "aiohttp.ClientSession":
+    """Create an aiohttp session whose connector allows ``limit`` connections."""
+    aiohttp = _require_aiohttp()
+    connector = aiohttp.TCPConnector(limit=limit)
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+
+
+async def fetch_note_page_async(
+    url: str,
+    *,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    session: Optional["aiohttp.ClientSession"] = None,
 ) -> str:
-    """Fetch note HTML content with basic error handling."""
+    """Asyncio counterpart of :func:`fetch_note_page` backed by aiohttp."""
+    aiohttp = _require_aiohttp()
     merged_headers = {**DEFAULT_HEADERS, **(headers or {})}
-    http_session = session or requests.Session()
-    logger.debug("Fetching note url=%s timeout=%s", url, timeout)
+    owns_session = session is None
+    http_session = session or create_async_session(limit=1, timeout=timeout)
+    logger.debug("Fetching note (async) url=%s timeout=%s", url, timeout)
     try:
-        response = http_session.get(url, headers=merged_headers, timeout=timeout)
-        response.raise_for_status()
-        logger.info("Fetched note content (%s)", response.status_code)
-        return response.text
-    except requests.RequestException as exc:
-        logger.exception("网络请求失败: %s", exc)
+        async with http_session.get(
+            url,
+            headers=merged_headers,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as response:
+            response.raise_for_status()
+            text = await response.text()
+            logger.info("Fetched note content (%s)", response.status)
+            return text
+    except (aiohttp.ClientError, TimeoutError) as exc:
+        logger.error("网络请求失败: %s", exc)
         raise RuntimeError("拉取笔记页面失败") from exc
+    finally:
+        if owns_session:
+            await http_session.close()
@@ -0,0 +1,41 @@
+"""JSON codec used for state decoding and note serialization.
+
+orjson is used when it is installed; otherwise the stdlib ``json`` module is
+used. Pretty output always goes through ``json.dumps(indent=4)`` so files stay
+byte-for-byte identical whichever backend is active.
+"""
+
+import json
+import logging
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+BACKEND_NAME = "orjson" if orjson is not None else "json"
+
+
+def loads(text: str) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            # orjson rejects integers beyond 64 bits; the stdlib accepts them
+            # and raises the same error type for genuinely malformed input.
+            logger.debug("orjson 解码失败，回退到标准库 json")
+    return json.loads(text)
+
+
+def dumps(obj: Any, *, compact: bool = False) -> str:
+    if not compact:
+        return json.dumps(obj, ensure_ascii=False, indent=4)
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            logger.debug("orjson 编码失败，回退到标准库 json")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
@@ -1,11 +1,78 @@
 import argparse
+import atexit
 import logging
-from pathlib import Path
-from typing import Optional
+import queue
+import threading
+import time
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
 
 logger = logging.getLogger(__name__)
 _LOG_FILENAME = f"xhsnote_parser_{datetime.now():%Y%m%d_%H%M%S}.log"
+_LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s - %(message)s"
+_FLUSH_RECORDS = 256
+_FLUSH_INTERVAL = 1.0
+
+_listener: Optional["_BatchingQueueListener"] = None
+_listener_lock = threading.Lock()
+
+
+class _BatchedFileHandler(logging.FileHandler):
+    """File handler that leaves flushing to its listener instead of every record."""
+
+    def __init__(self, filename: Path) -> None:
+        super().__init__(filename, encoding="utf-8")
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+            return
+        self._unflushed += 1
+        if (
+            self._unflushed >= _FLUSH_RECORDS
+            or time.monotonic() - self._last_flush >= _FLUSH_INTERVAL
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        super().flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+
+class _BatchingQueueListener(QueueListener):
+    """Flush the handlers whenever the queue drains, so batches stay short."""
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            if not block:
+                raise
+        for handler in self.handlers:
+            handler.flush()
+        return self.queue.get()
+
+
+def _stop_listener() -> None:
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+
+
+atexit.register(_stop_listener)
 
 
 def configure_logging(
@@ -13,23 +80,57 @@ def configure_logging(
     *,
     log_dir: Optional[Path] = None,
     enable_file: bool = False,
+    queued: bool = False,
+    module_levels: Optional[Dict[str, int]] = None,
 ) -> None:
-    handlers = [logging.StreamHandler()]
+    """Configure root logging for the CLI and library users.
+
+    With ``queued=True`` callers only enqueue records; a background listener
+    thread formats them and writes to the console and (batched) log file, so
+    worker threads never block on log I/O. ``module_levels`` overrides the
+    level of individual loggers, e.g. ``{"xhsnote_parser.note_detail":
+    logging.WARNING}``.
+    """
+    _stop_listener()
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
     log_path: Optional[Path] = None
     if enable_file and log_dir:
         log_dir.mkdir(parents=True, exist_ok=True)
         log_path = log_dir / _LOG_FILENAME
-        file_handler = logging.FileHandler(log_path, encoding="utf-8")
-        handlers.append(file_handler)
+        if queued:
+            handlers.append(_BatchedFileHandler(log_path))
+        else:
+            handlers.append(logging.FileHandler(log_path, encoding="utf-8"))
+
+    if queued:
+        formatter = logging.Formatter(_LOG_FORMAT)
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        global _listener
+        with _listener_lock:
+            _listener = _BatchingQueueListener(
+                log_queue, *handlers, respect_handler_level=True
+            )
+            _listener.start()
+        root_handlers: List[logging.Handler] = [QueueHandler(log_queue)]
+    else:
+        root_handlers = handlers
 
     logging.basicConfig(
         level=level,
-        format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
-        handlers=handlers,
+        format=_LOG_FORMAT,
+        handlers=root_handlers,
         force=True,
     )
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
 
-    logger.debug("Logger configured with level %s", logging.getLevelName(level))
+    logger.debug(
+        "Logger configured with level %s (queued=%s)",
+        logging.getLevelName(level),
+        queued,
+    )
 
 
 def resolve_log_level(level_name: str) -> int:
@@ -38,3 +139,20 @@ def resolve_log_level(level_name: str) -> int:
     if not isinstance(level, int):
         raise argparse.ArgumentTypeError(f"传入级别名称无效： {level_name}")
     return level
+
+
+def parse_module_levels(specs: Iterable[str]) -> Dict[str, int]:
+    """Parse ``name=LEVEL`` entries (comma-separated allowed) into a mapping."""
+    levels: Dict[str, int] = {}
+    for spec in specs:
+        for item in spec.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            name, sep, level_name = item.partition("=")
+            if not sep or not name.strip():
+                raise argparse.ArgumentTypeError(
+                    f"模块日志级别格式应为 模块名=级别： {item}"
+                )
+            levels[name.strip()] = resolve_log_level(level_name.strip())
+    return levels
@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .urls import note_key
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.jsonl"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def manifest_key(url: str) -> str:
+    """Identify a URL by its noteId when possible so share tokens do not matter."""
+    return note_key(url)
+
+
+class RunManifest:
+    """Append-only JSON Lines checkpoint of finished URLs.
+
+    Every record is written with a single ``os.write`` on an ``O_APPEND``
+    descriptor, so concurrent workers never interleave partial lines. When the
+    file is loaded the latest record for each URL wins; a truncated trailing
+    line left by a crash is cut off before new records are appended.
+
+    With ``remember_appends=False`` new records are only written, not added
+    to the in-memory index, so memory is bounded by the manifest as loaded
+    rather than by the number of URLs processed in this run.
+    """
+
+    def __init__(self, path: Path, *, remember_appends: bool = True) -> None:
+        self.path = path
+        self.remember_appends = remember_appends
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._load()
+        self._truncate_torn_tail()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        skipped = 0
+        with self.path.open("r", encoding="utf-8") as handle:
+            for raw_line in handle:
+                try:
+                    record = json.loads(raw_line)
+                    key = record["key"]
+                except (ValueError, KeyError, TypeError):
+                    skipped += 1
+                    continue
+                self._records[key] = record
+        logger.info("已加载进度清单 %s，共 %d 条记录", self.path, len(self._records))
+        if skipped:
+            logger.warning("进度清单中有 %d 行无法解析，已忽略", skipped)
+
+    def _truncate_torn_tail(self) -> None:
+        """Cut a crash-truncated last line so new records start on a fresh line."""
+        if not self.path.exists():
+            return
+        with self.path.open("rb+") as handle:
+            end = handle.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                step = min(4096, position)
+                handle.seek(position - step)
+                chunk = handle.read(step)
+                newline = chunk.rfind(b"\n")
+                if newline >= 0:
+                    position = position - step + newline + 1
+                    break
+                position -= step
+            if position < end:
+                handle.truncate(position)
+                logger.warning(
+                    "进度清单末尾有 %d 字节不完整的记录，已截断", end - position
+                )
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            os.write(self._fd, line.encode("utf-8"))
+            if self.remember_appends:
+                self._records[record["key"]] = record
+
+    def record_success(
+        self, url: str, note_id: Optional[str], output: Optional[str] = None
+    ) -> None:
+        self._append(
+            {
+                "key": manifest_key(url),
+                "url": url,
+                "noteId": note_id,
+                "status": STATUS_DONE,
+                "output": output,
+                "time": time.time(),
+            }
+        )
+
+    def record_failure(self, url: str, reason: str) -> None:
+        self._append(
+            {
+                "key": manifest_key(url),
+                "url": url,
+                "status": STATUS_FAILED,
+                "error": reason,
+                "time": time.time(),
+            }
+        )
+
+    def is_done(self, url: str) -> bool:
+        record = self._records.get(manifest_key(url))
+        return record is not None and record.get("status") == STATUS_DONE
+
+    def is_failed(self, url: str) -> bool:
+        record = self._records.get(manifest_key(url))
+        return record is not None and record.get("status") == STATUS_FAILED
+
+    def failed(self) -> Dict[str, str]:
+        """Map each URL whose latest record is a failure to its reason."""
+        return {
+            record["url"]: record.get("error", "")
+            for record in self._records.values()
+            if record.get("status") == STATUS_FAILED
+        }
+
+    def pending(self, urls: List[str]) -> List[str]:
+        return [url for url in urls if not self.is_done(url)]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+
+    def __enter__(self) -> "RunManifest":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
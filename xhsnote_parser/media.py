@@ -0,0 +1,207 @@
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+import requests
+
+from .http_client import DEFAULT_HEADERS, DEFAULT_TIMEOUT, create_session
+from .retry import CircuitBreaker, RetryPolicy, call_with_retries
+from .storage import sanitize_segment
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEDIA_WORKERS = 8
+MEDIA_CHUNK_SIZE = 256 * 1024
+# Identity encoding keeps Range offsets and Content-Length in file bytes.
+MEDIA_HEADERS = {
+    **DEFAULT_HEADERS,
+    "Referer": "https://www.xiaohongshu.com/",
+    "Accept-Encoding": "identity",
+}
+_PARTIAL_SUFFIX = ".part"
+
+# Keys iter_media reads; kept by the parser whatever --fields asks for.
+MEDIA_FIELDS = ("user.nickname", "imageList", "video")
+
+STATUS_DOWNLOADED = "downloaded"
+STATUS_RESUMED = "resumed"
+STATUS_SKIPPED = "skipped"
+
+
+class MediaItem(NamedTuple):
+    url: str
+    path: Path
+    trace_id: str
+
+
+def media_directory(note_detail: Dict[str, Any], base_dir: Path) -> Path:
+    """``<base>/<作者>_notes/<noteId>_media``, next to the note's JSON file."""
+    user = note_detail.get("user") or {}
+    author = sanitize_segment(user.get("nickname"), "unknown_author")
+    note_id = sanitize_segment(note_detail.get("noteId"), "note")
+    return base_dir / f"{author}_notes" / f"{note_id}_media"
+
+
+def iter_media(note_detail: Dict[str, Any], base_dir: Path) -> Iterator[MediaItem]:
+    """Yield the watermark-free image and video files of a built note.
+
+    Files are named after their traceId (the last segment of the CDN key), so
+    the same asset is never downloaded twice.
+    """
+    directory = media_directory(note_detail, base_dir)
+    for image in note_detail.get("imageList") or []:
+        url = image.get("urlNoWatermark")
+        trace_id = image.get("traceId")
+        if url and trace_id:
+            name = sanitize_segment(trace_id, "image")
+            yield MediaItem(url, directory / f"{name}.jpg", trace_id)
+    for video in note_detail.get("video") or []:
+        url = video.get("urlNoWatermark") if isinstance(video, dict) else None
+        key = url.rsplit("/", 1)[-1] if url else ""
+        if key:
+            name = sanitize_segment(key, "video")
+            yield MediaItem(url, directory / f"{name}.mp4", key)
+
+
+class MediaDownloader:
+    """Download note media on a bounded thread pool sharing one session.
+
+    Bodies are streamed to ``<file>.part`` in ``chunk_size`` pieces and
+    renamed into place once complete. A leftover ``.part`` file is resumed
+    with a ``Range`` request; servers that ignore the range restart it.
+    Existing final files are skipped without any request. At most
+    ``max_pending`` files (default ``4 * workers``) are queued or in flight;
+    :meth:`submit` blocks beyond that, so memory stays flat when downloads
+    are slower than parsing.
+    """
+
+    def __init__(
+        self,
+        base_dir: Path,
+        *,
+        workers: int = DEFAULT_MEDIA_WORKERS,
+        session: Optional[requests.Session] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: int = DEFAULT_TIMEOUT,
+        chunk_size: int = MEDIA_CHUNK_SIZE,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        max_pending: Optional[int] = None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("媒体下载线程数必须大于等于 1")
+        if max_pending is not None and max_pending < 1:
+            raise ValueError("媒体下载队列长度必须大于等于 1")
+        self.base_dir = base_dir
+        self.headers = {**MEDIA_HEADERS, **(headers or {})}
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.downloaded = 0
+        self.skipped = 0
+        self.failed = 0
+        self.bytes_downloaded = 0
+        self._owns_session = session is None
+        self._session = session or create_session(pool_size=workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="xhsnote-media"
+        )
+        self._slots = threading.BoundedSemaphore(max_pending or 4 * workers)
+        self._lock = threading.Lock()
+
+    def submit(self, note_detail: Dict[str, Any]) -> List["Future[str]"]:
+        """Queue every media file of ``note_detail``, blocking while the queue
+        is full; failures are logged and counted in :attr:`failed`."""
+        futures = []
+        for item in iter_media(note_detail, self.base_dir):
+            self._slots.acquire()
+            try:
+                future = self._executor.submit(self._download_logged, item)
+            except BaseException:
+                self._slots.release()
+                raise
+            future.add_done_callback(lambda _: self._slots.release())
+            futures.append(future)
+        return futures
+
+    def _download_logged(self, item: MediaItem) -> str:
+        try:
+            return self.download(item)
+        except Exception as exc:  # pylint: disable=broad-except
+            with self._lock:
+                self.failed += 1
+            logger.error("媒体下载失败 [%s]: %s", item.url, exc)
+            raise
+
+    def download(self, item: MediaItem) -> str:
+        if item.path.exists():
+            with self._lock:
+                self.skipped += 1
+            logger.debug("媒体已存在，跳过 %s", item.path)
+            return STATUS_SKIPPED
+        item.path.parent.mkdir(parents=True, exist_ok=True)
+        status = call_with_retries(
+            lambda: self._fetch_to_partial(item),
+            url=item.url,
+            policy=self.retry_policy,
+            breaker=self.circuit_breaker,
+        )
+        os.replace(self._partial_path(item), item.path)
+        with self._lock:
+            self.downloaded += 1
+        logger.info("媒体已保存 %s", item.path)
+        return status
+
+    @staticmethod
+    def _partial_path(item: MediaItem) -> Path:
+        return item.path.with_name(item.path.name + _PARTIAL_SUFFIX)
+
+    def _fetch_to_partial(self, item: MediaItem) -> str:
+        partial = self._partial_path(item)
+        offset = partial.stat().st_size if partial.exists() else 0
+        headers = dict(self.headers)
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+        try:
+            with self._session.get(
+                item.url, headers=headers, timeout=self.timeout, stream=True
+            ) as response:
+                if offset and response.status_code == 416:
+                    # The partial file already holds the whole body.
+                    return STATUS_RESUMED
+                response.raise_for_status()
+                resumed = offset > 0 and response.status_code == 206
+                expected = response.headers.get("Content-Length")
+                received = 0
+                with partial.open("ab" if resumed else "wb") as handle:
+                    for chunk in response.iter_content(self.chunk_size):
+                        handle.write(chunk)
+                        received += len(chunk)
+                with self._lock:
+                    self.bytes_downloaded += received
+                if expected is not None and received < int(expected):
+                    # Classified as a read error, so the retry resumes from here.
+                    raise requests.exceptions.ChunkedEncodingError(
+                        f"收到 {received}/{expected} 字节"
+                    )
+        except requests.RequestException as exc:
+            raise RuntimeError("下载媒体文件失败") from exc
+        if resumed:
+            logger.debug("续传 %s: 从 %d 字节继续", item.path.name, offset)
+            return STATUS_RESUMED
+        return STATUS_DOWNLOADED
+
+    def close(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+        if self._owns_session:
+            self._session.close()
+
+    def __enter__(self) -> "MediaDownloader":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
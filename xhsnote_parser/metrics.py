@@ -0,0 +1,185 @@
+import logging
+import math
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from . import json_backend
+from .fileio import atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+StageHook = Callable[[str, float, int], None]
+"""``hook(stage, seconds, size)``; ``size`` is the bytes the stage handled, or 0."""
+
+STAGES = ("fetch", "scan", "decode", "build", "parse", "save", "write")
+QUANTILES = (0.5, 0.95, 0.99)
+METRICS_FORMATS = ("json", "prometheus")
+_PROMETHEUS_PREFIX = "xhsnote"
+
+
+class StageTimer:
+    """Context manager that reports the elapsed time of one stage to ``hook``.
+
+    Blocks that raise are not recorded. With ``hook=None`` it does nothing, so
+    call sites need no branching.
+    """
+
+    __slots__ = ("hook", "stage", "_started")
+
+    def __init__(self, hook: Optional[StageHook], stage: str) -> None:
+        self.hook = hook
+        self.stage = stage
+        self._started = 0.0
+
+    def __enter__(self) -> "StageTimer":
+        if self.hook is not None:
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        if self.hook is not None and exc_type is None:
+            self.hook(self.stage, time.perf_counter() - self._started, 0)
+
+
+def _percentile(samples: List[float], quantile: float) -> float:
+    """Nearest-rank percentile of already sorted ``samples``."""
+    rank = max(1, math.ceil(quantile * len(samples)))
+    return samples[rank - 1]
+
+
+class RunMetrics:
+    """Thread-safe collector for per-stage latencies, byte totals and counters.
+
+    ``record`` matches :data:`StageHook` and can be passed straight to
+    ``parse_note(on_stage=...)`` and ``BackgroundWriter(on_stage=...)``.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self._samples: Dict[str, "array[float]"] = {}
+        self._bytes: Dict[str, int] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, size: int = 0) -> None:
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = array("d")
+            samples.append(seconds)
+            if size:
+                self._bytes[stage] = self._bytes.get(stage, 0) + size
+
+    def add_bytes(self, stage: str, size: int) -> None:
+        with self._lock:
+            self._bytes[stage] = self._bytes.get(stage, 0) + size
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    @property
+    def bytes_fetched(self) -> int:
+        return self._bytes.get("fetch", 0)
+
+    @property
+    def bytes_written(self) -> int:
+        return self._bytes.get("write", 0) + self._bytes.get("save", 0)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+            counters = dict(self._counters)
+        ordered = [stage for stage in STAGES if stage in samples]
+        ordered += sorted(stage for stage in samples if stage not in STAGES)
+        stages: Dict[str, Any] = {}
+        for stage in ordered:
+            values = samples[stage]
+            stages[stage] = {
+                "count": len(values),
+                "sum": sum(values),
+                **{f"p{int(q * 100)}": _percentile(values, q) for q in QUANTILES},
+            }
+        return {
+            "started": self.started,
+            "elapsed": time.time() - self.started,
+            "counters": counters,
+            "bytes_fetched": self.bytes_fetched,
+            "bytes_written": self.bytes_written,
+            "stages": stages,
+        }
+
+    def log_summary(self) -> None:
+        summary = self.summary()
+        counters = " ".join(
+            f"{name}={value}" for name, value in sorted(summary["counters"].items())
+        )
+        logger.info(
+            "运行统计: 耗时 %.1fs %s 拉取 %.2f MB 写入 %.2f MB",
+            summary["elapsed"],
+            counters,
+            summary["bytes_fetched"] / 2**20,
+            summary["bytes_written"] / 2**20,
+        )
+        for stage, stats in summary["stages"].items():
+            logger.info(
+                "阶段 %-6s 次数 %6d  p50 %8.1fms  p95 %8.1fms  p99 %8.1fms",
+                stage,
+                stats["count"],
+                stats["p50"] * 1000,
+                stats["p95"] * 1000,
+                stats["p99"] * 1000,
+            )
+
+    def to_prometheus(self) -> str:
+        summary = self.summary()
+        name = f"{_PROMETHEUS_PREFIX}_stage_seconds"
+        lines = [
+            f"# HELP {name} Per-note duration of each parse stage.",
+            f"# TYPE {name} summary",
+        ]
+        for stage, stats in summary["stages"].items():
+            for quantile in QUANTILES:
+                value = stats[f"p{int(quantile * 100)}"]
+                lines.append(f'{name}{{stage="{stage}",quantile="{quantile}"}} {value:.6f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {stats["sum"]:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {stats["count"]}')
+        name = f"{_PROMETHEUS_PREFIX}_bytes_total"
+        lines += [
+            f"# HELP {name} Bytes fetched from the network and written to disk.",
+            f"# TYPE {name} counter",
+            f'{name}{{direction="fetched"}} {summary["bytes_fetched"]}',
+            f'{name}{{direction="written"}} {summary["bytes_written"]}',
+        ]
+        name = f"{_PROMETHEUS_PREFIX}_notes_total"
+        lines += [
+            f"# HELP {name} Notes processed in the run, by result.",
+            f"# TYPE {name} counter",
+        ]
+        for counter, value in sorted(summary["counters"].items()):
+            lines.append(f'{name}{{result="{counter}"}} {value}')
+        name = f"{_PROMETHEUS_PREFIX}_run_seconds"
+        lines += [
+            f"# HELP {name} Wall-clock duration of the run.",
+            f"# TYPE {name} gauge",
+            f"{name} {summary['elapsed']:.3f}",
+            f"{_PROMETHEUS_PREFIX}_run_start_timestamp_seconds {summary['started']:.3f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Path, metrics_format: Optional[str] = None) -> None:
+        """Write metrics atomically; format follows ``.prom`` suffix unless given."""
+        if metrics_format is None:
+            metrics_format = "prometheus" if path.suffix == ".prom" else "json"
+        if metrics_format not in METRICS_FORMATS:
+            raise ValueError(f"不支持的指标格式: {metrics_format}")
+        if metrics_format == "prometheus":
+            text = self.to_prometheus()
+        else:
+            text = json_backend.dumps(self.summary())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(path, text)
+        logger.info("运行指标已写入 %s", path)
@@ -0,0 +1,99 @@
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from .note_detail import build_note_detail
+
+
+def _as_int(value: Any) -> Optional[int]:
+    """Counts arrive as strings such as ``"1234"``; ``"1万+"`` and blanks map to None."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class NoteDetail(NamedTuple):
+    """Compact, typed view of the fields most consumers read from a note.
+
+    A tuple per note instead of the full nested dict; build one with
+    :meth:`from_detail` from a note parsed with ``fields=NoteDetail.SOURCE_FIELDS``
+    so nothing else is copied in the first place.
+    """
+
+    note_id: str
+    note_type: Optional[str]
+    title: Optional[str]
+    desc: Optional[str]
+    user_id: Optional[str]
+    nickname: Optional[str]
+    time: Optional[str]
+    last_update_time: Optional[str]
+    ip_location: Optional[str]
+    note_url: Optional[str]
+    image_urls: Tuple[str, ...]
+    video_url: Optional[str]
+    tags: Tuple[str, ...]
+    liked_count: Optional[int]
+    collected_count: Optional[int]
+    comment_count: Optional[int]
+
+    SOURCE_FIELDS = (
+        "noteId",
+        "type",
+        "title",
+        "desc",
+        "user.userId",
+        "user.nickname",
+        "time",
+        "lastUpdateTime",
+        "ipLocation",
+        "noteUrl",
+        "imageList",
+        "video",
+        "tagList.name",
+        "interactInfo.likedCount",
+        "interactInfo.collectedCount",
+        "interactInfo.commentCount",
+    )
+
+    @classmethod
+    def from_detail(cls, detail: Dict[str, Any]) -> "NoteDetail":
+        user = detail.get("user") or {}
+        interact = detail.get("interactInfo") or {}
+        videos = detail.get("video") or []
+        return cls(
+            note_id=str(detail.get("noteId") or ""),
+            note_type=detail.get("type"),
+            title=detail.get("title"),
+            desc=detail.get("desc"),
+            user_id=user.get("userId"),
+            nickname=user.get("nickname"),
+            time=detail.get("time"),
+            last_update_time=detail.get("lastUpdateTime"),
+            ip_location=detail.get("ipLocation"),
+            note_url=detail.get("noteUrl"),
+            image_urls=tuple(
+                image["urlNoWatermark"]
+                for image in detail.get("imageList") or []
+                if image.get("urlNoWatermark")
+            ),
+            video_url=videos[0].get("urlNoWatermark") if videos else None,
+            tags=tuple(
+                tag["name"] for tag in detail.get("tagList") or [] if tag.get("name")
+            ),
+            liked_count=_as_int(interact.get("likedCount")),
+            collected_count=_as_int(interact.get("collectedCount")),
+            comment_count=_as_int(interact.get("commentCount")),
+        )
+
+    @classmethod
+    def from_note_data(cls, note_data: Dict[str, Any], note_url: str) -> "NoteDetail":
+        """Build straight from the ``note`` section, copying only the source fields."""
+        return cls.from_detail(
+            build_note_detail(note_data, note_url, fields=cls.SOURCE_FIELDS)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            key: list(value) if isinstance(value, tuple) else value
+            for key, value in self._asdict().items()
+        }
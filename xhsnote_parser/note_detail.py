@@ -4,32 +4,221 @@ import re
 from datetime import datetime
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from . import json_backend
+from .metrics import StageHook, StageTimer
+
 logger = logging.getLogger(__name__)
 
-_INITIAL_STATE_PATTERN = re.compile(
-    r"<script>window.__INITIAL_STATE__=(.*?)</script>", re.DOTALL
-)
+INITIAL_STATE_PREFIX = "<script>window.__INITIAL_STATE__="
+INITIAL_STATE_SUFFIX = "</script>"
+_UNDEFINED = "undefined"
+_ESCAPED_QUOTE = '\\"'
+_NOTE_KEY_PATTERN = re.compile(r'"note"\s*:\s*')
+_JSON_DECODER = json.JSONDecoder()
+_STRING_TAIL = re.compile(r'[^"\\]*+(?:\\.[^"\\]*+)*+"', re.DOTALL)
+_STRING_LITERAL = re.compile('"' + _STRING_TAIL.pattern, re.DOTALL)
+
+
+def _is_identifier_char(char: str) -> bool:
+    return char.isalnum() or char in "_$"
 
 
-def extract_note_data(html: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
-    """Extract note section from the HTML script tag."""
-    match = _INITIAL_STATE_PATTERN.search(html)
-    if not match:
+def _locate_initial_state(html: str) -> Tuple[int, int]:
+    start = html.find(INITIAL_STATE_PREFIX)
+    if start == -1:
         logger.error("未在页面中找到 window.__INITIAL_STATE__ 脚本块")
         raise ValueError("页面结构不符合预期，无法解析 note 数据")
-    raw_json = match.group(1).replace("undefined", "null")
+    start += len(INITIAL_STATE_PREFIX)
+    end = html.find(INITIAL_STATE_SUFFIX, start)
+    if end == -1:
+        logger.error("window.__INITIAL_STATE__ 脚本块缺少结束标签")
+        raise ValueError("页面结构不符合预期，无法解析 note 数据")
+    return start, end
+
+
+def _skip_to(
+    html: str, cursor: int, target: int, end: int, in_string: bool
+) -> Tuple[int, bool]:
+    """Walk string literals from ``cursor`` until ``target`` is reached.
+
+    Returns the new cursor and whether ``target`` lies inside a string. When it
+    does, the cursor points just past that string's closing quote.
+    """
+    while True:
+        if in_string:
+            literal_end = _STRING_TAIL.match(html, cursor, end)
+            cursor = literal_end.end() if literal_end else end
+            if cursor > target:
+                return cursor, True
+            in_string = False
+        quote = html.find('"', cursor, target)
+        if quote == -1:
+            return target, False
+        in_string = True
+        cursor = quote + 1
+
+
+def _scan_initial_state(html: str) -> str:
+    """Slice the state payload and rewrite bare ``undefined`` tokens to ``null``.
+
+    Boundaries are found with ``str.find`` and the payload is walked once,
+    tracking whether each ``undefined`` sits inside a string literal, so a title
+    or description containing the word is left untouched. Between hits the
+    quote parity is counted in C; segments holding escaped quotes fall back to
+    matching the string literals one by one.
+    """
+    start, end = _locate_initial_state(html)
+    pieces: List[str] = []
+    copied = start
+    scanned = start
+    in_string = False
+    while True:
+        hit = html.find(_UNDEFINED, scanned, end)
+        if hit == -1:
+            break
+        if html.find(_ESCAPED_QUOTE, scanned, hit) == -1:
+            if html.count('"', scanned, hit) % 2:
+                in_string = not in_string
+        else:
+            cursor, inside = _skip_to(html, scanned, hit, end, in_string)
+            if inside:
+                scanned = cursor
+                in_string = False
+                continue
+            in_string = False
+        scanned = hit + len(_UNDEFINED)
+        if in_string:
+            continue
+        if not _is_identifier_char(html[hit - 1]) and (
+            scanned == end or not _is_identifier_char(html[scanned])
+        ):
+            pieces.append(html[copied:hit])
+            pieces.append("null")
+            copied = scanned
+
+    if not pieces:
+        return html[start:end]
+    pieces.append(html[copied:end])
+    return "".join(pieces)
+
+
+def _bracket_depth(segment: str) -> Optional[int]:
+    """Net bracket depth change across ``segment``, ignoring string literals.
+
+    ``None`` means ``segment`` ends inside a string literal.
+    """
+    bare = _STRING_LITERAL.sub("", segment)
+    if '"' in bare:
+        return None
+    return (
+        bare.count("{") + bare.count("[") - bare.count("}") - bare.count("]")
+    )
+
+
+def _decode_note_section(raw_json: str) -> Optional[Dict[str, Any]]:
+    """Decode only the top-level ``note`` subtree of the state.
+
+    ``"note":`` candidates are found with a regex and the bracket depth is
+    carried from one to the next, skipping string literals, so only the key
+    sitting directly in the root object is used. Its value is decoded with
+    ``raw_decode``, which stops at the end of that value.
+    """
+    depth = 0
+    cursor = 0
+    for key_match in _NOTE_KEY_PATTERN.finditer(raw_json):
+        change = _bracket_depth(raw_json[cursor : key_match.start()])
+        if change is None:
+            # The candidate is inside a string; measure from ``cursor`` again.
+            continue
+        depth += change
+        cursor = key_match.start()
+        if depth != 1:
+            continue
+        try:
+            value, _ = _JSON_DECODER.raw_decode(raw_json, key_match.end())
+        except json.JSONDecodeError:
+            return None
+        return value if isinstance(value, dict) else None
+    return None
+
+
+def extract_note_data(
+    html: str,
+    *,
+    include_full_state: bool = True,
+    on_stage: Optional[StageHook] = None,
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Extract note section from the HTML script tag.
+
+    With ``include_full_state=False`` only the ``note`` subtree is decoded and
+    ``None`` is returned in place of the full state. ``on_stage`` receives the
+    ``scan`` and ``decode`` timings.
+    """
+    with StageTimer(on_stage, "scan"):
+        raw_json = _scan_initial_state(html)
     logger.debug("成功截取 __INITIAL_STATE__ JSON 字段，长度 %d", len(raw_json))
-    full_state = json.loads(raw_json)
+    with StageTimer(on_stage, "decode"):
+        if not include_full_state:
+            note_section = _decode_note_section(raw_json)
+            if note_section is not None:
+                return note_section, None
+            logger.debug("未能单独定位 note 子树，回退到完整解析")
+        full_state = json_backend.loads(raw_json)
     note_section = full_state.get("note", {})
-    return note_section, full_state
+    return note_section, full_state if include_full_state else None
+
 
+def parse_fields(fields: Iterable[str]) -> Dict[str, Any]:
+    """Turn ``["title", "user.nickname"]`` into a nested projection spec.
 
-def _safe_first_note(note_detail_map: Dict[str, Any]) -> Dict[str, Any]:
+    Leaves map to ``None`` (keep the whole value); a parent listed on its own
+    wins over its dotted children. ``noteId`` is always kept.
+    """
+    spec: Dict[str, Any] = {"noteId": None}
+    for field in fields:
+        parts = [part for part in field.strip().split(".") if part]
+        if not parts:
+            continue
+        node = spec
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is None:
+                break
+            node = child
+        else:
+            node[parts[-1]] = None
+    return spec
+
+
+def _project(value: Any, spec: Dict[str, Any]) -> Any:
+    if isinstance(value, list):
+        return [_project(item, spec) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {
+        key: value[key] if sub is None else _project(value[key], sub)
+        for key, sub in spec.items()
+        if key in value
+    }
+
+
+def project_note_detail(
+    note_detail: Dict[str, Any], fields: Iterable[str]
+) -> Dict[str, Any]:
+    """Apply ``fields`` (see :func:`parse_fields`) to an already built note."""
+    return _project(note_detail, parse_fields(fields))
+
+
+def _safe_first_note(
+    note_detail_map: Dict[str, Any], keys: Optional[Iterable[str]] = None
+) -> Dict[str, Any]:
     for entry in note_detail_map.values():
         note = entry.get("note")
         if note:
             logger.debug("命中 noteDetailMap 中的第一条笔记数据")
-            return dict(note)
+            if keys is None:
+                return dict(note)
+            return {key: note[key] for key in keys if key in note}
     logger.error("noteDetailMap 中未找到 note 字段")
     raise ValueError("noteDetailMap 不包含 note 信息")
 
@@ -97,13 +286,31 @@ def _enrich_video(video: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return enriched
 
 
-def build_note_detail(note_data: Dict[str, Any], note_url: str) -> Dict[str, Any]:
+def build_note_detail(
+    note_data: Dict[str, Any],
+    note_url: str,
+    *,
+    fields: Optional[Iterable[str]] = None,
+) -> Dict[str, Any]:
+    """Build the enriched note dict.
+
+    ``fields`` (see :func:`parse_fields`) keeps only the listed keys; other
+    subtrees are dropped before anything is copied or enriched.
+    """
     note_detail_map = note_data.get("noteDetailMap") or {}
-    note_detail = _safe_first_note(note_detail_map)
-    note_detail["imageList"] = _enrich_images(note_detail.get("imageList", []))
+    spec = parse_fields(fields) if fields is not None else None
+    note_detail = _safe_first_note(note_detail_map, spec)
+    if spec is None or "imageList" in spec:
+        note_detail["imageList"] = _enrich_images(note_detail.get("imageList", []))
     if note_detail.get("video"):
         note_detail["video"] = _enrich_video(note_detail.get("video", []))
-    note_detail["time"] = _format_timestamp(note_detail.get("time"))
-    note_detail["lastUpdateTime"] = _format_timestamp(note_detail.get("lastUpdateTime"))
-    note_detail["noteUrl"] = note_url
+    for key in ("time", "lastUpdateTime"):
+        if spec is None or key in spec:
+            note_detail[key] = _format_timestamp(note_detail.get(key))
+    if spec is None or "noteUrl" in spec:
+        note_detail["noteUrl"] = note_url
+    if spec is not None:
+        for key, sub in spec.items():
+            if sub is not None and key in note_detail:
+                note_detail[key] = _project(note_detail[key], sub)
     return note_detail
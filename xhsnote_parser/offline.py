@@ -0,0 +1,223 @@
+import gzip
+import io
+import logging
+import os
+from collections import deque
+from concurrent.futures import Executor, Future
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from . import json_backend
+from .archive import ArchiveLocation, StateArchive, is_segment_name, read_record
+from .note_detail import build_note_detail, extract_note_data
+from .service import create_parse_pool
+
+logger = logging.getLogger(__name__)
+
+_STATE_FILE_SUFFIX = "_initial_state.json"
+_DETAIL_FILE_SUFFIX = "_noteDetail.json"
+_STATE_STREAM_PREFIX = "initial_state-"
+_EXPLORE_URL = "https://www.xiaohongshu.com/explore/{}"
+
+SOURCE_HTML = "html"
+SOURCE_STATE = "state"
+SOURCE_RECORD = "record"
+SOURCE_ARCHIVE = "archive"
+
+
+class Source(NamedTuple):
+    """One saved note: ``kind`` says how to read ``payload``.
+
+    ``html`` and ``state`` payloads are file paths read by the worker;
+    ``record`` payloads are single ``initial_state-*.jsonl`` lines and
+    ``archive`` payloads are ``<offset>:<segment path>`` archive locations.
+    """
+
+    kind: str
+    payload: str
+    label: str
+
+
+class RebuildResult(NamedTuple):
+    label: str
+    note_detail: Optional[Dict[str, Any]]
+    error: Optional[BaseException]
+
+
+def _open_text(path: Path) -> IO[str]:
+    if path.name.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.name.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("读取 zstd 文件需要安装 zstandard") from exc
+        raw = path.open("rb")
+        return io.TextIOWrapper(
+            zstandard.ZstdDecompressor().stream_reader(raw, closefd=True),
+            encoding="utf-8",
+        )
+    return path.open("r", encoding="utf-8")
+
+
+def iter_sources(root: Path) -> Iterator[Source]:
+    """Walk ``root`` in sorted order for saved pages and states.
+
+    Recognised inputs are ``*.html`` pages, ``*_initial_state.json`` files
+    written by ``DirectorySink``, ``initial_state-*.jsonl[.gz|.zst]``
+    streams written by ``JsonLinesSink`` and ``state-*.seg`` archive segments.
+    Archive segments yield only the latest record of each noteId.
+    """
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        archive_read = False
+        for filename in sorted(filenames):
+            path = Path(directory) / filename
+            if filename.endswith((".html", ".htm")):
+                yield Source(SOURCE_HTML, str(path), str(path))
+            elif filename.endswith(_STATE_FILE_SUFFIX):
+                yield Source(SOURCE_STATE, str(path), str(path))
+            elif is_segment_name(filename):
+                # All segments of a directory form one archive; read it once.
+                if not archive_read:
+                    archive_read = True
+                    yield from _archive_sources(Path(directory))
+            elif filename.startswith(_STATE_STREAM_PREFIX) and ".jsonl" in filename:
+                logger.info("读取 state 流 %s", path)
+                with _open_text(path) as handle:
+                    for line_number, line in enumerate(handle, start=1):
+                        if line.strip():
+                            yield Source(
+                                SOURCE_RECORD, line, f"{path}:{line_number}"
+                            )
+
+
+def _archive_sources(directory: Path) -> Iterator[Source]:
+    with StateArchive(directory) as archive:
+        locations = archive.locations()
+    logger.info("读取 state 归档 %s，共 %d 条", directory, len(locations))
+    for _, location in locations:
+        yield Source(
+            SOURCE_ARCHIVE,
+            f"{location.offset}:{location.segment}",
+            f"{location.segment}@{location.offset}",
+        )
+
+
+def _note_url(note_section: Dict[str, Any], saved_url: Optional[str]) -> str:
+    if saved_url:
+        return saved_url
+    note_id = next(iter(note_section.get("noteDetailMap") or {}), None)
+    return _EXPLORE_URL.format(note_id) if note_id else ""
+
+
+def _saved_note_url(state_path: Path) -> Optional[str]:
+    """``noteUrl`` of the ``noteDetail.json`` saved next to a state file."""
+    detail_path = state_path.with_name(
+        state_path.name[: -len(_STATE_FILE_SUFFIX)] + _DETAIL_FILE_SUFFIX
+    )
+    try:
+        return json_backend.loads(detail_path.read_text(encoding="utf-8")).get(
+            "noteUrl"
+        )
+    except (OSError, ValueError):
+        return None
+
+
+def rebuild_source(
+    kind: str, payload: str, fields: Optional[Tuple[str, ...]] = None
+) -> Dict[str, Any]:
+    """Turn one saved page, state file or state record into a note detail.
+
+    Module-level so a process pool can run it.
+    """
+    saved_url: Optional[str] = None
+    if kind == SOURCE_HTML:
+        html = Path(payload).read_text(encoding="utf-8", errors="replace")
+        note_section, _ = extract_note_data(html, include_full_state=False)
+    elif kind == SOURCE_STATE:
+        path = Path(payload)
+        state = json_backend.loads(path.read_text(encoding="utf-8"))
+        note_section = state.get("note") or {}
+        saved_url = _saved_note_url(path)
+    elif kind == SOURCE_RECORD:
+        record = json_backend.loads(payload)
+        note_section = (record.get("state") or {}).get("note") or {}
+    elif kind == SOURCE_ARCHIVE:
+        offset, segment = payload.split(":", 1)
+        state = read_record(ArchiveLocation(Path(segment), int(offset), 0))
+        note_section = state.get("note") or {}
+    else:
+        raise ValueError(f"未知的来源类型: {kind}")
+    return build_note_detail(
+        note_section, _note_url(note_section, saved_url), fields=fields
+    )
+
+
+def _resolve(label: str, future: "Future[Dict[str, Any]]") -> RebuildResult:
+    try:
+        return RebuildResult(label, future.result(), None)
+    except Exception as exc:  # pylint: disable=broad-except
+        return RebuildResult(label, None, exc)
+
+
+def rebuild_notes(
+    root: Path,
+    *,
+    processes: Optional[int] = None,
+    pool: Optional[Executor] = None,
+    max_pending: Optional[int] = None,
+    fields: Optional[Iterable[str]] = None,
+) -> Iterator[RebuildResult]:
+    """Rebuild every saved note under ``root`` and yield results in order.
+
+    Work runs on ``pool`` or a new pool of ``processes`` workers (all cores by
+    default); ``processes=0`` rebuilds inline. At most ``max_pending`` sources
+    are in flight, so memory stays flat however large the archive is.
+    ``fields`` projects each note as in ``parse_note``.
+    """
+    field_list = tuple(fields) if fields is not None else None
+    if processes == 0 and pool is None:
+        for source in iter_sources(root):
+            try:
+                detail = rebuild_source(source.kind, source.payload, field_list)
+            except Exception as exc:  # pylint: disable=broad-except
+                yield RebuildResult(source.label, None, exc)
+            else:
+                yield RebuildResult(source.label, detail, None)
+        return
+
+    owned_pool = pool is None
+    executor = pool or create_parse_pool(processes)
+    window = max_pending or 4 * (processes or os.cpu_count() or 1)
+    pending: Deque[Tuple[str, "Future[Dict[str, Any]]"]] = deque()
+    try:
+        for source in iter_sources(root):
+            pending.append(
+                (
+                    source.label,
+                    executor.submit(
+                        rebuild_source, source.kind, source.payload, field_list
+                    ),
+                )
+            )
+            if len(pending) >= window:
+                yield _resolve(*pending.popleft())
+        while pending:
+            yield _resolve(*pending.popleft())
+    finally:
+        for _, future in pending:
+            future.cancel()
+        if owned_pool:
+            executor.shutdown()
+
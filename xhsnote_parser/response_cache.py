@@ -0,0 +1,125 @@
+import gzip
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_TTL = 24 * 60 * 60
+DEFAULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+_ENTRY_SUFFIX = ".html.gz"
+# Eviction frees down to this share of max_bytes so the directory scan it
+# needs runs once per ~10% of churn rather than on every put.
+_EVICT_LOW_WATERMARK = 0.9
+
+
+class ResponseCache:
+    """On-disk cache of fetched note pages keyed by noteId.
+
+    Entries are gzip-compressed files whose mtime marks when they were stored
+    (used for the TTL) and whose atime is bumped on every hit (used for LRU
+    eviction once ``max_bytes`` is exceeded, down to 90% of it).
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        ttl: int = DEFAULT_CACHE_TTL,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    ) -> None:
+        if ttl <= 0:
+            raise ValueError("缓存 TTL 必须大于 0")
+        if max_bytes <= 0:
+            raise ValueError("缓存容量必须大于 0")
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._total_bytes = sum(size for _, _, size in self._entries())
+        logger.debug(
+            "响应缓存目录 %s，已有 %d 字节", self.directory, self._total_bytes
+        )
+
+    def _path(self, note_id: str) -> Path:
+        return self.directory / f"{note_id}{_ENTRY_SUFFIX}"
+
+    def _entries(self) -> List[Tuple[float, Path, int]]:
+        entries = []
+        for path in self.directory.glob(f"*{_ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, path, stat.st_size))
+        return entries
+
+    def _remove(self, path: Path, size: int) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return
+        self._total_bytes -= size
+
+    def get(self, note_id: str) -> Optional[str]:
+        path = self._path(note_id)
+        with self._lock:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            now = time.time()
+            if now - stat.st_mtime > self.ttl:
+                logger.debug("缓存已过期: %s", note_id)
+                self._remove(path, stat.st_size)
+                self.misses += 1
+                return None
+            try:
+                text = gzip.decompress(path.read_bytes()).decode("utf-8")
+            except (OSError, EOFError, UnicodeDecodeError) as exc:
+                logger.warning("缓存条目损坏，已删除 %s: %s", path, exc)
+                self._remove(path, stat.st_size)
+                self.misses += 1
+                return None
+            os.utime(path, (now, stat.st_mtime))
+            self.hits += 1
+        logger.info("命中响应缓存: %s", note_id)
+        return text
+
+    def put(self, note_id: str, text: str) -> None:
+        payload = gzip.compress(text.encode("utf-8"), compresslevel=6)
+        path = self._path(note_id)
+        with self._lock:
+            try:
+                previous_size = path.stat().st_size
+            except FileNotFoundError:
+                previous_size = 0
+            fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as handle:
+                    handle.write(payload)
+                os.replace(tmp_name, path)
+            except OSError:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+            self._total_bytes += len(payload) - previous_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        target = int(self.max_bytes * _EVICT_LOW_WATERMARK)
+        evicted = 0
+        for _, path, size in sorted(self._entries()):
+            if self._total_bytes <= target:
+                break
+            self._remove(path, size)
+            evicted += 1
+        logger.debug("响应缓存淘汰 %d 个条目，当前 %d 字节", evicted, self._total_bytes)
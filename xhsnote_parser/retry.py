@@ -0,0 +1,223 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, NamedTuple, Optional, TypeVar
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+ERROR_CONNECT = "connect"
+ERROR_READ = "read"
+ERROR_SERVER = "server"
+_PROBE_POLL = 0.1
+
+
+def classify_error(exc: BaseException) -> Optional[str]:
+    """Map a fetch failure (or the requests error it wraps) to a retry class.
+
+    Returns ``None`` for errors that retrying will not fix, such as 4xx
+    responses or page-structure problems.
+    """
+    current: Optional[BaseException] = exc
+    while current is not None:
+        if isinstance(current, requests.ConnectTimeout):
+            return ERROR_CONNECT
+        if isinstance(
+            current, (requests.Timeout, requests.exceptions.ChunkedEncodingError)
+        ):
+            return ERROR_READ
+        if isinstance(current, requests.ConnectionError):
+            return ERROR_CONNECT
+        if isinstance(current, requests.HTTPError):
+            response = current.response
+            if response is not None and response.status_code >= 500:
+                return ERROR_SERVER
+            return None
+        current = current.__cause__
+    return None
+
+
+def _is_request_error(exc: BaseException) -> bool:
+    current: Optional[BaseException] = exc
+    while current is not None:
+        if isinstance(current, requests.RequestException):
+            return True
+        current = current.__cause__
+    return False
+
+
+class RetryPolicy(NamedTuple):
+    """Per-error-class retry budgets with exponential backoff and full jitter."""
+
+    connect_retries: int = 2
+    read_retries: int = 1
+    server_retries: int = 2
+    backoff: float = 0.5
+    max_backoff: float = 30.0
+
+    @classmethod
+    def uniform(cls, retries: int, backoff: float = 0.5) -> "RetryPolicy":
+        return cls(retries, retries, retries, backoff)
+
+    def retries_for(self, kind: str) -> int:
+        return {
+            ERROR_CONNECT: self.connect_retries,
+            ERROR_READ: self.read_retries,
+            ERROR_SERVER: self.server_retries,
+        }.get(kind, 0)
+
+    def delay(
+        self, attempt: int, rng: Callable[[float, float], float] = random.uniform
+    ) -> float:
+        ceiling = min(self.max_backoff, self.backoff * (2 ** (attempt - 1)))
+        return rng(0.0, ceiling)
+
+
+class CircuitBreaker:
+    """Pause all requests when the recent error rate crosses a threshold.
+
+    The breaker looks at the last ``window`` outcomes. Once at least
+    ``min_requests`` are recorded and the failure share reaches
+    ``failure_threshold`` it opens: every caller blocks in
+    :meth:`wait_until_closed` for ``cooldown`` seconds. It then lets exactly
+    one caller through half-open as a probe while the others keep waiting; a
+    successful probe closes it, a failed one re-opens it. A probe that never
+    reports back is replaced after another ``cooldown``.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: float = 0.5,
+        window: int = 50,
+        min_requests: int = 10,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if not 0 < failure_threshold <= 1:
+            raise ValueError("熔断阈值必须位于 (0, 1] 区间")
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.trips = 0
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def wait_until_closed(self) -> None:
+        """Block while the breaker is open or a half-open probe is in flight.
+
+        Returns immediately when closed; after the cooldown, exactly one
+        caller returns as the probe.
+        """
+        while True:
+            with self._lock:
+                now = self._clock()
+                if self._probe_started is not None:
+                    remaining = self._probe_started + self.cooldown - now
+                    if remaining <= 0:
+                        self._probe_started = now
+                        logger.warning("半开试探未返回结果，重新试探上游")
+                        return
+                    delay = min(remaining, _PROBE_POLL)
+                elif self._opened_at is None:
+                    return
+                else:
+                    remaining = self._opened_at + self.cooldown - now
+                    if remaining <= 0:
+                        self._opened_at = None
+                        self._probe_started = now
+                        logger.info("熔断冷却结束，进入半开状态试探上游")
+                        return
+                    delay = min(remaining, 1.0)
+            self._sleep(delay)
+
+    def release(self) -> None:
+        """End a half-open probe that says nothing about upstream health.
+
+        Used when the probe failed with a non-transient error; the next waiter
+        becomes the probe instead.
+        """
+        with self._lock:
+            if self._probe_started is not None:
+                self._probe_started = None
+                self._opened_at = self._clock() - self.cooldown
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self._probe_started is not None:
+                self._probe_started = None
+                if success:
+                    self._outcomes.clear()
+                    logger.info("上游恢复，熔断器关闭")
+                else:
+                    self._trip()
+                return
+            self._outcomes.append(success)
+            if self._opened_at is not None or len(self._outcomes) < self.min_requests:
+                return
+            failures = self._outcomes.count(False)
+            if failures / len(self._outcomes) >= self.failure_threshold:
+                self._trip()
+
+    def _trip(self) -> None:
+        self._opened_at = self._clock()
+        self.trips += 1
+        self._outcomes.clear()
+        logger.error("上游错误率过高，熔断 %.0f 秒后再试", self.cooldown)
+
+
+def call_with_retries(
+    func: Callable[[], T],
+    *,
+    url: str,
+    policy: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> T:
+    attempts: Dict[str, int] = {}
+    while True:
+        if breaker is not None:
+            breaker.wait_until_closed()
+        try:
+            result = func()
+        except Exception as exc:
+            kind = classify_error(exc)
+            if breaker is not None:
+                if kind is not None:
+                    breaker.record(False)
+                else:
+                    breaker.release()
+            exhausted = (
+                kind is None
+                or policy is None
+                or attempts.get(kind, 0) >= policy.retries_for(kind)
+            )
+            if exhausted:
+                if _is_request_error(exc):
+                    logger.error("请求失败，不再重试: %s", url, exc_info=True)
+                raise
+            used = attempts.get(kind, 0)
+            attempts[kind] = used + 1
+            delay = policy.delay(sum(attempts.values()))
+            logger.warning(
+                "请求失败（%s），%.2f 秒后第 %d 次重试: %s", kind, delay, used + 1, url
+            )
+            sleep(delay)
+            continue
+        if breaker is not None:
+            breaker.record(True)
+        return result
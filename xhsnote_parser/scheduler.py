@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, TypeVar
+from urllib.parse import urlsplit
+
+from .http_client import ThrottledError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_RATE = 2.0
+DEFAULT_MAX_RATE = 20.0
+DEFAULT_MIN_RATE = 0.2
+DEFAULT_THROTTLE_RETRIES = 3
+DEFAULT_THROTTLE_COOLDOWN = 5.0
+
+
+class AdaptiveRateLimiter:
+    """Token bucket plus an AIMD concurrency window for a single host.
+
+    Each success grows the request rate by ``rate_step`` per second of traffic
+    and the concurrency window by one slot per full window (additive
+    increase). A throttling response halves both (multiplicative decrease) and
+    empties the bucket so the host gets a short breather.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        *,
+        rate: float = DEFAULT_RATE,
+        min_rate: float = DEFAULT_MIN_RATE,
+        max_rate: float = DEFAULT_MAX_RATE,
+        rate_step: float = 0.5,
+        concurrency: int = 4,
+        max_concurrency: int = 32,
+    ) -> None:
+        if not 0 < min_rate <= rate <= max_rate:
+            raise ValueError("限速参数必须满足 0 < min_rate <= rate <= max_rate")
+        if not 1 <= concurrency <= max_concurrency:
+            raise ValueError("并发窗口必须满足 1 <= concurrency <= max_concurrency")
+        self.host = host
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate_step = rate_step
+        self.max_concurrency = max_concurrency
+        self._window = float(concurrency)
+        self._tokens = 1.0
+        self._refilled_at = time.monotonic()
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    @property
+    def concurrency(self) -> int:
+        return int(self._window)
+
+    def _refill(self, now: float) -> None:
+        capacity = max(1.0, self.rate)
+        elapsed = now - self._refilled_at
+        self._tokens = min(capacity, self._tokens + elapsed * self.rate)
+        self._refilled_at = now
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._in_flight >= self.concurrency:
+                self._condition.wait()
+            self._in_flight += 1
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                self._condition.wait((1.0 - self._tokens) / self.rate)
+
+    def release(self, *, success: bool = True, throttled: bool = False) -> None:
+        """Free a slot; successes grow the limits, throttling halves them."""
+        with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                self._decrease()
+            elif success:
+                self._increase()
+            self._condition.notify_all()
+
+    def _increase(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.rate_step / self.rate)
+        previous = self.concurrency
+        self._window = min(
+            float(self.max_concurrency), self._window + 1.0 / self._window
+        )
+        if self.concurrency != previous:
+            logger.debug(
+                "限速上调 host=%s rate=%.2f/s 并发=%d",
+                self.host,
+                self.rate,
+                self.concurrency,
+            )
+
+    def _decrease(self) -> None:
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._window = max(1.0, self._window / 2)
+        self._tokens = 0.0
+        logger.info(
+            "检测到限流，下调速率 host=%s rate=%.2f/s 并发=%d",
+            self.host,
+            self.rate,
+            self.concurrency,
+        )
+
+
+class RequestScheduler:
+    """Route every request through a per-host :class:`AdaptiveRateLimiter`.
+
+    Throttled requests are retried up to ``throttle_retries`` times after a
+    cooldown; other errors propagate unchanged.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float = DEFAULT_RATE,
+        max_rate: float = DEFAULT_MAX_RATE,
+        min_rate: float = DEFAULT_MIN_RATE,
+        concurrency: int = 4,
+        max_concurrency: int = 32,
+        throttle_retries: int = DEFAULT_THROTTLE_RETRIES,
+        cooldown: float = DEFAULT_THROTTLE_COOLDOWN,
+        report_interval: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._limiter_options = {
+            "rate": rate,
+            "min_rate": min_rate,
+            "max_rate": max_rate,
+            "concurrency": concurrency,
+            "max_concurrency": max_concurrency,
+        }
+        self.throttle_retries = throttle_retries
+        self.cooldown = cooldown
+        self.report_interval = report_interval
+        self.throttled = 0
+        self._sleep = sleep
+        self._limiters: Dict[str, AdaptiveRateLimiter] = {}
+        self._lock = threading.Lock()
+        self._reported_at = time.monotonic()
+
+    def limiter_for(self, url: str) -> AdaptiveRateLimiter:
+        host = urlsplit(url).netloc
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = AdaptiveRateLimiter(host, **self._limiter_options)
+                self._limiters[host] = limiter
+            return limiter
+
+    def run(self, url: str, request: Callable[[], T]) -> T:
+        limiter = self.limiter_for(url)
+        attempt = 0
+        while True:
+            limiter.acquire()
+            try:
+                result = request()
+            except ThrottledError:
+                limiter.release(throttled=True)
+                with self._lock:
+                    self.throttled += 1
+                if attempt >= self.throttle_retries:
+                    raise
+                attempt += 1
+                delay = self.cooldown * attempt
+                logger.info(
+                    "限流重试 %d/%d，%.1f 秒后重新请求: %s",
+                    attempt,
+                    self.throttle_retries,
+                    delay,
+                    url,
+                )
+                self._sleep(delay)
+                continue
+            except BaseException:
+                limiter.release(success=False)
+                raise
+            limiter.release()
+            self._maybe_report()
+            return result
+
+    def _maybe_report(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._reported_at < self.report_interval:
+                return
+            self._reported_at = now
+        logger.info("当前请求速率: %s", self.describe())
+
+    def describe(self) -> str:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return ", ".join(
+            f"{limiter.host} {limiter.rate:.2f}/s 并发 {limiter.concurrency}"
+            for limiter in limiters
+        )
@@ -0,0 +1,248 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import requests
+
+from . import json_backend
+from .http_client import DEFAULT_POOL_SIZE, ThrottledError, create_session
+from .note_detail import project_note_detail
+from .service import parse_note
+from .urls import extract_note_id, note_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVE_HOST = "127.0.0.1"
+DEFAULT_SERVE_PORT = 8787
+DEFAULT_NOTE_CACHE_SIZE = 1024
+DEFAULT_NOTE_CACHE_TTL = 300
+_EXPLORE_URL = "https://www.xiaohongshu.com/explore/{}"
+
+
+class NoteCache:
+    """In-memory LRU of built note details with a per-entry TTL."""
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = DEFAULT_NOTE_CACHE_SIZE,
+        ttl: float = DEFAULT_NOTE_CACHE_TTL,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("笔记缓存容量必须大于等于 1")
+        if ttl <= 0:
+            raise ValueError("笔记缓存 TTL 必须大于 0")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, note_detail: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, note_detail)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class NoteService:
+    """Long-lived ``parse_note`` front end for the HTTP server.
+
+    One pooled session (plus any scheduler, retry policy or parse pool passed
+    in ``parse_options``) stays warm for the life of the process. Results are
+    kept in a :class:`NoteCache`, and concurrent requests for the same noteId
+    share a single upstream fetch: the first caller fetches, later ones wait
+    on its future.
+    """
+
+    def __init__(
+        self,
+        *,
+        cache: Optional[NoteCache] = None,
+        session: Optional[requests.Session] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        **parse_options: Any,
+    ) -> None:
+        self.cache = cache or NoteCache()
+        self.fetches = 0
+        self.coalesced = 0
+        self._owns_session = session is None
+        self._session = session or create_session(pool_size=pool_size)
+        self._parse_options = {
+            **parse_options,
+            "session": self._session,
+            "output_path": None,
+        }
+        self._inflight: Dict[str, "Future[Dict[str, Any]]"] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Dict[str, Any]:
+        key = note_key(url)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.fetches += 1
+            else:
+                self.coalesced += 1
+        assert future is not None
+        if not leader:
+            return future.result()
+        try:
+            note_detail = parse_note(url, **self._parse_options)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            self.cache.put(key, note_detail)
+            future.set_result(note_detail)
+            return note_detail
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            inflight = len(self._inflight)
+        return {
+            "cache_entries": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "fetches": self.fetches,
+            "coalesced": self.coalesced,
+            "inflight": inflight,
+        }
+
+    def close(self) -> None:
+        if self._owns_session:
+            self._session.close()
+
+
+def _resolve_request_url(path: str, query: Dict[str, str]) -> Optional[str]:
+    """``/note?url=<note URL>`` or ``/notes/<noteId>[?xsec_token=...]``."""
+    if path == "/note":
+        return query.get("url") or None
+    if path.startswith("/notes/"):
+        note_id = path[len("/notes/") :]
+        if not note_id or extract_note_id(_EXPLORE_URL.format(note_id)) is None:
+            return None
+        url = _EXPLORE_URL.format(note_id)
+        params = {
+            name: query[name]
+            for name in ("xsec_token", "xsec_source")
+            if name in query
+        }
+        return f"{url}?{urlencode(params)}" if params else url
+    return None
+
+
+class _NoteRequestHandler(BaseHTTPRequestHandler):
+    server: "NoteServer"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # noqa: N802 - stdlib hook name
+        parts = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+        if parts.path == "/healthz":
+            self._send_json(HTTPStatus.OK, {"status": "ok"})
+            return
+        if parts.path == "/stats":
+            self._send_json(HTTPStatus.OK, self.server.service.stats())
+            return
+        if parts.path != "/note" and not parts.path.startswith("/notes/"):
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "未知路径"})
+            return
+        url = _resolve_request_url(parts.path, query)
+        if url is None:
+            self._send_json(
+                HTTPStatus.BAD_REQUEST, {"error": "缺少有效的笔记 URL 或 noteId"}
+            )
+            return
+        try:
+            note_detail = self.server.service.get(url)
+        except ThrottledError as exc:
+            self._send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(exc)})
+            return
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error("解析失败 [%s]: %s", url, exc)
+            self._send_json(HTTPStatus.BAD_GATEWAY, {"error": str(exc)})
+            return
+        fields = [field for field in query.get("fields", "").split(",") if field]
+        if fields:
+            note_detail = project_note_detail(note_detail, fields)
+        self._send_json(HTTPStatus.OK, note_detail)
+
+    def _send_json(self, status: HTTPStatus, payload: Any) -> None:
+        body = json_backend.dumps(payload, compact=True).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class NoteServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering note lookups from a :class:`NoteService`.
+
+    Endpoints: ``GET /notes/<noteId>`` (optionally ``?xsec_token=``),
+    ``GET /note?url=<note URL>``, ``GET /stats`` and ``GET /healthz``. Note
+    lookups accept ``fields=a,b.c`` to project the response.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: NoteService) -> None:
+        self.service = service
+        super().__init__(address, _NoteRequestHandler)
+
+
+def serve(
+    service: NoteService,
+    *,
+    host: str = DEFAULT_SERVE_HOST,
+    port: int = DEFAULT_SERVE_PORT,
+) -> None:
+    """Serve until interrupted, then close the service's session."""
+    with NoteServer((host, port), service) as server:
+        bound_host, bound_port = server.server_address[:2]
+        logger.info("解析服务已启动: http://%s:%d", bound_host, bound_port)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("解析服务收到中断信号，正在退出")
+        finally:
+            service.close()
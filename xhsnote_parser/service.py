@@ -1,11 +1,91 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Callable, Dict, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
 
 import requests
 
-from .http_client import DEFAULT_TIMEOUT, fetch_note_page
+from .http_client import (
+    DEFAULT_TIMEOUT,
+    create_async_session,
+    create_session,
+    fetch_initial_state,
+    fetch_note_page,
+    fetch_note_page_async,
+)
+from .metrics import StageHook, StageTimer
 from .note_detail import build_note_detail, extract_note_data
+from .response_cache import ResponseCache
+from .retry import CircuitBreaker, RetryPolicy
+from .scheduler import RequestScheduler
 from .storage import save_note_detail
+from .urls import iter_url_lines
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ASYNC_CONCURRENCY = 32
+DEFAULT_PARSE_WORKERS = 8
+_FEED_DONE = object()
+
+
+class ParseResult(NamedTuple):
+    """Outcome of one URL from :func:`parse_notes`; exactly one of
+    ``note_detail`` and ``error`` is set."""
+
+    url: str
+    note_detail: Optional[Dict[str, Any]]
+    error: Optional[BaseException]
+    initial_state: Optional[Dict[str, Any]] = None
+
+
+def create_parse_pool(processes: Optional[int] = None) -> ProcessPoolExecutor:
+    """Process pool for the CPU-bound extract/build stage of ``parse_note``.
+
+    Workers are started with ``forkserver`` where available (``spawn``
+    elsewhere) because callers typically already run fetch threads, which
+    are unsafe to ``fork``. ``processes`` defaults to ``os.cpu_count()``.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else "spawn"
+    )
+    return ProcessPoolExecutor(
+        max_workers=processes or os.cpu_count() or 1, mp_context=context
+    )
+
+
+def _parse_html(
+    html: str,
+    url: str,
+    include_full_state: bool,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Extract and build one note; module-level so a process pool can run it."""
+    note_data, initial_state = extract_note_data(
+        html, include_full_state=include_full_state
+    )
+    return build_note_detail(note_data, url, fields=fields), initial_state
 
 
 def parse_note(
@@ -16,12 +96,240 @@ def parse_note(
     output_path: Optional[Path] = Path("output"),
     session: Optional[requests.Session] = None,
     on_initial_state: Optional[Callable[[Dict[str, Any]], None]] = None,
+    stream: bool = False,
+    cache: Optional[ResponseCache] = None,
+    scheduler: Optional[RequestScheduler] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+    on_stage: Optional[StageHook] = None,
+    parse_pool: Optional[Executor] = None,
+    fields: Optional[Iterable[str]] = None,
 ) -> Dict[str, Any]:
-    html = fetch_note_page(url, headers=headers, timeout=timeout, session=session)
-    note_data, initial_state = extract_note_data(html)
-    if on_initial_state is not None:
+    """Fetch, extract and build one note, optionally saving it to ``output_path``.
+
+    ``fields`` limits the result to the listed keys, e.g.
+    ``("title", "user.nickname", "imageList")``; ``noteId`` is always kept.
+
+    ``on_stage(stage, seconds, size)`` is called after each of the ``fetch``,
+    ``scan``, ``decode``, ``build`` and ``save`` stages; the fetch sample
+    carries the body bytes received and is skipped on a response-cache hit. With ``parse_pool`` (see
+    :func:`create_parse_pool`) extraction and enrichment run in another
+    process while the calling thread only waits, and are reported together
+    as a single ``parse`` stage.
+    """
+    fetch = fetch_initial_state if stream else fetch_note_page
+    html = fetch(
+        url,
+        headers=headers,
+        timeout=timeout,
+        session=session,
+        cache=cache,
+        scheduler=scheduler,
+        retry_policy=retry_policy,
+        circuit_breaker=circuit_breaker,
+        on_stage=on_stage,
+    )
+    include_full_state = on_initial_state is not None
+    field_list = tuple(fields) if fields is not None else None
+    if parse_pool is not None:
+        with StageTimer(on_stage, "parse"):
+            note_detail, initial_state = parse_pool.submit(
+                _parse_html, html, url, include_full_state, field_list
+            ).result()
+    else:
+        note_data, initial_state = extract_note_data(
+            html, include_full_state=include_full_state, on_stage=on_stage
+        )
+        with StageTimer(on_stage, "build"):
+            note_detail = build_note_detail(note_data, url, fields=field_list)
+    if on_initial_state is not None and initial_state is not None:
         on_initial_state(initial_state)
-    note_detail = build_note_detail(note_data, url)
     if output_path:
-        save_note_detail(note_detail, output_path)
+        with StageTimer(on_stage, "save"):
+            save_note_detail(note_detail, output_path)
     return note_detail
+
+
+async def parse_note_async(
+    url: str,
+    *,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    output_path: Optional[Path] = Path("output"),
+    session: Optional["aiohttp.ClientSession"] = None,
+    on_initial_state: Optional[Callable[[Dict[str, Any]], None]] = None,
+    parse_pool: Optional[Executor] = None,
+    fields: Optional[Iterable[str]] = None,
+) -> Dict[str, Any]:
+    html = await fetch_note_page_async(
+        url, headers=headers, timeout=timeout, session=session
+    )
+    include_full_state = on_initial_state is not None
+    field_list = tuple(fields) if fields is not None else None
+    if parse_pool is not None:
+        loop = asyncio.get_running_loop()
+        note_detail, initial_state = await loop.run_in_executor(
+            parse_pool, _parse_html, html, url, include_full_state, field_list
+        )
+    else:
+        note_data, initial_state = extract_note_data(
+            html, include_full_state=include_full_state
+        )
+        note_detail = build_note_detail(note_data, url, fields=field_list)
+    if on_initial_state is not None and initial_state is not None:
+        on_initial_state(initial_state)
+    if output_path:
+        await asyncio.to_thread(save_note_detail, note_detail, output_path)
+    return note_detail
+
+
+async def parse_many_async(
+    urls: Iterable[str],
+    *,
+    concurrency: int = DEFAULT_ASYNC_CONCURRENCY,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    session: Optional["aiohttp.ClientSession"] = None,
+    parse_pool: Optional[Executor] = None,
+    fields: Optional[Iterable[str]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Parse ``urls`` with at most ``concurrency`` requests in flight.
+
+    Note details are yielded in completion order; failed URLs are logged and
+    skipped so a single bad note does not abort the batch. Pass ``parse_pool``
+    to move JSON decoding and enrichment off the event loop.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency 必须大于等于 1")
+    owns_session = session is None
+    http_session = session or create_async_session(
+        limit=concurrency, timeout=timeout
+    )
+    pending: Set["asyncio.Task[Dict[str, Any]]"] = set()
+    task_urls: Dict["asyncio.Task[Dict[str, Any]]", str] = {}
+    url_iter = iter(urls)
+    try:
+        while True:
+            for url in url_iter:
+                task = asyncio.create_task(
+                    parse_note_async(
+                        url,
+                        headers=headers,
+                        timeout=timeout,
+                        output_path=None,
+                        session=http_session,
+                        parse_pool=parse_pool,
+                        fields=fields,
+                    )
+                )
+                pending.add(task)
+                task_urls[task] = url
+                if len(pending) >= concurrency:
+                    break
+            if not pending:
+                break
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                url = task_urls.pop(task)
+                exc = task.exception()
+                if exc is not None:
+                    logger.error("解析失败 [%s]: %s", url, exc)
+                    continue
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if owns_session:
+            await http_session.close()
+
+
+def _parse_one(
+    url: str, include_initial_state: bool, options: Dict[str, Any]
+) -> ParseResult:
+    states: List[Dict[str, Any]] = []
+    try:
+        note_detail = parse_note(
+            url,
+            on_initial_state=states.append if include_initial_state else None,
+            **options,
+        )
+    except Exception as exc:  # pylint: disable=broad-except
+        return ParseResult(url, None, exc)
+    return ParseResult(url, note_detail, None, states[0] if states else None)
+
+
+def parse_notes(
+    urls: Iterable[str],
+    *,
+    workers: int = DEFAULT_PARSE_WORKERS,
+    max_pending: Optional[int] = None,
+    session: Optional[requests.Session] = None,
+    output_path: Optional[Path] = None,
+    include_initial_state: bool = False,
+    **options: Any,
+) -> Iterator[ParseResult]:
+    """Parse an unbounded URL source on a thread pool, yielding as notes finish.
+
+    ``urls`` may be any iterable of lines, e.g. an open file or ``sys.stdin``;
+    blank lines and ``#`` comments are skipped. A feeder thread pulls from it
+    only while fewer than ``max_pending`` (default ``2 * workers``) URLs are
+    in flight, so memory stays flat however long the source is and a slow
+    producer never holds back finished results. Failures are yielded as
+    :class:`ParseResult` entries carrying the exception instead of raising.
+    Remaining keyword arguments are passed to :func:`parse_note`.
+    """
+    if workers < 1:
+        raise ValueError("workers 必须大于等于 1")
+    slots = threading.BoundedSemaphore(max_pending or 2 * workers)
+    finished: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+    stop = threading.Event()
+    submitted = 0
+    feed_error: List[BaseException] = []
+    owns_session = session is None
+    http_session = session or create_session(pool_size=workers)
+    options = {**options, "session": http_session, "output_path": output_path}
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="xhsnote")
+
+    def _feed() -> None:
+        nonlocal submitted
+        try:
+            for url in iter_url_lines(urls):
+                while not slots.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+                if stop.is_set():
+                    return
+                future: "Future[ParseResult]" = executor.submit(
+                    _parse_one, url, include_initial_state, options
+                )
+                submitted += 1
+                future.add_done_callback(finished.put)
+        except BaseException as exc:  # pylint: disable=broad-except
+            feed_error.append(exc)
+        finally:
+            finished.put(_FEED_DONE)
+
+    feeder = threading.Thread(target=_feed, name="xhsnote-feed", daemon=True)
+    feeder.start()
+    yielded = 0
+    feeding = True
+    try:
+        while feeding or yielded < submitted:
+            item = finished.get()
+            if item is _FEED_DONE:
+                feeding = False
+                continue
+            slots.release()
+            yielded += 1
+            yield item.result()
+        if feed_error:
+            raise feed_error[0]
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        if owns_session:
+            http_session.close()
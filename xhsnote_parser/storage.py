@@ -1,12 +1,648 @@
-import json
+import abc
+import gzip
 import logging
+import queue
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from . import json_backend
+from .archive import StateArchive
+from .database import DATABASE_FILENAME, NoteDatabase
+from .fileio import atomic_write_text
+from .note_detail import project_note_detail
+
+if TYPE_CHECKING:
+    from .metrics import StageHook
 
 logger = logging.getLogger(__name__)
 
+_INVALID_FILENAME_CHARS = set('<>:"/\\|?*')
+OUTPUT_FORMATS = ("dir", "jsonl", "sqlite")
+COMPRESSIONS = ("none", "gzip", "zstd")
+_COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+_WRITE_BUFFER_SIZE = 1024 * 1024
+DEFAULT_WRITER_QUEUE = 64
+DEFAULT_FLUSH_RECORDS = 256
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+WriteCallback = Callable[[Optional[str], Optional[BaseException]], None]
 
-def save_note_detail(note_detail: Dict[str, Any], path: Path) -> Path:
-    path.write_text(json.dumps(note_detail, ensure_ascii=False, indent=4), encoding="utf-8")
+
+def save_note_detail(
+    note_detail: Dict[str, Any], path: Path, *, compact: bool = False
+) -> Path:
+    """Write ``note_detail`` as JSON; a crash never leaves a half-written file."""
+    atomic_write_text(path, json_backend.dumps(note_detail, compact=compact))
     logger.info("笔记内容写入 %s", path)
     return path
+
+
+def sanitize_segment(value: Optional[Any], fallback: str) -> str:
+    if value in (None, ""):
+        text = ""
+    else:
+        text = str(value)
+    sanitized = []
+    for char in text:
+        if char in _INVALID_FILENAME_CHARS or ord(char) < 32:
+            sanitized.append("_")
+        else:
+            sanitized.append(char)
+    cleaned = "".join(sanitized).strip().rstrip(". ")
+    return cleaned or fallback
+
+
+def build_output_path(
+    note_detail: Dict[str, Any], base_dir: Path, *, suffix: str = "noteDetail"
+) -> Path:
+    user = note_detail.get("user") or {}
+    author = sanitize_segment(user.get("nickname"), "unknown_author")
+    title = sanitize_segment(note_detail.get("title"), "untitled")
+    note_id = sanitize_segment(note_detail.get("noteId"), "note")
+    filename = f"{title}_{note_id}_{suffix}.json"
+    return base_dir / f"{author}_notes" / filename
+
+
+class NoteSink(abc.ABC):
+    """Destination for parsed notes; ``write`` returns where the note went.
+
+    ``bytes_written`` counts the uncompressed bytes the sink has produced.
+    ``required_fields`` lists the note keys the sink reads for its layout or
+    columns, so they must survive parsing; ``fields``, when set, is applied
+    only to what the sink serializes.
+    """
+
+    bytes_written = 0
+    required_fields: Tuple[str, ...] = ()
+    fields: Optional[Tuple[str, ...]] = None
+
+    def _serializable(self, note_detail: Dict[str, Any]) -> Dict[str, Any]:
+        if self.fields is None:
+            return note_detail
+        return project_note_detail(note_detail, self.fields)
+
+    @abc.abstractmethod
+    def write(
+        self,
+        note_detail: Dict[str, Any],
+        initial_state: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Write one note (and its state, if given) and return its location."""
+
+    def write_durable(
+        self,
+        note_detail: Dict[str, Any],
+        initial_state: Optional[Dict[str, Any]],
+        on_durable: WriteCallback,
+    ) -> None:
+        """Write and call ``on_durable(location, error)`` once the note is safe.
+
+        Sinks that batch writes call it later, from whichever thread flushes.
+        """
+        try:
+            location = self.write(note_detail, initial_state)
+        except Exception as exc:  # pylint: disable=broad-except
+            on_durable(None, exc)
+        else:
+            on_durable(location, None)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "NoteSink":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class DirectorySink(NoteSink):
+    """Default layout: ``<base>/<作者>_notes/<标题>_<noteId>_noteDetail.json``."""
+
+    required_fields = ("title", "user.nickname")
+
+    def __init__(self, base_dir: Path, *, compact: bool = False) -> None:
+        self.base_dir = base_dir
+        self.compact = compact
+        self._lock = threading.Lock()
+
+    def write(
+        self,
+        note_detail: Dict[str, Any],
+        initial_state: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        output_path = build_output_path(note_detail, self.base_dir)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        save_note_detail(
+            self._serializable(note_detail), output_path, compact=self.compact
+        )
+        written = output_path.stat().st_size
+        if initial_state is not None:
+            state_path = build_output_path(
+                note_detail, self.base_dir, suffix="initial_state"
+            )
+            save_note_detail(initial_state, state_path, compact=self.compact)
+            written += state_path.stat().st_size
+            logger.info("已保存 __INITIAL_STATE__ 到: %s", state_path)
+        with self._lock:
+            self.bytes_written += written
+        return str(output_path)
+
+
+def _require_zstandard() -> Any:
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise RuntimeError(
+            "zstd 压缩需要安装 zstandard: pip install zstandard"
+        ) from exc
+    return zstandard
+
+
+def _open_compressed(path: Path, compression: str) -> IO[bytes]:
+    if compression == "zstd":
+        zstandard = _require_zstandard()
+        raw = open(path, "xb", buffering=_WRITE_BUFFER_SIZE)
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+    raw = open(path, "xb", buffering=_WRITE_BUFFER_SIZE)
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+    return raw
+
+
+class JsonLinesWriter:
+    """Append compact JSON records to size-rotated, optionally compressed files.
+
+    Files are named ``<prefix>-00001.jsonl[.gz|.zst]``; numbering continues
+    after any files already present so earlier runs are never overwritten.
+    ``rotate_bytes`` counts uncompressed bytes; ``None`` disables rotation.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        prefix: str = "notes",
+        compression: str = "none",
+        rotate_bytes: Optional[int] = None,
+    ) -> None:
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"不支持的压缩格式: {compression}")
+        self.directory = directory
+        self.prefix = prefix
+        self.compression = compression
+        self.rotate_bytes = rotate_bytes
+        self._suffix = ".jsonl" + _COMPRESSION_SUFFIXES[compression]
+        self._handle: Optional[IO[bytes]] = None
+        self._path: Optional[Path] = None
+        self._written = 0
+        self.bytes_written = 0
+        self._index = self._last_index()
+
+    def _last_index(self) -> int:
+        last = 0
+        for path in self.directory.glob(f"{self.prefix}-*{self._suffix}"):
+            number = path.name[len(self.prefix) + 1 : -len(self._suffix)]
+            if number.isdigit():
+                last = max(last, int(number))
+        return last
+
+    def _open_next(self) -> None:
+        self.close()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._index += 1
+        self._path = self.directory / f"{self.prefix}-{self._index:05d}{self._suffix}"
+        self._handle = _open_compressed(self._path, self.compression)
+        self._written = 0
+        logger.info("开始写入 %s", self._path)
+
+    def write(self, record: Dict[str, Any]) -> Path:
+        line = (json_backend.dumps(record, compact=True) + "\n").encode("utf-8")
+        needs_rotation = (
+            self.rotate_bytes is not None
+            and self._written > 0
+            and self._written + len(line) > self.rotate_bytes
+        )
+        if self._handle is None or needs_rotation:
+            self._open_next()
+        assert self._handle is not None and self._path is not None
+        self._handle.write(line)
+        self._written += len(line)
+        self.bytes_written += len(line)
+        return self._path
+
+    def flush(self) -> None:
+        """Push every line written so far through the buffer to the file.
+
+        Gzip and zstd handles flush with ``Z_SYNC_FLUSH`` / ``FLUSH_BLOCK`` by
+        default, so the file then decodes up to the last complete line.
+        """
+        if self._handle is not None:
+            self._handle.flush()
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class JsonLinesSink(NoteSink):
+    """Aggregate notes into ``notes-*.jsonl`` files through one buffered handle.
+
+    Initial states, when provided, go to a parallel ``initial_state-*.jsonl``
+    stream as ``{"noteId": ..., "state": ...}`` records. ``write_durable``
+    reports a note only after the handles have been flushed, which happens
+    every ``flush_records`` notes, every ``flush_interval`` seconds from a
+    background thread, and on :meth:`close`.
+    """
+
+    def __init__(
+        self,
+        base_dir: Path,
+        *,
+        compression: str = "none",
+        rotate_bytes: Optional[int] = None,
+        flush_records: int = DEFAULT_FLUSH_RECORDS,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ) -> None:
+        if flush_records < 1:
+            raise ValueError("JSONL 刷盘批量必须大于等于 1")
+        self._notes = JsonLinesWriter(
+            base_dir, prefix="notes", compression=compression, rotate_bytes=rotate_bytes
+        )
+        self._states = JsonLinesWriter(
+            base_dir,
+            prefix="initial_state",
+            compression=compression,
+            rotate_bytes=rotate_bytes,
+        )
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, WriteCallback]] = []
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, name="xhsnote-jsonl", daemon=True
+        )
+        self._flusher.start()
+
+    def write(
+        self,
+        note_detail: Dict[str, Any],
+        initial_state: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        with self._lock:
+            location = self._write_locked(note_detail, initial_state)
+        return location
+
+    def write_durable(
+        self,
+        note_detail: Dict[str, Any],
+        initial_state: Optional[Dict[str, Any]],
+        on_durable: WriteCallback,
+    ) -> None:
+        try:
+            with self._lock:
+                location = self._write_locked(note_detail, initial_state)
+                self._pending.append((location, on_durable))
+                due = len(self._pending) >= self.flush_records
+                done = self._flush() if due else None
+        except Exception as exc:  # pylint: disable=broad-except
+            on_durable(None, exc)
+            return
+        if done is not None:
+            self._notify(*done)
+
+    def _write_locked(
+        self, note_detail: Dict[str, Any], initial_state: Optional[Dict[str, Any]]
+    ) -> str:
+        path = self._notes.write(self._serializable(note_detail))
+        if initial_state is not None:
+            self._states.write(
+                {"noteId": note_detail.get("noteId"), "state": initial_state}
+            )
+        logger.info("笔记 %s 写入 %s", note_detail.get("noteId"), path)
+        return str(path)
+
+    def _flush(
+        self,
+    ) -> Tuple[List[Tuple[str, WriteCallback]], Optional[BaseException]]:
+        """Flush both streams; the caller holds the lock and notifies after."""
+        pending, self._pending = self._pending, []
+        error: Optional[BaseException] = None
+        try:
+            self._notes.flush()
+            self._states.flush()
+        except OSError as exc:
+            error = exc
+            logger.error("JSONL 刷盘失败，%d 条笔记未确认: %s", len(pending), exc)
+        return pending, error
+
+    @staticmethod
+    def _notify(
+        pending: List[Tuple[str, WriteCallback]], error: Optional[BaseException]
+    ) -> None:
+        for location, callback in pending:
+            try:
+                callback(None if error else location, error)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("JSONL 刷盘回调执行失败")
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                done = self._flush() if self._pending else None
+            if done is not None:
+                self._notify(*done)
+
+    @property
+    def bytes_written(self) -> int:  # type: ignore[override]
+        return self._notes.bytes_written + self._states.bytes_written
+
+    def close(self) -> None:
+        self._closed.set()
+        self._flusher.join()
+        with self._lock:
+            done = self._flush()
+            self._notes.close()
+            self._states.close()
+        self._notify(*done)
+
+
+class StateArchiveSink(NoteSink):
+    """Write notes through ``inner`` and their initial states to ``archive``.
+
+    Replaces per-note ``_initial_state.json`` files with compressed, indexed
+    archive segments (see :class:`~xhsnote_parser.archive.StateArchive`).
+    """
+
+    def __init__(self, inner: NoteSink, archive: StateArchive) -> None:
+        self.inner = inner
+        self.archive = archive
+
+    @property
+    def bytes_written(self) -> int:  # type: ignore[override]
+        return self.inner.bytes_written
+
+    @property
+    def required_fields(self) -> Tuple[str, ...]:  # type: ignore[override]
+        return self.inner.required_fields
+
+    def write(
+        self,
+        note_detail: Dict[str, Any],
+        initial_state: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        location = self.inner.write(note_detail)
+        self._archive(note_detail, initial_state)
+        return location
+
+    def write_durable(
+        self,
+        note_detail: Dict[str, Any],
+        initial_state: Optional[Dict[str, Any]],
+        on_durable: WriteCallback,
+    ) -> None:
+        try:
+            self._archive(note_detail, initial_state)
+        except Exception as exc:  # pylint: disable=broad-except
+            on_durable(None, exc)
+            return
+        self.inner.write_durable(note_detail, None, on_durable)
+
+    def _archive(
+        self, note_detail: Dict[str, Any], initial_state: Optional[Dict[str, Any]]
+    ) -> None:
+        if initial_state is None:
+            return
+        note_id = note_detail.get("noteId")
+        if not note_id:
+            logger.warning("笔记缺少 noteId，跳过 __INITIAL_STATE__ 归档")
+            return
+        self.archive.append(str(note_id), initial_state)
+
+    def close(self) -> None:
+        try:
+            self.inner.close()
+        finally:
+            self.archive.close()
+
+
+class SqliteSink(NoteSink):
+    """Upsert notes into a :class:`~xhsnote_parser.database.NoteDatabase`.
+
+    Initial states are not stored; combine with :class:`StateArchiveSink`
+    to keep them.
+    """
+
+    required_fields = (
+        "type",
+        "title",
+        "desc",
+        "user.userId",
+        "user.nickname",
+        "time",
+        "lastUpdateTime",
+        "ipLocation",
+        "noteUrl",
+        "interactInfo",
+        "imageList",
+    )
+
+    def __init__(self, database: NoteDatabase) -> None:
+        self.database = database
+        self._lock = threading.Lock()
+
+    def write(
+        self,
+        note_detail: Dict[str, Any],
+        initial_state: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        detail_json = self.database.upsert(
+            note_detail, detail=self._serializable(note_detail)
+        )
+        self._count(detail_json)
+        return self._location(note_detail)
+
+    def write_durable(
+        self,
+        note_detail: Dict[str, Any],
+        initial_state: Optional[Dict[str, Any]],
+        on_durable: WriteCallback,
+    ) -> None:
+        location = self._location(note_detail)
+
+        def _on_commit(error: Optional[BaseException]) -> None:
+            on_durable(None if error else location, error)
+
+        try:
+            detail_json = self.database.upsert(
+                note_detail,
+                on_commit=_on_commit,
+                detail=self._serializable(note_detail),
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            on_durable(None, exc)
+            return
+        self._count(detail_json)
+
+    def _location(self, note_detail: Dict[str, Any]) -> str:
+        return f"{self.database.path}#{note_detail.get('noteId')}"
+
+    def _count(self, detail_json: str) -> None:
+        with self._lock:
+            self.bytes_written += len(detail_json.encode("utf-8"))
+
+    def close(self) -> None:
+        self.database.close()
+
+
+def create_sink(
+    output_format: str,
+    base_dir: Path,
+    *,
+    compact: bool = False,
+    compression: str = "none",
+    rotate_bytes: Optional[int] = None,
+    fields: Optional[Iterable[str]] = None,
+) -> NoteSink:
+    """Build the sink for ``output_format``; ``fields`` projects what it writes."""
+    sink: NoteSink
+    if output_format == "dir":
+        sink = DirectorySink(base_dir, compact=compact)
+    elif output_format == "jsonl":
+        if compression == "zstd":
+            # Fail before anything is fetched rather than on the first write.
+            _require_zstandard()
+        sink = JsonLinesSink(
+            base_dir, compression=compression, rotate_bytes=rotate_bytes
+        )
+    elif output_format == "sqlite":
+        sink = SqliteSink(NoteDatabase(base_dir / DATABASE_FILENAME))
+    else:
+        raise ValueError(f"不支持的输出格式: {output_format}")
+    if fields is not None:
+        sink.fields = tuple(fields)
+    return sink
+
+
+_STOP = object()
+
+
+class BackgroundWriter:
+    """Drain note writes to ``sink`` on a dedicated thread.
+
+    ``submit`` blocks once ``max_pending`` writes are queued, which bounds
+    memory when the disk is slower than the network. Each write reports back
+    through ``on_done(location, error)`` once the sink has made it durable,
+    which for batching sinks may be after a later commit on another thread.
+    With ``max_pending=0`` writes run inline on the calling thread instead.
+    Writes are timed as the ``write`` stage through ``on_stage``.
+    """
+
+    def __init__(
+        self,
+        sink: NoteSink,
+        *,
+        max_pending: int = DEFAULT_WRITER_QUEUE,
+        on_stage: Optional["StageHook"] = None,
+    ) -> None:
+        if max_pending < 0:
+            raise ValueError("写入队列长度不能为负数")
+        self.sink = sink
+        self.on_stage = on_stage
+        self.written = 0
+        self.failed = 0
+        self._queue: Optional["queue.Queue[Any]"] = None
+        self._thread: Optional[threading.Thread] = None
+        self._count_lock = threading.Lock()
+        if max_pending:
+            self._queue = queue.Queue(maxsize=max_pending)
+            self._thread = threading.Thread(
+                target=self._drain, name="xhsnote-writer", daemon=True
+            )
+            self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.unfinished_tasks if self._queue is not None else 0
+
+    def submit(
+        self,
+        note_detail: Dict[str, Any],
+        initial_state: Optional[Dict[str, Any]] = None,
+        *,
+        on_done: Optional[WriteCallback] = None,
+    ) -> None:
+        item = (note_detail, initial_state, on_done)
+        if self._queue is None:
+            self._write(item)
+        else:
+            self._queue.put(item)
+
+    def _write(
+        self,
+        item: Tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[WriteCallback]],
+    ) -> None:
+        note_detail, initial_state, on_done = item
+        started = time.perf_counter()
+
+        def _finish(location: Optional[str], error: Optional[BaseException]) -> None:
+            if error is not None:
+                logger.error("写入笔记 %s 失败: %s", note_detail.get("noteId"), error)
+            with self._count_lock:
+                if error is None:
+                    self.written += 1
+                else:
+                    self.failed += 1
+            if on_done is None:
+                return
+            try:
+                on_done(location, error)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("写入回调执行失败")
+
+        self.sink.write_durable(note_detail, initial_state, _finish)
+        if self.on_stage is not None:
+            self.on_stage("write", time.perf_counter() - started, 0)
+
+    def _drain(self) -> None:
+        assert self._queue is not None
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._write(item)
+            finally:
+                self._queue.task_done()
+
+    def close(self) -> None:
+        """Flush every queued write, then close the sink."""
+        if self._queue is not None and self._thread is not None:
+            if self.pending:
+                logger.info("等待 %d 个待写入的笔记落盘", self.pending)
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._queue = None
+            self._thread = None
+        self.sink.close()
+        logger.info("写入完成: 成功 %d 条，失败 %d 条", self.written, self.failed)
+
+    def __enter__(self) -> "BackgroundWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
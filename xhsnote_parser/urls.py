@@ -0,0 +1,60 @@
+import re
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+_NOTE_PATH_PATTERN = re.compile(
+    r"/(?:explore|discovery/item|user/profile/[^/]+)/([0-9a-fA-F]{24})(?:/|$)"
+)
+
+
+def extract_note_id(url: str) -> Optional[str]:
+    """Return the 24-character noteId embedded in a note URL, if any.
+
+    Recognises ``/explore/<id>``, ``/discovery/item/<id>`` and
+    ``/user/profile/<user>/<id>``; share links without the id in the path
+    (e.g. ``xhslink.com``) return ``None``.
+    """
+    path = urlsplit(url.strip()).path
+    match = _NOTE_PATH_PATTERN.search(path)
+    if not match:
+        return None
+    return match.group(1).lower()
+
+
+def note_key(url: str) -> str:
+    """Identify a URL by its noteId when possible so share tokens do not matter."""
+    return extract_note_id(url) or url.strip()
+
+
+def iter_url_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Lazily yield stripped URLs, skipping blank lines and ``#`` comments.
+
+    Works on any line source (an open file, ``sys.stdin`` or a list) without
+    reading it ahead.
+    """
+    for raw_line in lines:
+        text = raw_line.strip()
+        if text and not text.startswith("#"):
+            yield text
+
+
+def _has_xsec_token(url: str) -> bool:
+    query = parse_qs(urlsplit(url).query)
+    return any(value.strip() for value in query.get("xsec_token", []))
+
+
+def dedupe_note_urls(urls: Iterable[str]) -> List[str]:
+    """Keep one URL per noteId, preferring the first one carrying an xsec_token.
+
+    The surviving URL keeps the position of the note's first occurrence.
+    URLs without a recognisable noteId are deduplicated by exact string.
+    """
+    chosen: Dict[str, str] = {}
+    for url in urls:
+        key = note_key(url)
+        current = chosen.get(key)
+        if current is None or (
+            not _has_xsec_token(current) and _has_xsec_token(url)
+        ):
+            chosen[key] = url
+    return list(chosen.values())